@@ -0,0 +1,124 @@
+"""
+Load-test every /api router in-process through an ASGI transport.
+
+Run from the backend directory:
+    python -m benchmarks.bench_api --users 10000 --notifications 1000000 --concurrency 64
+    python -m benchmarks.bench_api --only credit,notification --requests 5000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from benchmarks.harness import print_table, report_failed, run_load, save_results, split_failed
+from core import latency
+from core.security import issue_token
+from main import app
+from models.database import add_notification, create_user
+
+ROUTERS = ("analyze", "farming", "twitter", "credit", "airdrop", "auth", "referral", "notification")
+
+def seed(users: int, notifications: int) -> None:
+    """Fill the in-memory store with users and notifications spread across them"""
+    for i in range(1, users + 1):
+        create_user(f"bench{i}", f"bench{i}@example.com", "password")
+    for i in range(notifications):
+        add_notification(f"user_{random.randint(1, users)}", f"Notification {i}", "Seeded by benchmark", "info")
+
+def scenarios(users: int):
+    """(router, name, method, path, request kwargs factory) for every benchmarked endpoint"""
+    tokens = [issue_token(f"user_{random.randint(1, users)}")["token"] for _ in range(1000)]
+
+    def auth():
+        return {"Authorization": f"Bearer {random.choice(tokens)}"}
+    projects = ["Arbitrum", "Optimism", "ZkSync", "Starknet", "Base"]
+
+    return [
+        ("analyze", "POST /api/analyze", "POST", "/api/analyze",
+         lambda: {"headers": auth(), "json": {"project_name": random.choice(projects)}}),
+        ("farming", "POST /api/farming", "POST", "/api/farming",
+         lambda: {"headers": auth(), "json": {"project_name": random.choice(projects)}}),
+        ("twitter", "POST /api/twitter", "POST", "/api/twitter",
+         lambda: {"headers": auth(), "json": {"project_name": random.choice(projects), "twitter_handle": "bench"}}),
+        ("twitter", "GET /api/twitter/history", "GET", "/api/twitter/history",
+         lambda: {"headers": auth()}),
+        ("credit", "GET /api/credit", "GET", "/api/credit",
+         lambda: {"headers": auth()}),
+        ("credit", "POST /api/credit/buy", "POST", "/api/credit/buy",
+         lambda: {"headers": auth(), "json": {"method": "offchain", "amount": 5}}),
+        ("credit", "POST /api/credit/consume", "POST", "/api/credit/consume",
+         lambda: {"headers": auth(), "json": {"feature_type": "analyze", "amount": 1}}),
+        ("airdrop", "GET /api/airdrops", "GET", "/api/airdrops",
+         lambda: {"headers": auth()}),
+        ("airdrop", "GET /api/airdrops/{id}", "GET", "/api/airdrops/airdrop-001",
+         lambda: {"headers": auth()}),
+        ("auth", "POST /api/auth/login", "POST", "/api/auth/login",
+         lambda: {"json": {"email": f"bench{random.randint(1, users)}@example.com", "password": "password"}}),
+        ("auth", "GET /api/auth/me", "GET", "/api/auth/me",
+         lambda: {"headers": auth()}),
+        ("referral", "GET /api/referral", "GET", "/api/referral",
+         lambda: {"headers": auth()}),
+        ("notification", "GET /api/notifications", "GET", "/api/notifications",
+         lambda: {"headers": auth(), "params": {"limit": 20}}),
+        ("notification", "POST /api/notifications", "POST", "/api/notifications",
+         lambda: {"headers": auth(), "json": {"title": "Bench", "message": "Benchmark notification"}}),
+    ]
+
+async def run(args) -> list:
+    if latency.enabled:
+        print("warning: LATENCY_PROFILE is not off, results include artificial delays")
+
+    start = time.perf_counter()
+    seed(args.users, args.notifications)
+    print(f"seeded {args.users} users and {args.notifications} notifications in {time.perf_counter() - start:.1f}s")
+
+    only = set(args.only.split(",")) if args.only else set(ROUTERS)
+    results = []
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for router, name, method, path, make_kwargs in scenarios(args.users):
+                if router not in only:
+                    continue
+
+                async def call(_, method=method, path=path, make_kwargs=make_kwargs):
+                    response = await client.request(method, path, **make_kwargs())
+                    return response.status_code < 400
+
+                # Warm up caches and code paths before measuring
+                await run_load(name, call, min(args.warmup, args.requests), args.concurrency)
+                result = await run_load(name, call, args.requests, args.concurrency)
+                result["router"] = router
+                results.append(result)
+                if result["failed"]:
+                    print(f"{name}: FAILED, {result['errors']} of {result['requests']} requests errored")
+                else:
+                    print(f"{name}: {result['throughput_rps']} req/s, p99 {result['p99_ms']} ms")
+    finally:
+        await app.router.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--notifications", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--only", help=f"comma separated routers ({', '.join(ROUTERS)})")
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    failed = split_failed(results)
+    print()
+    print_table(results, ["name", "requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms"])
+    path = save_results("api", results, vars(args), args.output)
+    print(f"\nresults saved to {path}")
+    report_failed(failed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Compare token verification cost of the session store and signed JWTs.
+
+Run from the backend directory:
+    python -m benchmarks.bench_auth --users 10000 --lookups 50000
+"""
+import argparse
+import random
+import time
+
+from core.config import settings
+from core.security import issue_token, resolve_token
+
+def bench_mode(mode: str, users: int, lookups: int) -> dict:
+    settings.AUTH_MODE = mode
+    tokens = [issue_token(f"user_{i}")["token"] for i in range(users)]
+    sample = [random.choice(tokens) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    for token in sample:
+        resolve_token(token)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "lookups": lookups,
+        "total_s": round(elapsed, 4),
+        "per_lookup_us": round(elapsed / lookups * 1e6, 2),
+        "lookups_per_s": round(lookups / elapsed)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=50000)
+    args = parser.parse_args()
+
+    original_mode = settings.AUTH_MODE
+    try:
+        for mode in ("session", "jwt"):
+            print(bench_mode(mode, args.users, args.lookups))
+    finally:
+        settings.AUTH_MODE = original_mode
+
+if __name__ == "__main__":
+    main()
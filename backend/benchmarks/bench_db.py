@@ -0,0 +1,78 @@
+"""
+Micro-benchmarks for the models/database.py helpers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_db --users 10000 --notifications 1000000
+"""
+import argparse
+import random
+import time
+from typing import Callable, Dict
+
+from benchmarks.bench_api import seed
+from benchmarks.harness import print_table, save_results
+from models import database
+
+def measure(name: str, fn: Callable[[], object], iterations: int) -> Dict:
+    """Time fn over iterations calls, reporting the per-call cost"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    return {
+        "name": name,
+        "iterations": iterations,
+        "total_s": round(elapsed, 4),
+        "per_call_us": round(elapsed / iterations * 1e6, 3),
+        "calls_per_s": round(iterations / elapsed)
+    }
+
+def benchmarks(users: int):
+    def user_id():
+        return f"user_{random.randint(1, users)}"
+
+    def email():
+        return f"bench{random.randint(1, users)}@example.com"
+
+    counter = iter(range(10 ** 9))
+
+    def notification_id():
+        return f"notif-{random.randint(1, max(1, len(database.db['notifications'])))}"
+
+    return [
+        ("get_user_by_email", lambda: database.get_user_by_email(email())),
+        ("get_user_by_id", lambda: database.get_user_by_id(user_id())),
+        ("create_user", lambda: database.create_user("micro", f"micro{next(counter)}@example.com", "password")),
+        ("create_session", lambda: database.create_session(user_id())),
+        ("get_user_credits", lambda: database.get_user_credits(user_id())),
+        ("add_credits", lambda: database.add_credits(user_id(), 5)),
+        ("consume_credits", lambda: database.consume_credits(user_id(), 1)),
+        ("get_credit_log", lambda: database.get_credit_log(user_id(), 20)),
+        ("add_notification", lambda: database.add_notification(user_id(), "Micro", "Benchmark")),
+        ("get_user_notifications", lambda: database.get_user_notifications(user_id(), 20)),
+        ("get_unread_count", lambda: database.get_unread_count(user_id())),
+        ("set_notification_read", lambda: database.set_notification_read(user_id(), notification_id())),
+        ("get_airdrop", lambda: database.get_airdrop("airdrop-001")),
+        ("query_airdrops", lambda: database.query_airdrops(status="active", sort="deadline", limit=20)),
+        ("connect_wallet", lambda: database.connect_wallet(user_id(), "0x" + "a" * 40)),
+        ("get_user_wallet", lambda: database.get_user_wallet(user_id())),
+        ("add_referral", lambda: database.add_referral(user_id(), "friend@example.com")),
+        ("get_referral_stats", lambda: database.get_referral_stats(user_id())),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--notifications", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/")
+    args = parser.parse_args()
+
+    seed(args.users, args.notifications)
+    results = [measure(name, fn, args.iterations) for name, fn in benchmarks(args.users)]
+    print_table(results, ["name", "iterations", "per_call_us", "calls_per_s"])
+    path = save_results("db", results, vars(args), args.output)
+    print(f"\nresults saved to {path}")
+
+if __name__ == "__main__":
+    main()
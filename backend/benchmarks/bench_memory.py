@@ -0,0 +1,101 @@
+"""
+Measure the memory each stored user, notification, wallet and session costs.
+
+"dict" is the layout the in-memory store used to keep: one dict per record with
+ISO timestamp strings. "record" is the slotted class from models/records.py that
+replaced it. Both are built from the same inputs, including a fresh user id string
+per record as a request would pass it, and measured with tracemalloc.
+
+Run from the backend directory:
+    python -m benchmarks.bench_memory --records 100000
+"""
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from benchmarks.harness import print_table, save_results
+from models.records import NotificationRecord, SessionRecord, UserRecord, WalletRecord, now
+
+def footprint(build: Callable[[int], object], count: int) -> float:
+    """Bytes allocated per record by build(count), counting only what it keeps alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(count)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / count
+
+def user_id(i: int) -> str:
+    return f"user_{i % 1000 + 1}"
+
+def layouts():
+    """(entity, layout, build) for every measured record type"""
+    created = datetime.now()
+    expires = created + timedelta(days=7)
+
+    return [
+        ("user", "dict", lambda n: [{
+            "id": f"user_{i}",
+            "username": f"bench{i}",
+            "email": f"bench{i}@example.com",
+            "password": "password",
+            "created_at": created.isoformat()
+        } for i in range(n)]),
+        ("user", "record", lambda n: [
+            UserRecord(f"user_{i}", f"bench{i}", f"bench{i}@example.com", "password", now()) for i in range(n)
+        ]),
+        ("notification", "dict", lambda n: [{
+            "id": f"notif-{i}",
+            "user_id": user_id(i),
+            "title": f"Notification {i}",
+            "message": "Seeded by benchmark",
+            "type": "info",
+            "read": False,
+            "timestamp": created.isoformat()
+        } for i in range(n)]),
+        ("notification", "record", lambda n: [
+            NotificationRecord(f"notif-{i}", user_id(i), f"Notification {i}", "Seeded by benchmark", "info", now())
+            for i in range(n)
+        ]),
+        ("wallet", "dict", lambda n: [{
+            "address": f"0x{i:040x}",
+            "connected_at": created.isoformat(),
+            "status": "connected"
+        } for i in range(n)]),
+        ("wallet", "record", lambda n: [WalletRecord(f"0x{i:040x}", now()) for i in range(n)]),
+        ("session", "dict", lambda n: [{
+            "user_id": user_id(i),
+            "expires_at": expires.isoformat()
+        } for i in range(n)]),
+        ("session", "record", lambda n: [SessionRecord(user_id(i), int(expires.timestamp())) for i in range(n)]),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100000, help="records built per layout")
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/")
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    baselines: Dict[str, float] = {}
+    for entity, layout, build in layouts():
+        per_record = footprint(build, args.records)
+        baseline = baselines.setdefault(entity, per_record)
+        results.append({
+            "name": f"{entity} [{layout}]",
+            "records": args.records,
+            "bytes_per_record": round(per_record, 1),
+            "reduction": f"{(1 - per_record / baseline) * 100:.0f}%"
+        })
+
+    print_table(results, ["name", "records", "bytes_per_record", "reduction"])
+    path = save_results("memory", results, vars(args), args.output)
+    print(f"\nresults saved to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Measure how throughput scales with the number of serve.py workers.
+
+For each worker count the benchmark starts serve.py on a local port, loads the
+credit and notification endpoints over real TCP connections from several client
+processes (so the client is not the bottleneck), and stops the server again.
+Throughput is the sum over client processes; latencies are their mean p50 and
+worst p99. "scaling" is the throughput relative to one worker.
+
+More than one worker needs shared state, so point it at MongoDB and use JWTs:
+    STORAGE_BACKEND=mongo MONGO_URI=mongodb://localhost:27017 AUTH_MODE=jwt JWT_SECRET=bench \\
+        python -m benchmarks.bench_scaling --workers 1,2,4,8
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.harness import print_table, report_failed, run_load, save_results, split_failed
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = [
+    ("GET /api/credit", "GET", "/api/credit", None),
+    ("POST /api/credit/buy", "POST", "/api/credit/buy", {"method": "offchain", "amount": 1}),
+    ("GET /api/notifications", "GET", "/api/notifications", None),
+    ("POST /api/notifications", "POST", "/api/notifications", {"title": "Bench", "message": "Benchmark notification"}),
+]
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = {**os.environ, "WORKERS": str(workers), "PORT": str(port), "HOST": "127.0.0.1"}
+    server = subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"serve.py exited:\n{server.stderr.read().decode()}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/ping").status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("serve.py did not become ready within 60s")
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+async def seed(base_url: str, users: int) -> List[str]:
+    """Bearer tokens of the benchmark users, signing them up on the first run"""
+    tokens = []
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for i in range(1, users + 1):
+            account = {"username": f"scale{i}", "email": f"scale{i}@example.com", "password": "password"}
+            response = await client.post("/api/auth/signup", json=account)
+            if response.status_code == 400:
+                response = await client.post("/api/auth/login", json=account)
+            response.raise_for_status()
+            tokens.append(response.json()["data"]["token"])
+    return tokens
+
+def client_process(base_url: str, endpoint: int, tokens: List[str], requests: int, concurrency: int) -> Dict:
+    name, method, path, body = ENDPOINTS[endpoint]
+
+    async def run() -> Dict:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            async def call(index: int) -> bool:
+                headers = {"Authorization": f"Bearer {random.choice(tokens)}"}
+                response = await client.request(method, path, headers=headers, json=body)
+                return response.status_code < 400
+            return await run_load(name, call, requests, concurrency)
+
+    return asyncio.run(run())
+
+def measure(pool, base_url: str, endpoint: int, tokens: List[str], args) -> Dict:
+    share = args.requests // args.clients
+    jobs = [(base_url, endpoint, tokens, share, args.concurrency) for _ in range(args.clients)]
+    parts = pool.starmap(client_process, jobs)
+    return {
+        "failed": any(part["failed"] for part in parts),
+        "requests": sum(part["requests"] for part in parts),
+        "errors": sum(part["errors"] for part in parts),
+        "throughput_rps": round(sum(part["throughput_rps"] for part in parts), 1),
+        "p50_ms": round(sum(part["p50_ms"] for part in parts) / len(parts), 3),
+        "p99_ms": max(part["p99_ms"] for part in parts)
+    }
+
+def default_workers() -> str:
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    return ",".join(map(str, counts))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=default_workers(), help="comma separated worker counts")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20000, help="measured requests per endpoint and worker count")
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1, help="load generating processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="connections per client process")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = []
+    baselines: Dict[str, float] = {}
+    with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+        for workers in map(int, args.workers.split(",")):
+            server = start_server(workers, args.port)
+            try:
+                tokens = asyncio.run(seed(base_url, args.users))
+                for endpoint, (name, *_) in enumerate(ENDPOINTS):
+                    result = {"name": f"{name} [{workers} workers]", "workers": workers}
+                    result.update(measure(pool, base_url, endpoint, tokens, args))
+                    if result["failed"]:
+                        results.append(result)
+                        print(f"{result['name']}: FAILED, {result['errors']} of {result['requests']} requests errored")
+                        continue
+                    baseline = baselines.setdefault(name, result["throughput_rps"])
+                    result["scaling"] = round(result["throughput_rps"] / baseline, 2) if baseline else 0.0
+                    results.append(result)
+                    print(f"{result['name']}: {result['throughput_rps']} req/s, x{result['scaling']}")
+            finally:
+                stop_server(server)
+
+    failed = split_failed(results)
+    print()
+    print_table(results, ["name", "requests", "errors", "throughput_rps", "p50_ms", "p99_ms", "scaling"])
+    path = save_results("scaling", results, vars(args), args.output)
+    print(f"\nresults saved to {path}")
+    report_failed(failed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Compare response serialization paths on the large list endpoints.
+
+"fastapi" is what a route declared with response_model=Dict used to cost: Dict
+validation, jsonable_encoder and stdlib json. "stdlib" and "orjson" are the two
+encoders behind core.responses.dumps, which generate_response now uses directly.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization --airdrops 1000 --notifications 100
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime
+from typing import Dict
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from benchmarks.bench_db import measure
+from benchmarks.harness import print_table, save_results
+from core import responses
+from core.security import issue_token
+from main import app
+from models.database import add_airdrop, add_notification, create_user
+
+ENDPOINTS = [
+    ("GET /api/airdrops", "/api/airdrops"),
+    ("GET /api/notifications", "/api/notifications"),
+    ("GET /api/twitter/history", "/api/twitter/history"),
+]
+
+def seed(airdrops: int, notifications: int) -> None:
+    create_user("bench", "bench@example.com", "password")
+    for i in range(airdrops):
+        add_airdrop({
+            "projectName": f"Project {i}",
+            "link": f"https://project{i}.example.com/airdrop",
+            "deadline": datetime.now().isoformat(),
+            "description": "Seeded by benchmark to make the airdrop list realistically large",
+            "chain": "Base",
+            "status": "active"
+        })
+    for i in range(notifications):
+        add_notification("user_1", f"Notification {i}", "Seeded by benchmark", "info")
+
+async def fetch_payloads(notifications: int) -> list:
+    """The data each endpoint returns, fetched through the app itself"""
+    payloads = []
+    headers = {"Authorization": f"Bearer {issue_token('user_1')['token']}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, path in ENDPOINTS:
+            response = await client.get(path, params={"limit": notifications}, headers=headers)
+            response.raise_for_status()
+            payloads.append((name, response.json()["data"]))
+    return payloads
+
+def serializers():
+    adapter = TypeAdapter(Dict)
+
+    def fastapi_default(data):
+        envelope = {"success": True, "message": "Success", "data": data, "timestamp": datetime.now().isoformat()}
+        content = jsonable_encoder(adapter.validate_python(envelope))
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+    def stdlib(data):
+        envelope = {"success": True, "message": "Success", "data": data, "timestamp": datetime.now()}
+        return json.dumps(envelope, ensure_ascii=False, separators=(",", ":"), default=responses._default).encode("utf-8")
+
+    def fast(data):
+        return responses.dumps({"success": True, "message": "Success", "data": data, "timestamp": datetime.now()})
+
+    result = [("fastapi", fastapi_default), ("stdlib", stdlib)]
+    if responses.orjson is not None:
+        result.append(("orjson", fast))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--airdrops", type=int, default=1000)
+    parser.add_argument("--notifications", type=int, default=100, help="notifications requested per call")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/")
+    args = parser.parse_args()
+
+    seed(args.airdrops, args.notifications)
+    payloads = asyncio.run(fetch_payloads(args.notifications))
+
+    results = []
+    for endpoint, data in payloads:
+        size = len(responses.dumps(data))
+        baseline = None
+        for serializer, encode in serializers():
+            result = measure(f"{endpoint} [{serializer}]", lambda: encode(data), args.iterations)
+            result["body_bytes"] = size
+            baseline = baseline or result["per_call_us"]
+            result["speedup"] = round(baseline / result["per_call_us"], 2)
+            results.append(result)
+
+    print_table(results, ["name", "body_bytes", "per_call_us", "calls_per_s", "speedup"])
+    path = save_results("serialization", results, vars(args), args.output)
+    print(f"\nresults saved to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare two benchmark result files, e.g. from two commits.
+
+Run from the backend directory:
+    python -m benchmarks.compare benchmarks/results/api-old.json benchmarks/results/api-new.json
+"""
+import argparse
+import json
+
+from benchmarks.harness import print_table
+
+# Metric compared per suite and whether lower values are better
+METRICS = {
+    "api": [("throughput_rps", False), ("p50_ms", True), ("p99_ms", True)],
+    "db": [("per_call_us", True)],
+    "serialization": [("per_call_us", True)],
+    "memory": [("bytes_per_record", True)],
+    "scaling": [("throughput_rps", False), ("p99_ms", True)]
+}
+
+def change(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    metrics = METRICS.get(candidate["suite"], [])
+    old_results = {r["name"]: r for r in baseline["results"]}
+    rows = []
+    regressions = 0
+    for new in candidate["results"]:
+        old = old_results.get(new["name"])
+        if old is None:
+            continue
+        row = {"name": new["name"]}
+        for metric, lower_is_better in metrics:
+            row[metric] = f"{old[metric]} -> {new[metric]} ({change(old[metric], new[metric])})"
+            if old[metric]:
+                delta = (new[metric] - old[metric]) / old[metric] * 100
+                if (delta if lower_is_better else -delta) > args.threshold:
+                    regressions += 1
+                    row["regression"] = "yes"
+        rows.append(row)
+
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+    print_table(rows, ["name"] + [m for m, _ in metrics] + ["regression"])
+    if regressions:
+        raise SystemExit(f"{regressions} metric(s) regressed by more than {args.threshold}%")
+
+if __name__ == "__main__":
+    main()
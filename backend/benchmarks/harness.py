@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(name: str, latencies: List[float], errors: int, elapsed: float) -> Dict:
+    """Throughput and latency percentiles (in milliseconds) of one benchmark"""
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "name": name,
+        "requests": count,
+        "errors": errors,
+        # Latencies of failed requests (e.g. fast 401s) say nothing about the endpoint
+        "failed": errors > 0,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if count else 0.0
+    }
+
+async def run_load(name: str, call: Callable[[int], Awaitable[bool]], requests: int, concurrency: int) -> Dict:
+    """
+    Issue requests calls of call(i) from concurrency workers.
+
+    call returns whether the request succeeded; latency is recorded either way,
+    and any error marks the whole result as failed.
+    """
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                ok = await call(index)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    return summarize(name, latencies, errors, time.perf_counter() - start)
+
+def split_failed(results: List[Dict]) -> List[Dict]:
+    """Remove failed results from results in place and return them"""
+    failed = [result for result in results if result.get("failed")]
+    results[:] = [result for result in results if not result.get("failed")]
+    return failed
+
+def report_failed(failed: List[Dict]) -> None:
+    """Exit non-zero naming the failed scenarios, if any"""
+    if failed:
+        names = ", ".join(f"{result['name']} ({result['errors']} errors)" for result in failed)
+        raise SystemExit(f"\nfailed, not saved: {names}")
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(suite: str, results: List[Dict], params: Dict, output: Optional[str] = None) -> str:
+    """Write results with enough metadata to compare runs across commits"""
+    commit = git_commit()
+    report = {
+        "suite": suite,
+        "commit": commit,
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "results": results
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{suite}-{stamp}-{commit or 'nocommit'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    return output
+
+def print_table(results: List[Dict], columns: List[str]) -> None:
+    if not results:
+        return
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in results)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for result in results:
+        print("  ".join(str(result.get(c, "")).ljust(widths[c]) for c in columns))
@@ -1,5 +1,7 @@
 
 import os
+import json
+import tempfile
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
@@ -11,6 +13,16 @@ class Settings(BaseModel):
     API_V1_STR: str = "/api"
     PROJECT_NAME: str = "Scryptex"
     
+    # Production server (serve.py); WORKERS=0 starts one worker per CPU core when
+    # state is shared (STORAGE_BACKEND=mongo, AUTH_MODE=jwt) and a single one otherwise
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", 8000))
+    WORKERS: int = int(os.getenv("WORKERS", 0))
+    # Held by the one worker that runs host-wide background jobs
+    SCHEDULER_LOCK_FILE: str = os.getenv(
+        "SCHEDULER_LOCK_FILE", os.path.join(tempfile.gettempdir(), "scryptex-scheduler.lock")
+    )
+    
     # CORS
     BACKEND_CORS_ORIGINS: list[str] = ["*"]
     
@@ -19,13 +31,112 @@ class Settings(BaseModel):
     TWITTER_BEARER_TOKEN: str = os.getenv("TWITTER_BEARER_TOKEN", "")
     
     # Database
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "memory")  # "memory" or "mongo"
     MONGO_URI: str = os.getenv("MONGO_URI", "")
+    MONGO_DB_NAME: str = os.getenv("MONGO_DB_NAME", "scryptex")
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    # Directory for the in-memory backend's write-ahead log and snapshots, empty to keep nothing across restarts
+    PERSISTENCE_DIR: str = os.getenv("PERSISTENCE_DIR", "")
+    PERSISTENCE_COMMIT_INTERVAL: float = float(os.getenv("PERSISTENCE_COMMIT_INTERVAL", 0.005))
+    PERSISTENCE_SNAPSHOT_INTERVAL: float = float(os.getenv("PERSISTENCE_SNAPSHOT_INTERVAL", 300))
+    
+    # Authentication: "session" tokens stored in memory, or stateless "jwt" tokens
+    AUTH_MODE: str = os.getenv("AUTH_MODE", "session")
+    # Development only: let requests without a token act as the user named by ?user_id=
+    AUTH_ALLOW_QUERY_USER_ID: bool = os.getenv("AUTH_ALLOW_QUERY_USER_ID", "false").lower() == "true"
     
     # JWT Token
     JWT_SECRET: str = os.getenv("JWT_SECRET", "")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
     
+    # Sessions
+    SESSION_EXPIRE_DAYS: int = int(os.getenv("SESSION_EXPIRE_DAYS", 30))
+    SESSION_SWEEP_INTERVAL: float = float(os.getenv("SESSION_SWEEP_INTERVAL", 60))
+    
+    # Observability
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    
+    # Rate limits per user as "<count>/<second|minute|hour|day>", keyed by "[METHOD ]<path prefix>"
+    RATE_LIMITS: dict[str, str] = json.loads(os.getenv("RATE_LIMITS", json.dumps({
+        "POST /api/analyze": "30/minute",
+        "POST /api/farming": "30/minute",
+        "POST /api/twitter": "30/minute",
+        "POST /api/jobs": "30/minute"
+    })))
+    # "memory" (per worker, at most RATE_LIMIT_MAX_KEYS clients) or "mongo" (shared, needs STORAGE_BACKEND=mongo)
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+    
+    # Artificial latency: "off" in production, "demo", "fixed:<s>", "uniform:<min>-<max>" or "normal:<mean>,<stddev>"
+    LATENCY_PROFILE: str = os.getenv("LATENCY_PROFILE", "off")
+    # Per-route profiles keyed by path prefix, e.g. {"/api/analyze": "uniform:0.5-1.5"}
+    LATENCY_ROUTE_OVERRIDES: dict[str, str] = json.loads(os.getenv("LATENCY_ROUTE_OVERRIDES", "{}"))
+    
+    # Analysis
+    ANALYZE_SECTION_TIMEOUT: float = float(os.getenv("ANALYZE_SECTION_TIMEOUT", 5))
+    ANALYSIS_CACHE_TTL: float = float(os.getenv("ANALYSIS_CACHE_TTL", 600))
+    ANALYSIS_CACHE_SECTION_TTLS: dict[str, float] = json.loads(os.getenv("ANALYSIS_CACHE_SECTION_TTLS", "{}"))
+    ANALYSIS_CACHE_MAX_BYTES: int = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+    # LLM summaries of the prose sections from any OpenAI-compatible API; raise ANALYZE_SECTION_TIMEOUT to match
+    LLM_ENABLED: bool = os.getenv("LLM_ENABLED", "false").lower() == "true"
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-4o-mini")
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", 60))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+    # Seconds a project's sections wait for each other to share one prompt
+    LLM_COALESCE_WINDOW: float = float(os.getenv("LLM_COALESCE_WINDOW", 0.05))
+    # Completions cached by prompt hash, empty to disable
+    LLM_CACHE_DIR: str = os.getenv("LLM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "scryptex-llm-cache"))
+    LLM_CACHE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    # Sections remembered with the fingerprint of their inputs, reused while the inputs are unchanged
+    ANALYSIS_SECTION_STORE_SIZE: int = int(os.getenv("ANALYSIS_SECTION_STORE_SIZE", 50000))
+    # Credits charged per analysed project (single, streamed, queued or batched),
+    # distinct projects and section fetches in flight per batch
+    ANALYZE_CREDIT_COST: int = int(os.getenv("ANALYZE_CREDIT_COST", 1))
+    ANALYZE_BATCH_MAX_PROJECTS: int = int(os.getenv("ANALYZE_BATCH_MAX_PROJECTS", 50))
+    ANALYZE_BATCH_CONCURRENCY: int = int(os.getenv("ANALYZE_BATCH_CONCURRENCY", 16))
+    
+    # Outbound fetches of project websites: pool size, concurrent requests per host, body cap and retries
+    FETCH_TIMEOUT: float = float(os.getenv("FETCH_TIMEOUT", 10))
+    FETCH_MAX_CONNECTIONS: int = int(os.getenv("FETCH_MAX_CONNECTIONS", 100))
+    FETCH_PER_HOST_CONNECTIONS: int = int(os.getenv("FETCH_PER_HOST_CONNECTIONS", 4))
+    FETCH_MAX_BYTES: int = int(os.getenv("FETCH_MAX_BYTES", 2 * 1024 * 1024))
+    FETCH_RETRIES: int = int(os.getenv("FETCH_RETRIES", 2))
+    FETCH_RETRY_BACKOFF: float = float(os.getenv("FETCH_RETRY_BACKOFF", 0.5))
+    # Responses kept to revalidate with ETag / Last-Modified
+    FETCH_CACHE_MAX_BYTES: int = int(os.getenv("FETCH_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+    FETCH_USER_AGENT: str = os.getenv("FETCH_USER_AGENT", "ScryptexBot/0.1 (+https://scryptex.io)")
+    
+    # Farming plans of projects outside the catalog kept in memory
+    FARMING_PLAN_CACHE_SIZE: int = int(os.getenv("FARMING_PLAN_CACHE_SIZE", 10000))
+    
+    # Background jobs: workers per job type, queued jobs per type, and how long finished jobs are kept
+    JOB_CONCURRENCY: dict[str, int] = json.loads(os.getenv("JOB_CONCURRENCY", json.dumps({
+        "analyze": 4,
+        "farming": 8,
+        "twitter": 8
+    })))
+    JOB_MAX_PENDING: int = int(os.getenv("JOB_MAX_PENDING", 1000))
+    JOB_RESULT_TTL: float = float(os.getenv("JOB_RESULT_TTL", 600))
+    JOB_MAX_RETAINED: int = int(os.getenv("JOB_MAX_RETAINED", 10000))
+    
+    # Credits
+    LEDGER_COMPACT_INTERVAL: float = float(os.getenv("LEDGER_COMPACT_INTERVAL", 300))
+    
+    # Notifications
+    BROADCAST_BATCH_SIZE: int = int(os.getenv("BROADCAST_BATCH_SIZE", 5000))
+    BROADCAST_MAX_PENDING: int = int(os.getenv("BROADCAST_MAX_PENDING", 100))
+    NOTIFICATION_STREAM_QUEUE_SIZE: int = int(os.getenv("NOTIFICATION_STREAM_QUEUE_SIZE", 100))
+    NOTIFICATION_STREAM_HEARTBEAT: float = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT", 15))
+    
+    # Airdrops
+    AIRDROP_REMINDER_HOURS: float = float(os.getenv("AIRDROP_REMINDER_HOURS", 24))
+    AIRDROP_SCHEDULER_BATCH_SIZE: int = int(os.getenv("AIRDROP_SCHEDULER_BATCH_SIZE", 1000))
+    # Seconds between reloads of every airdrop, 0 to rely on this process tracking its own additions
+    AIRDROP_SCHEDULER_REFRESH_INTERVAL: float = float(os.getenv("AIRDROP_SCHEDULER_REFRESH_INTERVAL", 0))
+    
     # Blockchain
     BLOCKCHAIN_RPC_URL: str = os.getenv("BLOCKCHAIN_RPC_URL", "")
 
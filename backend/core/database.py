@@ -7,14 +7,23 @@ class Database:
     
 async def connect_to_db():
     """Create database connection."""
-    Database.client = AsyncIOMotorClient(settings.MONGO_URI)
+    Database.client = AsyncIOMotorClient(
+        settings.MONGO_URI,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE
+    )
     
 async def close_db_connection():
     """Close database connection."""
     if Database.client:
         Database.client.close()
+        Database.client = None
+
+def get_database():
+    """Get the application database."""
+    return Database.client[settings.MONGO_DB_NAME]
 
 # Database collections
 def get_collection(collection_name: str):
     """Get a specific collection from the database."""
-    return Database.client.scryptex[collection_name]
+    return get_database()[collection_name]
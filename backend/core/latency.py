@@ -0,0 +1,82 @@
+import random
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from core.config import settings
+
+# Path of the request being served, only tracked when per-route overrides exist
+current_path: ContextVar[Optional[str]] = ContextVar("current_path", default=None)
+
+class LatencyProfile:
+    """
+    Artificial latency added by simulate_delay.
+
+    Specs are "off", "demo" (the range requested by the handler),
+    "fixed:<s>", "uniform:<min>-<max>" or "normal:<mean>,<stddev>".
+    """
+    __slots__ = ("kind", "a", "b")
+
+    def __init__(self, kind: str, a: float = 0.0, b: float = 0.0):
+        self.kind = kind
+        self.a = a
+        self.b = b
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyProfile":
+        kind, _, args = spec.strip().lower().partition(":")
+        if kind in ("off", "demo"):
+            return cls(kind)
+        if kind == "fixed":
+            return cls(kind, float(args))
+        if kind == "uniform":
+            low, _, high = args.partition("-")
+            return cls(kind, float(low), float(high))
+        if kind == "normal":
+            mean, _, stddev = args.partition(",")
+            return cls(kind, float(mean), float(stddev))
+        raise ValueError(f"Invalid latency profile: {spec}")
+
+    def sample(self, min_seconds: float, max_seconds: float) -> float:
+        if self.kind == "off":
+            return 0.0
+        if self.kind == "demo":
+            return random.uniform(min_seconds, max_seconds)
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return random.uniform(self.a, self.b)
+        return max(0.0, random.gauss(self.a, self.b))
+
+default_profile = LatencyProfile.parse(settings.LATENCY_PROFILE)
+route_profiles: Dict[str, LatencyProfile] = {
+    prefix: LatencyProfile.parse(spec) for prefix, spec in settings.LATENCY_ROUTE_OVERRIDES.items()
+}
+# Lets simulate_delay return before doing any work when latency is off everywhere
+enabled = default_profile.kind != "off" or any(p.kind != "off" for p in route_profiles.values())
+
+def profile_for(path: Optional[str]) -> LatencyProfile:
+    """Get the profile of the longest matching route prefix"""
+    if path and route_profiles:
+        match = max((prefix for prefix in route_profiles if path.startswith(prefix)), key=len, default=None)
+        if match is not None:
+            return route_profiles[match]
+    return default_profile
+
+def sample_delay(min_seconds: float, max_seconds: float) -> float:
+    """Get the delay to apply for the current request"""
+    return profile_for(current_path.get()).sample(min_seconds, max_seconds)
+
+class LatencyRouteMiddleware:
+    """Expose the request path to simulate_delay so route overrides apply"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = current_path.set(scope["path"])
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_path.reset(token)
@@ -0,0 +1,149 @@
+import inspect
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestTiming:
+    """Time spent in storage and serialization while serving one request"""
+    __slots__ = ("storage", "serialization")
+
+    def __init__(self):
+        self.storage = 0.0
+        self.serialization = 0.0
+
+request_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+class RouteStats:
+    __slots__ = ("buckets", "sum", "count", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.statuses: Dict[int, int] = {}
+
+class Metrics:
+    """In-process request metrics, exported in Prometheus text format"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route)
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = self.routes[key] = RouteStats()
+        stats.buckets[bisect_left(BUCKETS, seconds)] += 1
+        stats.sum += seconds
+        stats.count += 1
+        statuses = stats.statuses
+        statuses[status] = statuses.get(status, 0) + 1
+
+    def render(self, extra: Optional[List[str]] = None) -> str:
+        lines = [
+            "# HELP scryptex_http_requests_in_flight Requests currently being served.",
+            "# TYPE scryptex_http_requests_in_flight gauge",
+            f"scryptex_http_requests_in_flight {self.in_flight}",
+            "# HELP scryptex_http_request_duration_seconds Request latency by route.",
+            "# TYPE scryptex_http_request_duration_seconds histogram"
+        ]
+        for (method, route), stats in sorted(self.routes.items()):
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'scryptex_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'scryptex_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f"scryptex_http_request_duration_seconds_sum{{{labels}}} {stats.sum}")
+            lines.append(f"scryptex_http_request_duration_seconds_count{{{labels}}} {stats.count}")
+        lines.append("# HELP scryptex_http_responses_total Responses by route and status code.")
+        lines.append("# TYPE scryptex_http_responses_total counter")
+        for (method, route), stats in sorted(self.routes.items()):
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'scryptex_http_responses_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+        if extra:
+            lines.extend(extra)
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def record_storage(seconds: float) -> None:
+    timing = request_timing.get()
+    if timing is not None:
+        timing.storage += seconds
+
+def record_serialization(seconds: float) -> None:
+    timing = request_timing.get()
+    if timing is not None:
+        timing.serialization += seconds
+
+class TimedRepository:
+    """Proxy that charges the time spent in repository calls to the current request"""
+
+    def __init__(self, repository):
+        self._repository = repository
+
+    def __getattr__(self, name):
+        attribute = getattr(self._repository, name)
+        # Async generators are consumed by the caller and left untimed
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        async def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return await attribute(*args, **kwargs)
+            finally:
+                record_storage(perf_counter() - start)
+
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, name, timed)
+        return timed
+
+SERVER_TIMING = b"handler;dur=%.3f, serialization;dur=%.3f, storage;dur=%.3f"
+
+class MetricsMiddleware:
+    """Record per-route latency, status codes and in-flight requests, and add Server-Timing headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = perf_counter()
+        timing = RequestTiming()
+        token = request_timing.set(timing)
+        status = 500
+        metrics.in_flight += 1
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = perf_counter() - start
+                handler = max(0.0, elapsed - timing.storage - timing.serialization)
+                server_timing = SERVER_TIMING % (
+                    handler * 1000, timing.serialization * 1000, timing.storage * 1000
+                )
+                message["headers"] = list(message.get("headers", ())) + [(b"server-timing", server_timing)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.in_flight -= 1
+            request_timing.reset(token)
+            route = scope.get("route")
+            metrics.observe(
+                scope["method"],
+                getattr(route, "path_format", "unmatched"),
+                status,
+                perf_counter() - start
+            )
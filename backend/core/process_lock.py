@@ -0,0 +1,52 @@
+import asyncio
+import os
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class ProcessLock:
+    """
+    Non-blocking exclusive lock on a file, shared by the worker processes of one host.
+
+    Used to run a background job in only one worker. The OS releases the lock when
+    its holder exits, so another worker polling wait() takes over. Without fcntl
+    (Windows) there is a single process and the lock is always granted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Take the lock if no other process holds it"""
+        if self._fd is not None or fcntl is None:
+            self._fd = self._fd if fcntl is not None else -1
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    async def wait(self, poll_interval: float = 5.0) -> None:
+        """Wait until this process holds the lock"""
+        while not self.acquire():
+            await asyncio.sleep(poll_interval)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
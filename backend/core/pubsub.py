@@ -0,0 +1,104 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+from core.config import settings
+
+def notification_seq(notification_id: Optional[str]) -> int:
+    """Position of a notification id ("notif-N") in creation order, -1 if it has none"""
+    try:
+        return int(notification_id.rsplit("-", 1)[1])
+    except (AttributeError, IndexError, ValueError):
+        return -1
+
+class Subscription:
+    """One connection's bounded buffer of notifications waiting to be sent"""
+    __slots__ = ("user_id", "buffer", "waiter", "overflowed", "closed")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        # Created on first push so idle connections stay small
+        self.buffer: Optional[List[Dict]] = None
+        self.waiter: Optional[asyncio.Future] = None
+        self.overflowed = False
+        self.closed = False
+
+    @property
+    def active(self) -> bool:
+        return not (self.overflowed or self.closed)
+
+    def close(self) -> None:
+        """Stop the stream, e.g. once the client disconnected"""
+        self.closed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def push(self, notification: Dict, limit: int) -> None:
+        if not self.active:
+            return
+        if self.buffer is None:
+            self.buffer = []
+        if len(self.buffer) >= limit:
+            # The consumer fell behind; it reconnects and resumes from its last id
+            self.overflowed = True
+            self.buffer = None
+        else:
+            self.buffer.append(notification)
+        self._wake()
+
+    async def next(self, timeout: float) -> List[Dict]:
+        """Buffered notifications, waiting up to timeout for one; empty on timeout"""
+        if not self.buffer and self.active:
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self.waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.waiter = None
+        notifications, self.buffer = self.buffer or [], None
+        return notifications
+
+class NotificationHub:
+    """In-process pub/sub of new notifications to the connections of each user"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        # user_id -> open subscriptions, usually one
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        self.connections = 0
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id)
+        self._subscribers.setdefault(user_id, []).append(subscription)
+        self.connections += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions and subscription in subscriptions:
+            subscriptions.remove(subscription)
+            self.connections -= 1
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def publish(self, notification: Dict) -> None:
+        """Push a notification to every connection of its user"""
+        for subscription in self._subscribers.get(notification["user_id"], ()):
+            subscription.push(notification, self.queue_size)
+
+    def publish_broadcast(self, body: Dict, user_ids: Iterable[str]) -> None:
+        """Push a broadcast to the connected users among user_ids"""
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+        for user_id in user_ids:
+            subscriptions = subscribers.get(user_id)
+            if subscriptions:
+                notification = {**body, "user_id": user_id, "read": False}
+                for subscription in subscriptions:
+                    subscription.push(notification, self.queue_size)
+
+notification_hub = NotificationHub(settings.NOTIFICATION_STREAM_QUEUE_SIZE)
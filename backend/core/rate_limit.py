@@ -0,0 +1,175 @@
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from core.config import settings
+from core.responses import dumps
+from core.security import bearer_token, resolve_token
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+class RateLimit:
+    """A token bucket of capacity tokens refilled continuously over period seconds"""
+    __slots__ = ("capacity", "rate")
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimit":
+        """Parse "<count>/<second|minute|hour|day>", e.g. "30/minute\""""
+        count, _, period = spec.strip().lower().partition("/")
+        if period not in PERIODS or not count.isdigit() or int(count) < 1:
+            raise ValueError(f"Invalid rate limit: {spec}")
+        return cls(float(count), int(count) / PERIODS[period])
+
+class TokenBuckets:
+    """
+    In-process buckets in an LRU of at most max_keys keys.
+
+    Each decision is O(1). When full, the least recently used key is dropped; it
+    starts again with a full bucket, which only matters if it comes back before
+    its bucket would have refilled anyway.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> (tokens, time of last update)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str, limit: RateLimit, now: float) -> float:
+        """Take one token; 0 if granted, otherwise seconds until one is available"""
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            tokens = limit.capacity
+            if len(buckets) >= self.max_keys:
+                buckets.popitem(last=False)
+        else:
+            tokens = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.rate)
+            buckets.move_to_end(key)
+        if tokens >= 1:
+            buckets[key] = (tokens - 1, now)
+            return 0.0
+        buckets[key] = (tokens, now)
+        return (1 - tokens) / limit.rate
+
+class MongoTokenBuckets:
+    """
+    Buckets shared by every worker, one document per key updated atomically.
+
+    Documents expire once their bucket would be full again, so the collection
+    only holds recently limited keys.
+    """
+
+    def __init__(self, db):
+        self.collection = db["rate_limits"]
+
+    async def setup(self) -> None:
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def take(self, key: str, limit: RateLimit, now: float) -> float:
+        refilled = {"$min": [limit.capacity, {"$add": [
+            {"$ifNull": ["$tokens", limit.capacity]},
+            {"$multiply": [{"$max": [0, {"$subtract": [now, {"$ifNull": ["$last", now]}]}]}, limit.rate]}
+        ]}]}
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=limit.capacity / limit.rate)
+        update = [
+            {"$set": {"tokens": refilled, "last": now, "expires_at": expires_at}},
+            {"$set": {"granted": {"$gte": ["$tokens", 1]}}},
+            {"$set": {"tokens": {"$cond": ["$granted", {"$subtract": ["$tokens", 1]}, "$tokens"]}}}
+        ]
+        try:
+            bucket = await self._take(key, update)
+        except DuplicateKeyError:
+            # Another worker inserted the bucket between our lookup and upsert; it exists now
+            bucket = await self._take(key, update)
+        if bucket["granted"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / limit.rate
+
+    async def _take(self, key: str, update: List[Dict]) -> Dict:
+        return await self.collection.find_one_and_update(
+            {"_id": key}, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+
+class RateLimiter:
+    """Per-user limits on routes, matched by optional method and longest path prefix"""
+
+    def __init__(self, specs: Dict[str, str], store):
+        # (method or None, path prefix, rule name, limit), longest prefix first
+        self.rules: List[Tuple[Optional[str], str, str, RateLimit]] = []
+        for name, spec in specs.items():
+            method, _, prefix = name.rpartition(" ")
+            self.rules.append((method.upper() or None, prefix, name, RateLimit.parse(spec)))
+        self.rules.sort(key=lambda rule: len(rule[1]), reverse=True)
+        self.store = store
+        self.rejected = 0
+
+    def use(self, store) -> None:
+        self.store = store
+
+    def match(self, method: str, path: str) -> Optional[Tuple[str, RateLimit]]:
+        for rule_method, prefix, name, limit in self.rules:
+            if path.startswith(prefix) and (rule_method is None or rule_method == method):
+                return name, limit
+        return None
+
+    async def check(self, rule: Tuple[str, RateLimit], client: str, now: Optional[float] = None) -> float:
+        """0 if a request matching rule may proceed, otherwise seconds the client should wait"""
+        name, limit = rule
+        retry_after = await self.store.take(f"{name}|{client}", limit, time.time() if now is None else now)
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+def client_key(scope) -> str:
+    """Who a request counts against: the user of a verified token, otherwise its address"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            token = bearer_token(value.decode("latin-1"))
+            user_id = resolve_token(token) if token else None
+            if user_id:
+                return f"user:{user_id}"
+            break
+    # Never the user_id parameter: anyone can send one, and rotating it would reset the limit
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "ip:unknown"
+
+TOO_MANY_REQUESTS_BODY = dumps({"detail": "Rate limit exceeded"})
+
+class RateLimitMiddleware:
+    """Answer 429 with Retry-After once a client exceeds the limit of a route"""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        rule = self.limiter.match(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if rule is None:
+            return await self.app(scope, receive, send)
+        retry_after = await self.limiter.check(rule, client_key(scope))
+        if not retry_after:
+            return await self.app(scope, receive, send)
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(TOO_MANY_REQUESTS_BODY)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ]
+        })
+        await send({"type": "http.response.body", "body": TOO_MANY_REQUESTS_BODY})
+
+rate_limiter = RateLimiter(settings.RATE_LIMITS, TokenBuckets(settings.RATE_LIMIT_MAX_KEYS))
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from time import perf_counter
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from core.metrics import record_serialization
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value: Any) -> Any:
+    """Encode what the JSON encoder does not handle natively (models, sets, enums...)"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return jsonable_encoder(value)
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact UTF-8 JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+def loads(data: Any) -> Any:
+    """Decode JSON from bytes or any buffer, such as a memoryview of an mmap"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse backed by orjson that records how long encoding took"""
+
+    def render(self, content: Any) -> bytes:
+        start = perf_counter()
+        body = dumps(content)
+        record_serialization(perf_counter() - start)
+        return body
+
+class EventStreamResponse(Response):
+    """
+    Server-sent events response for long-lived, mostly idle streams.
+
+    Unlike StreamingResponse it keeps no task group per connection: a single task
+    reads the request messages until http.disconnect, and on_disconnect lets the
+    producer stop waiting.
+    """
+    media_type = "text/event-stream"
+
+    def __init__(self, content: AsyncIterator[bytes], on_disconnect: Optional[Callable[[], None]] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        self.body_iterator = content
+        self.on_disconnect = on_disconnect
+        self.status_code = 200
+        self.background = None
+        self.init_headers({"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})})
+
+    @staticmethod
+    async def _wait_for_disconnect(receive) -> None:
+        # The request body (empty for a GET) arrives first as http.request messages
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def __call__(self, scope, receive, send) -> None:
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        if self.on_disconnect is not None:
+            disconnected.add_done_callback(lambda _: self.on_disconnect())
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            async for chunk in self.body_iterator:
+                if disconnected.done():
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            if not disconnected.done():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            disconnected.cancel()
+            await self.body_iterator.aclose()
@@ -0,0 +1,136 @@
+import heapq
+import logging
+import secrets
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Header, HTTPException
+from jose import JWTError, jwt
+
+from core.config import settings
+from models.database import create_session, get_session, delete_session
+
+logger = logging.getLogger(__name__)
+
+if settings.AUTH_MODE == "jwt" and not settings.JWT_SECRET:
+    logger.warning("JWT_SECRET is not set, tokens will only be valid for this process")
+_jwt_secret = settings.JWT_SECRET or secrets.token_hex(32)
+if settings.AUTH_ALLOW_QUERY_USER_ID:
+    logger.warning("AUTH_ALLOW_QUERY_USER_ID is set, requests without a token act as any user they name")
+
+class RevocationList:
+    """Revoked token ids, kept only until the tokens would have expired anyway"""
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def add(self, jti: str, expires_at: float) -> None:
+        self.prune()
+        if expires_at > time.time() and jti not in self._revoked:
+            self._revoked[jti] = expires_at
+            heapq.heappush(self._expiry_heap, (expires_at, jti))
+
+    def prune(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, jti = heapq.heappop(self._expiry_heap)
+            self._revoked.pop(jti, None)
+
+revoked_tokens = RevocationList()
+
+# Recently verified tokens, so repeat requests skip signature verification
+VERIFIED_CACHE_SIZE = 10000
+_verified_tokens: "OrderedDict[str, Dict]" = OrderedDict()
+
+def create_access_token(user_id: str) -> Dict:
+    """Issue a signed access token for a user"""
+    now = datetime.utcnow()
+    expires = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = {
+        "sub": user_id,
+        "iat": now,
+        "exp": expires,
+        "jti": uuid.uuid4().hex
+    }
+    token = jwt.encode(claims, _jwt_secret, algorithm=settings.JWT_ALGORITHM)
+    return {"token": token, "user_id": user_id, "expires_at": expires.isoformat()}
+
+def decode_access_token(token: str) -> Optional[Dict]:
+    """Verify a signed access token and return its claims"""
+    claims = _verified_tokens.get(token)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, _jwt_secret, algorithms=[settings.JWT_ALGORITHM])
+        except JWTError:
+            return None
+        _verified_tokens[token] = claims
+        if len(_verified_tokens) > VERIFIED_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+    elif claims["exp"] <= time.time():
+        del _verified_tokens[token]
+        return None
+    if claims.get("jti") in revoked_tokens:
+        return None
+    return claims
+
+def issue_token(user_id: str) -> Dict:
+    """Issue a token using the configured auth mode"""
+    if settings.AUTH_MODE == "jwt":
+        return create_access_token(user_id)
+    return create_session(user_id)
+
+def resolve_token(token: str) -> Optional[str]:
+    """Get the user id a token was issued to, if it is still valid"""
+    if settings.AUTH_MODE == "jwt":
+        claims = decode_access_token(token)
+        return claims["sub"] if claims else None
+    session = get_session(token)
+    return session["user_id"] if session else None
+
+def revoke_token(token: str) -> None:
+    """Invalidate a token before it expires"""
+    if settings.AUTH_MODE == "jwt":
+        claims = decode_access_token(token)
+        if claims:
+            revoked_tokens.add(claims["jti"], claims["exp"])
+    else:
+        delete_session(token)
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Extract the token from an Authorization header"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
+
+async def get_current_user_id(
+    authorization: Optional[str] = Header(None),
+    user_id: str = "user_1"
+) -> str:
+    """
+    Resolve the calling user from a bearer token.
+
+    A token is required. Only when AUTH_ALLOW_QUERY_USER_ID is set, for local
+    development, do requests without one fall back to the user_id query parameter.
+    """
+    token = bearer_token(authorization)
+    if token:
+        token_user_id = resolve_token(token)
+        if not token_user_id:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        return token_user_id
+    if not settings.AUTH_ALLOW_QUERY_USER_ID:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user_id
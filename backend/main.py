@@ -1,17 +1,45 @@
 
+import asyncio
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response
 import uvicorn
 
 # Import all routers
-from routers import analyze, farming, twitter, credit, airdrop, auth, referral, notification
+from routers import analyze, farming, twitter, credit, airdrop, auth, referral, notification, jobs
+from core.config import settings
+from core.latency import LatencyRouteMiddleware, route_profiles
+from core.metrics import MetricsMiddleware, metrics
+from core.process_lock import ProcessLock
+from core.rate_limit import MongoTokenBuckets, RateLimitMiddleware, TokenBuckets, rate_limiter
+from core.responses import FastJSONResponse, dumps
+from core.database import connect_to_db, close_db_connection, get_database
+from models.database import db, replay, snapshot_records
+from models.persistence import persistence
+from models.repository import use_memory_repositories
+from models.mongo_repository import use_mongo_repositories
+from services.airdrop_lifecycle import airdrop_lifecycle
+from services.broadcast import broadcasts
+from services.cache import analysis_cache, section_store
+from services.fetcher import fetcher
+from services.llm import llm_client
+from services.jobs import job_queue
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Scryptex API",
     description="Backend API for Scryptex Web3 project",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=FastJSONResponse
 )
 
+# Added before CORS so CORS wraps it and browsers can read the 429s
+if rate_limiter.rules:
+    app.add_middleware(RateLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +49,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Track request paths only when some route has its own latency profile
+if route_profiles:
+    app.add_middleware(LatencyRouteMiddleware)
+
+# Record request metrics outside every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(analyze.router, prefix="/api", tags=["analyze"])
 app.include_router(farming.router, prefix="/api", tags=["farming"])
@@ -30,15 +66,110 @@ app.include_router(airdrop.router, prefix="/api", tags=["airdrop"])
 app.include_router(auth.router, prefix="/api", tags=["auth"])
 app.include_router(referral.router, prefix="/api", tags=["referral"])
 app.include_router(notification.router, prefix="/api", tags=["notification"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+
+@app.on_event("startup")
+async def connect_storage():
+    if settings.STORAGE_BACKEND == "mongo":
+        await connect_to_db()
+        await use_mongo_repositories(get_database())
+        if settings.RATE_LIMIT_BACKEND == "mongo":
+            buckets = MongoTokenBuckets(get_database())
+            await buckets.setup()
+            rate_limiter.use(buckets)
+    elif settings.PERSISTENCE_DIR:
+        replayed = persistence.open(settings.PERSISTENCE_DIR, replay)
+        logger.info("Restored %d records from %s", replayed, settings.PERSISTENCE_DIR)
+
+@app.on_event("shutdown")
+async def disconnect_storage():
+    if settings.STORAGE_BACKEND == "mongo":
+        await close_db_connection()
+        use_memory_repositories()
+        rate_limiter.use(TokenBuckets(settings.RATE_LIMIT_MAX_KEYS))
+    elif persistence.enabled:
+        await persistence.close(snapshot_records)
+
+background_tasks = []
+# With several workers, only the holder runs the airdrop scheduler
+scheduler_lock = ProcessLock(settings.SCHEDULER_LOCK_FILE)
+
+async def run_airdrop_lifecycle_when_leader():
+    await scheduler_lock.wait()
+    await airdrop_lifecycle.load()
+    await airdrop_lifecycle.run_forever()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    background_tasks.append(
+        asyncio.create_task(db["sessions"].sweep_forever(settings.SESSION_SWEEP_INTERVAL))
+    )
+    background_tasks.append(
+        asyncio.create_task(db["credits"].compact_forever(settings.LEDGER_COMPACT_INTERVAL))
+    )
+    background_tasks.append(asyncio.create_task(broadcasts.run_forever()))
+    background_tasks.append(asyncio.create_task(job_queue.run_forever()))
+    if persistence.enabled:
+        background_tasks.append(asyncio.create_task(persistence.run_forever(snapshot_records)))
+    if scheduler_lock.acquire():
+        await airdrop_lifecycle.load()
+        background_tasks.append(asyncio.create_task(airdrop_lifecycle.run_forever()))
+    else:
+        background_tasks.append(asyncio.create_task(run_airdrop_lifecycle_when_leader()))
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    scheduler_lock.release()
+    await fetcher.close()
+    await llm_client.close()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    cache_stats = analysis_cache.stats()
+    extra_metrics = []
+    for name in ("hits", "misses", "evictions", "expirations", "coalesced"):
+        extra_metrics.append(f"# TYPE scryptex_analysis_cache_{name}_total counter")
+        extra_metrics.append(f"scryptex_analysis_cache_{name}_total {cache_stats[name]}")
+    for name in ("entries", "size_bytes", "inflight"):
+        extra_metrics.append(f"# TYPE scryptex_analysis_cache_{name} gauge")
+        extra_metrics.append(f"scryptex_analysis_cache_{name} {cache_stats[name]}")
+    section_stats = section_store.stats()
+    for name in ("reused", "computed"):
+        extra_metrics.append(f"# TYPE scryptex_analysis_sections_{name}_total counter")
+        extra_metrics.append(f"scryptex_analysis_sections_{name}_total {section_stats[name]}")
+    extra_metrics.append("# TYPE scryptex_rate_limited_total counter")
+    extra_metrics.append(f"scryptex_rate_limited_total {rate_limiter.rejected}")
+    fetch_stats = fetcher.stats()
+    for name in ("requests", "retries", "revalidated", "errors"):
+        extra_metrics.append(f"# TYPE scryptex_fetch_{name}_total counter")
+        extra_metrics.append(f"scryptex_fetch_{name}_total {fetch_stats[name]}")
+    llm_stats = llm_client.stats()
+    for name in ("requests", "coalesced", "errors", "cache_hits", "cache_misses"):
+        extra_metrics.append(f"# TYPE scryptex_llm_{name}_total counter")
+        extra_metrics.append(f"scryptex_llm_{name}_total {llm_stats[name]}")
+    job_stats = job_queue.stats()
+    for name in ("queued", "running"):
+        extra_metrics.append(f"# TYPE scryptex_jobs_{name} gauge")
+        for type, stats in job_stats.items():
+            extra_metrics.append(f'scryptex_jobs_{name}{{type="{type}"}} {stats[name]}')
+    return metrics.render(extra_metrics)
+
+# Static payloads are encoded once instead of on every request
+PING_BODY = dumps({"status": "ok"})
+ROOT_BODY = dumps({"message": "Welcome to Scryptex API"})
 
 # Test route
 @app.get("/api/ping")
 async def ping():
-    return {"status": "ok"}
+    return Response(PING_BODY, media_type="application/json")
 
 @app.get("/")
 async def root():
-    return {"message": "Welcome to Scryptex API"}
+    return Response(ROOT_BODY, media_type="application/json")
 
+# Development server; use serve.py in production
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
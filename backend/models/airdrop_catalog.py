@@ -0,0 +1,204 @@
+import base64
+import json
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Fields with a secondary index; filters on them only visit matching airdrops
+INDEXED_FIELDS = ("status", "chain")
+# An index per combination, so filtering on several fields needs no per-airdrop checks
+INDEX_COMBINATIONS = [
+    fields for size in range(1, len(INDEXED_FIELDS) + 1) for fields in combinations(INDEXED_FIELDS, size)
+]
+SORTS = ("created", "deadline")
+# Most airdrops one query skips over before it returns a short page and a cursor to resume from
+MAX_SCAN = 1000
+
+def to_timestamp(value: Union[str, datetime]) -> float:
+    """Epoch seconds of an airdrop date (ISO string or datetime)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+def encode_cursor(sort: str, descending: bool, key: Iterable) -> str:
+    """Opaque cursor pointing just past key in the given ordering"""
+    raw = json.dumps([sort, descending, *key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> List:
+    """Key encoded in cursor; raises ValueError if it belongs to another ordering"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_descending, *key = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if cursor_sort != sort or cursor_descending != descending or not key:
+        raise ValueError("Cursor does not match the requested ordering")
+    return key
+
+class _Index:
+    """Keys of one set of airdrops in both sort orders"""
+    __slots__ = ("created", "deadline")
+
+    def __init__(self):
+        # (seq,) and (deadline, seq), kept sorted for bisecting
+        self.created: List[Tuple] = []
+        self.deadline: List[Tuple] = []
+
+    def __len__(self) -> int:
+        return len(self.created)
+
+    def add(self, seq: int, deadline: float) -> None:
+        key = (seq,)
+        if not self.created or self.created[-1] < key:
+            self.created.append(key)
+        else:
+            insort(self.created, key)
+        insort(self.deadline, (deadline, seq))
+
+    def remove(self, seq: int, deadline: float) -> None:
+        for keys, key in ((self.created, (seq,)), (self.deadline, (deadline, seq))):
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+class AirdropCatalog:
+    """Airdrops indexed by id, status, chain and deadline, with cursor pagination"""
+
+    def __init__(self, airdrops: Iterable[Dict] = ()):
+        # seq -> airdrop, seq being the insertion order
+        self._items: Dict[int, Dict] = {}
+        # airdrop id -> seq
+        self._ids: Dict[str, int] = {}
+        # seq -> deadline timestamp, as indexed
+        self._deadlines: Dict[int, float] = {}
+        self._all = _Index()
+        # ((field, value), ...) -> index of the airdrops with those values
+        self._indexes: Dict[Tuple, _Index] = {}
+        self._seq = 0
+        for airdrop in airdrops:
+            self.add(airdrop)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for (seq,) in self._all.created:
+            yield self._items[seq]
+
+    def next_id(self) -> str:
+        """Id the next added airdrop should get"""
+        return f"airdrop-{self._seq + 1:03d}"
+
+    def add(self, airdrop: Dict) -> Dict:
+        """Index an airdrop that already carries its id"""
+        self._seq += 1
+        seq = self._seq
+        deadline = to_timestamp(airdrop["deadline"])
+        self._items[seq] = airdrop
+        self._ids[airdrop["id"]] = seq
+        self._deadlines[seq] = deadline
+        self._all.add(seq, deadline)
+        for fields in INDEX_COMBINATIONS:
+            self._index(airdrop, fields).add(seq, deadline)
+        return airdrop
+
+    def get(self, airdrop_id: str) -> Optional[Dict]:
+        seq = self._ids.get(airdrop_id)
+        return self._items[seq] if seq is not None else None
+
+    def update(self, airdrop_id: str, **fields) -> Optional[Dict]:
+        """Change fields of an airdrop, moving it between indexes as needed"""
+        seq = self._ids.get(airdrop_id)
+        if seq is None:
+            return None
+        airdrop = self._items[seq]
+        old_deadline = self._deadlines[seq]
+        new_deadline = to_timestamp(fields["deadline"]) if "deadline" in fields else old_deadline
+
+        updated = {**airdrop, **fields}
+        if new_deadline != old_deadline:
+            self._all.remove(seq, old_deadline)
+            self._all.add(seq, new_deadline)
+            self._deadlines[seq] = new_deadline
+        for combination in INDEX_COMBINATIONS:
+            if new_deadline != old_deadline or any(updated.get(f) != airdrop.get(f) for f in combination):
+                self._index(airdrop, combination).remove(seq, old_deadline)
+                self._index(updated, combination).add(seq, new_deadline)
+        airdrop.update(fields)
+        return airdrop
+
+    def count(self, **filters) -> int:
+        """Number of airdrops with the given indexed field values"""
+        if not filters:
+            return len(self._items)
+        index = self._indexes.get(tuple((f, filters[f]) for f in INDEXED_FIELDS if f in filters))
+        return len(index) if index else 0
+
+    def query(self, status: Optional[str] = None, chain: Optional[str] = None,
+              deadline_from: Optional[datetime] = None, deadline_to: Optional[datetime] = None,
+              sort: str = "created", descending: bool = False, limit: int = 20,
+              cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of airdrops matching every given filter, plus the cursor of the next page.
+
+        The index for the filtered combination is walked in the requested order,
+        so cost grows with the page, not the catalog. A deadline range on the
+        created order is served from the deadline index when at most MAX_SCAN
+        airdrops fall in it; otherwise the walk skips at most MAX_SCAN airdrops
+        and may return a short, even empty, page whose cursor resumes the walk.
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        filters = tuple((field, value) for field, value in (("status", status), ("chain", chain)) if value)
+        index = self._indexes.get(filters) if filters else self._all
+        if index is None:
+            return [], None
+        keys = index.created if sort == "created" else index.deadline
+        low = to_timestamp(deadline_from) if deadline_from else float("-inf")
+        high = to_timestamp(deadline_to) if deadline_to else float("inf")
+        if sort == "created" and (deadline_from or deadline_to):
+            first = bisect_left(index.deadline, (low,))
+            last = bisect_right(index.deadline, (high, float("inf")))
+            if last - first <= MAX_SCAN:
+                # Few airdrops in range: put just those in created order
+                keys = sorted((seq,) for _, seq in index.deadline[first:last])
+
+        if descending:
+            end = bisect_left(keys, tuple(decode_cursor(cursor, sort, descending))) if cursor else len(keys)
+            if sort == "deadline":
+                end = min(end, bisect_right(keys, (high, float("inf"))))
+            positions = range(end - 1, -1, -1)
+        else:
+            start = bisect_right(keys, tuple(decode_cursor(cursor, sort, descending))) if cursor else 0
+            if sort == "deadline":
+                start = max(start, bisect_left(keys, (low,)))
+            positions = range(start, len(keys))
+
+        page: List[Dict] = []
+        last_key = None
+        skipped = 0
+        for position in positions:
+            key = keys[position]
+            seq = key[-1]
+            deadline = self._deadlines[seq]
+            if not low <= deadline <= high:
+                if sort == "deadline":
+                    break
+                skipped += 1
+                if skipped == MAX_SCAN:
+                    return page, encode_cursor(sort, descending, key)
+                continue
+            if len(page) == limit:
+                return page, encode_cursor(sort, descending, last_key)
+            page.append(self._items[seq])
+            last_key = key
+        return page, None
+
+    def _index(self, airdrop: Dict, fields: Tuple[str, ...]) -> _Index:
+        key = tuple((field, airdrop.get(field)) for field in fields)
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = _Index()
+        return index
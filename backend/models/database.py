@@ -1,16 +1,27 @@
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import random
+import secrets
+
+from core.config import settings
+from core.pubsub import notification_hub
+from models.airdrop_catalog import AirdropCatalog
+from models.ledger import CreditLedger, InsufficientCredits, LedgerEntry
+from models.notification_store import NotificationStore
+from models.persistence import persistence
+from models.records import NotificationRecord, UserRecord, WalletRecord, now
+from models.session_store import SessionStore
 
 # In-memory database
 db = {
     "users": {},
-    "credits": {},
+    "users_by_id": {},
+    "credits": CreditLedger(),
     "referrals": {},
-    "airdrops": [],
-    "notifications": [],
-    "sessions": {},
+    "airdrops": AirdropCatalog(),
+    "notifications": NotificationStore(),
+    "sessions": SessionStore(),
     "wallets": {},
     "projects": {
         "Arbitrum": {
@@ -114,116 +125,242 @@ default_airdrops = [
         "projectName": "ZkSync",
         "link": "https://zksync.io/airdrop",
         "deadline": (datetime.now() + timedelta(days=60)).isoformat(),
+        "startDate": (datetime.now() + timedelta(days=7)).isoformat(),
         "description": "Interact with zkSync Era to potentially receive tokens",
         "chain": "ZkSync Era",
         "status": "upcoming"
     }
 ]
 
+REFERRAL_REWARD = 10
+
 # Populate initial data
-db["airdrops"] = default_airdrops
+db["airdrops"] = AirdropCatalog(default_airdrops)
 
 def get_user_by_email(email: str) -> Optional[Dict]:
     """Get a user by email"""
-    return db["users"].get(email)
+    user = db["users"].get(email)
+    return user.to_dict() if user else None
 
 def create_user(username: str, email: str, password: str) -> Dict:
     """Create a new user"""
-    user_id = f"user_{len(db['users']) + 1}"
-    user = {
-        "id": user_id,
-        "username": username,
-        "email": email,
-        "password": password,  # In real app, this would be hashed
-        "created_at": datetime.now().isoformat()
-    }
+    # In real app, the password would be hashed
+    user = UserRecord(f"user_{len(db['users']) + 1}", username, email, password, now())
     db["users"][email] = user
-    # Initialize credits for new user
-    db["credits"][user_id] = 20
+    db["users_by_id"][user.id] = user
     # Initialize referral code
-    referral_code = f"{username.lower()}{random.randint(1000, 9999)}"
-    db["referrals"][user_id] = {
+    referral = init_referral(user.id, username)
+    persistence.log("user", user.id, username, email, password, user.created_at, referral["code"])
+    # Initialize credits for new user
+    apply_credits(user.id, "bonus", 20, "Signup bonus")
+    return user.to_dict()
+
+def make_referral(username: str, referral_code: Optional[str] = None) -> Dict:
+    """Referral stats of a new user, under a fresh code unless one is given"""
+    referral_code = referral_code or f"{username.lower()}{random.randint(1000, 9999)}"
+    return {
         "code": referral_code,
         "link": f"https://scryptex.io/refer?code={referral_code}",
         "invites": 0,
         "earned_credits": 0
     }
-    return user
+
+def init_referral(user_id: str, username: str, referral_code: Optional[str] = None) -> Dict:
+    """Create the referral code of a new user"""
+    db["referrals"][user_id] = make_referral(username, referral_code)
+    return db["referrals"][user_id]
+
+def get_user_ids() -> List[str]:
+    """Get the id of every user"""
+    return list(db["users_by_id"])
+
+def get_user_by_id(user_id: str) -> Optional[Dict]:
+    """Get a user by id"""
+    user = db["users_by_id"].get(user_id)
+    return user.to_dict() if user else None
+
+def create_session(user_id: str) -> Dict:
+    """Create a session token for a user"""
+    token = secrets.token_hex(32)
+    expires = datetime.now() + timedelta(days=settings.SESSION_EXPIRE_DAYS)
+    session = db["sessions"].create(token, user_id, expires)
+    return {"token": token, **session.to_dict()}
+
+def get_session(token: str) -> Optional[Dict]:
+    """Get an unexpired session by token"""
+    session = db["sessions"].get(token)
+    return session.to_dict() if session else None
+
+def delete_session(token: str) -> bool:
+    """Invalidate a session token"""
+    return db["sessions"].delete(token)
 
 def get_user_credits(user_id: str) -> int:
     """Get user credits"""
-    return db["credits"].get(user_id, 0)
+    return db["credits"].balance(user_id)
+
+def apply_credits(user_id: str, kind: str, amount: int, description: str = "",
+                  idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> LedgerEntry:
+    """Apply a signed credit change, logging the resulting entry unless it is a retry"""
+    ledger = db["credits"]
+    last_seq = ledger.last_seq
+    entry = ledger.apply(user_id, kind, amount, description, idempotency_key, fingerprint)
+    if entry.seq > last_seq:
+        persistence.log("credit", *credit_row(entry))
+    return entry
+
+def credit_row(entry: LedgerEntry) -> List:
+    return [entry.seq, entry.user_id, entry.kind, entry.amount, entry.balance,
+            entry.description, entry.timestamp, entry.idempotency_key, entry.fingerprint]
 
-def add_credits(user_id: str, amount: int) -> int:
+def add_credits(user_id: str, amount: int, kind: str = "buy", description: str = "",
+                idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> int:
     """Add credits to user account"""
-    if user_id not in db["credits"]:
-        db["credits"][user_id] = 0
-    db["credits"][user_id] += amount
-    return db["credits"][user_id]
+    return apply_credits(user_id, kind, amount, description, idempotency_key, fingerprint).balance
 
-def consume_credits(user_id: str, amount: int) -> bool:
+def consume_credits(user_id: str, amount: int, description: str = "",
+                    idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> bool:
     """Consume credits from user account"""
-    if user_id not in db["credits"] or db["credits"][user_id] < amount:
+    try:
+        apply_credits(user_id, "consume", -amount, description, idempotency_key, fingerprint)
+    except InsufficientCredits:
         return False
-    db["credits"][user_id] -= amount
     return True
 
+def has_purchased_credits(user_id: str) -> bool:
+    """Whether the user ever bought credits"""
+    return db["credits"].has_purchased(user_id)
+
+def find_credit_transaction(user_id: str, idempotency_key: str) -> Optional[LedgerEntry]:
+    """Get a credit transaction previously recorded under an idempotency key"""
+    return db["credits"].find(user_id, idempotency_key)
+
+def get_credit_log(user_id: str, limit: int = 20) -> List[Dict]:
+    """Get the latest credit transactions of a user"""
+    return [entry.to_dict() for entry in db["credits"].history(user_id, limit)]
+
 def add_notification(user_id: str, title: str, message: str, type: str = "info") -> Dict:
     """Add a notification"""
-    notification = {
-        "id": f"notif-{len(db['notifications']) + 1}",
-        "user_id": user_id,
-        "title": title,
-        "message": message,
-        "type": type,
-        "read": False,
-        "timestamp": datetime.now().isoformat()
-    }
-    db["notifications"].append(notification)
+    store = db["notifications"]
+    record = store.append(NotificationRecord(store.next_id(), user_id, title, message, type, now()))
+    persistence.log("notification", *notification_row(record))
+    notification = record.to_dict()
+    notification_hub.publish(notification)
     return notification
 
+def broadcast_body(record: NotificationRecord) -> Dict:
+    """The JSON shape of a stored broadcast body"""
+    body = record.to_dict()
+    del body["user_id"], body["read"]
+    return body
+
+def notification_row(record: NotificationRecord) -> List:
+    return [record.id, record.user_id, record.title, record.message, record.type, record.timestamp, record.read]
+
+def add_broadcast(title: str, message: str, type: str = "info") -> Dict:
+    """Store a notification body shared by many users"""
+    store = db["notifications"]
+    body = store.add_broadcast(NotificationRecord(store.next_id(), None, title, message, type, now()))
+    persistence.log("broadcast", body.id, body.title, body.message, body.type, body.timestamp)
+    return broadcast_body(body)
+
+def deliver_broadcast(broadcast_id: str, user_ids: List[str]) -> int:
+    """Add a broadcast to the notifications of each user"""
+    store = db["notifications"]
+    body = store.get_broadcast(broadcast_id)
+    if body is None:
+        return 0
+    delivered = store.deliver(broadcast_id, user_ids)
+    if delivered:
+        persistence.log("deliver", broadcast_id, user_ids)
+    notification_hub.publish_broadcast(broadcast_body(body), user_ids)
+    return delivered
+
 def get_user_notifications(user_id: str, limit: int = 5) -> List[Dict]:
     """Get notifications for a user"""
-    user_notifications = [n for n in db["notifications"] if n["user_id"] == user_id]
-    return sorted(user_notifications, key=lambda x: x["timestamp"], reverse=True)[:limit]
+    return db["notifications"].latest(user_id, limit)
+
+def get_notification(user_id: str, notification_id: str) -> Optional[Dict]:
+    """Get a single notification owned by a user"""
+    return db["notifications"].get(notification_id, user_id)
+
+def set_notification_read(user_id: str, notification_id: str) -> Optional[Dict]:
+    """Mark a notification as read"""
+    notification = db["notifications"].mark_read(notification_id, user_id)
+    if notification is not None:
+        persistence.log("notification_read", user_id, notification_id)
+    return notification
+
+def mark_all_notifications_read(user_id: str) -> int:
+    """Mark all notifications of a user as read"""
+    count = db["notifications"].mark_all_read(user_id)
+    if count:
+        persistence.log("notifications_read", user_id)
+    return count
+
+def remove_notification(user_id: str, notification_id: str) -> Optional[Dict]:
+    """Delete a notification"""
+    notification = db["notifications"].delete(notification_id, user_id)
+    if notification is not None:
+        persistence.log("notification_delete", user_id, notification_id)
+    return notification
+
+def get_unread_count(user_id: str) -> int:
+    """Get the number of unread notifications for a user"""
+    return db["notifications"].unread_count(user_id)
 
 def add_airdrop(airdrop: Dict) -> Dict:
     """Add a new airdrop"""
-    airdrop_id = f"airdrop-{len(db['airdrops']) + 1:03d}"
-    airdrop["id"] = airdrop_id
-    db["airdrops"].append(airdrop)
+    catalog = db["airdrops"]
+    airdrop["id"] = catalog.next_id()
+    catalog.add(airdrop)
+    persistence.log("airdrop", airdrop)
     return airdrop
 
 def get_airdrops() -> List[Dict]:
     """Get all airdrops"""
-    return db["airdrops"]
+    return list(db["airdrops"])
+
+def get_airdrop(airdrop_id: str) -> Optional[Dict]:
+    """Get an airdrop by id"""
+    return db["airdrops"].get(airdrop_id)
+
+def update_airdrop(airdrop_id: str, **fields) -> Optional[Dict]:
+    """Update fields of an airdrop"""
+    airdrop = db["airdrops"].update(airdrop_id, **fields)
+    if airdrop is not None:
+        persistence.log("airdrop", airdrop)
+    return airdrop
+
+def query_airdrops(status: Optional[str] = None, chain: Optional[str] = None,
+                   deadline_from: Optional[datetime] = None, deadline_to: Optional[datetime] = None,
+                   sort: str = "created", descending: bool = False, limit: int = 20,
+                   cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """Get one page of airdrops matching the filters and the cursor of the next page"""
+    return db["airdrops"].query(status, chain, deadline_from, deadline_to, sort, descending, limit, cursor)
 
 def connect_wallet(user_id: str, wallet_address: str) -> Dict:
     """Connect wallet to user account"""
-    wallet = {
-        "address": wallet_address,
-        "connected_at": datetime.now().isoformat(),
-        "status": "connected"
-    }
+    wallet = WalletRecord(wallet_address, now())
     db["wallets"][user_id] = wallet
-    return wallet
+    persistence.log("wallet", user_id, wallet.address, wallet.connected_at, wallet.status)
+    return wallet.to_dict()
 
 def get_user_wallet(user_id: str) -> Optional[Dict]:
     """Get wallet for a user"""
-    return db["wallets"].get(user_id)
+    wallet = db["wallets"].get(user_id)
+    return wallet.to_dict() if wallet else None
 
 def add_referral(referrer_id: str, referee_email: str) -> bool:
-    """Process a referral"""
+    """Record a referral in the referrer's stats, the credit reward is granted by the caller"""
     if referrer_id not in db["referrals"]:
         return False
     
     # Increment invites
-    db["referrals"][referrer_id]["invites"] += 1
-    
-    # Add credits to referrer
-    credit_reward = 10
-    add_credits(referrer_id, credit_reward)
-    db["referrals"][referrer_id]["earned_credits"] += credit_reward
+    referral = db["referrals"][referrer_id]
+    referral["invites"] += 1
+    referral["earned_credits"] += REFERRAL_REWARD
+    persistence.log("referral", referrer_id, referral["invites"], referral["earned_credits"])
     
     return True
 
@@ -237,3 +374,72 @@ def get_referral_stats(user_id: str) -> Dict:
             "earned_credits": 0
         }
     return db["referrals"][user_id]
+
+def snapshot_records() -> Iterator[List]:
+    """The persisted state as log records, in an order replay accepts"""
+    for user in db["users_by_id"].values():
+        referral = db["referrals"].get(user.id, {})
+        yield ["user", user.id, user.username, user.email, user.password, user.created_at, referral.get("code")]
+        if referral.get("invites"):
+            yield ["referral", user.id, referral["invites"], referral["earned_credits"]]
+    for entry in db["credits"].entries():
+        yield ["credit", *credit_row(entry)]
+    for body in db["notifications"].broadcasts():
+        yield ["broadcast", body.id, body.title, body.message, body.type, body.timestamp]
+    for record in db["notifications"].records():
+        if isinstance(record, NotificationRecord):
+            yield ["notification", *notification_row(record)]
+        else:
+            user_id, broadcast_id, read = record
+            yield ["deliver", broadcast_id, [user_id]]
+            if read:
+                yield ["notification_read", user_id, broadcast_id]
+    for user_id, wallet in db["wallets"].items():
+        yield ["wallet", user_id, wallet.address, wallet.connected_at, wallet.status]
+    for airdrop in db["airdrops"]:
+        yield ["airdrop", dict(airdrop)]
+
+def replay(record: List) -> None:
+    """Apply a logged effect to the db without logging it again"""
+    kind, *row = record
+    if kind == "user":
+        user_id, username, email, password, created_at, referral_code = row
+        user = UserRecord(user_id, username, email, password, created_at)
+        db["users"][email] = user
+        db["users_by_id"][user.id] = user
+        init_referral(user.id, username, referral_code)
+    elif kind == "referral":
+        user_id, invites, earned_credits = row
+        db["referrals"][user_id].update(invites=invites, earned_credits=earned_credits)
+    elif kind == "credit":
+        db["credits"].restore(LedgerEntry(*row))
+    elif kind == "notification":
+        notification_id, user_id, title, message, type, timestamp, read = row
+        db["notifications"].restore(NotificationRecord(notification_id, user_id, title, message, type, timestamp, read))
+    elif kind == "broadcast":
+        broadcast_id, title, message, type, timestamp = row
+        db["notifications"].restore_broadcast(NotificationRecord(broadcast_id, None, title, message, type, timestamp))
+    elif kind == "deliver":
+        broadcast_id, user_ids = row
+        db["notifications"].deliver(broadcast_id, user_ids)
+    elif kind == "notification_read":
+        user_id, notification_id = row
+        db["notifications"].mark_read(notification_id, user_id)
+    elif kind == "notifications_read":
+        user_id, = row
+        db["notifications"].mark_all_read(user_id)
+    elif kind == "notification_delete":
+        user_id, notification_id = row
+        db["notifications"].delete(notification_id, user_id)
+    elif kind == "wallet":
+        user_id, address, connected_at, status = row
+        db["wallets"][user_id] = WalletRecord(address, connected_at, status)
+    elif kind == "airdrop":
+        airdrop, = row
+        catalog = db["airdrops"]
+        if catalog.get(airdrop["id"]) is None:
+            catalog.add(airdrop)
+        else:
+            catalog.update(airdrop["id"], **airdrop)
+    else:
+        raise ValueError(f"Unknown log record: {kind}")
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class InsufficientCredits(Exception):
+    pass
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a request with a different fingerprint"""
+
+class LedgerEntry:
+    __slots__ = ("seq", "user_id", "kind", "amount", "balance", "description", "timestamp", "idempotency_key",
+                 "fingerprint")
+
+    def __init__(self, seq: int, user_id: str, kind: str, amount: int, balance: int,
+                 description: str, timestamp: float, idempotency_key: Optional[str] = None,
+                 fingerprint: Optional[str] = None):
+        self.seq = seq
+        self.user_id = user_id
+        self.kind = kind
+        self.amount = amount
+        self.balance = balance
+        self.description = description
+        self.timestamp = timestamp
+        self.idempotency_key = idempotency_key
+        # Hash of the request that used idempotency_key, to tell a retry from a reused key
+        self.fingerprint = fingerprint
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.seq,
+            "action": self.kind,
+            "amount": self.amount,
+            "balance": self.balance,
+            "description": self.description,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+class CreditLedger:
+    """
+    Append-only credit journal with per-user balance snapshots.
+
+    Every method is synchronous, so a check-then-apply can never interleave
+    with another coroutine and no lock is needed under asyncio.
+    """
+
+    def __init__(self, max_entries_per_user: int = 200, max_idempotency_keys: int = 100000):
+        self.max_entries_per_user = max_entries_per_user
+        self.max_idempotency_keys = max_idempotency_keys
+        self._balances: Dict[str, int] = {}
+        self._journals: Dict[str, List[LedgerEntry]] = {}
+        self._idempotency: "OrderedDict[Tuple[str, str], LedgerEntry]" = OrderedDict()
+        self._needs_compaction = set()
+        # Users with at least one purchase, which compaction would otherwise fold away
+        self._purchasers = set()
+        self._seq = 0
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._balances
+
+    def balance(self, user_id: str) -> int:
+        """Get the current balance of a user"""
+        return self._balances.get(user_id, 0)
+
+    def has_purchased(self, user_id: str) -> bool:
+        """Whether the user ever bought credits"""
+        return user_id in self._purchasers
+
+    def find(self, user_id: str, idempotency_key: str) -> Optional[LedgerEntry]:
+        """Get the entry previously recorded under an idempotency key"""
+        return self._idempotency.get((user_id, idempotency_key))
+
+    def apply(self, user_id: str, kind: str, amount: int, description: str = "",
+              idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> LedgerEntry:
+        """
+        Record a signed credit change and update the balance snapshot.
+
+        Retries carrying an already used idempotency key return the
+        original entry without applying the change again. When a fingerprint
+        is given, a key first used with a different one raises
+        IdempotencyConflict instead.
+        """
+        if idempotency_key is not None:
+            previous = self._idempotency.get((user_id, idempotency_key))
+            if previous is not None:
+                if fingerprint is not None and previous.fingerprint != fingerprint:
+                    raise IdempotencyConflict(idempotency_key)
+                return previous
+        balance = self._balances.get(user_id, 0) + amount
+        if balance < 0:
+            raise InsufficientCredits(user_id)
+
+        self._seq += 1
+        entry = LedgerEntry(
+            self._seq, user_id, kind, amount, balance, description, time.time(), idempotency_key, fingerprint
+        )
+        self._balances[user_id] = balance
+        if kind == "buy":
+            self._purchasers.add(user_id)
+        journal = self._journals.get(user_id)
+        if journal is None:
+            journal = self._journals[user_id] = []
+        journal.append(entry)
+        if len(journal) > self.max_entries_per_user:
+            self._needs_compaction.add(user_id)
+
+        if idempotency_key is not None:
+            self._idempotency[(user_id, idempotency_key)] = entry
+            if len(self._idempotency) > self.max_idempotency_keys:
+                self._idempotency.popitem(last=False)
+        return entry
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest entry"""
+        return self._seq
+
+    def entries(self) -> Iterator[LedgerEntry]:
+        """Every journal entry, grouped by user and oldest first within a user"""
+        for journal in self._journals.values():
+            yield from journal
+
+    def restore(self, entry: LedgerEntry) -> None:
+        """Append an entry recorded earlier, e.g. when replaying a log, keeping its balance and seq"""
+        self._balances[entry.user_id] = entry.balance
+        if entry.kind == "buy":
+            self._purchasers.add(entry.user_id)
+        journal = self._journals.get(entry.user_id)
+        if journal is None:
+            journal = self._journals[entry.user_id] = []
+        journal.append(entry)
+        if len(journal) > self.max_entries_per_user:
+            self._needs_compaction.add(entry.user_id)
+        if entry.idempotency_key is not None:
+            self._idempotency[(entry.user_id, entry.idempotency_key)] = entry
+            if len(self._idempotency) > self.max_idempotency_keys:
+                self._idempotency.popitem(last=False)
+        self._seq = max(self._seq, entry.seq)
+
+    def history(self, user_id: str, limit: int = 20) -> List[LedgerEntry]:
+        """Get the latest journal entries of a user, newest first"""
+        journal = self._journals.get(user_id, [])
+        return journal[:-limit - 1:-1] if limit > 0 else []
+
+    def compact(self) -> int:
+        """Fold old entries of oversized journals into a single snapshot entry"""
+        compacted = 0
+        keep = self.max_entries_per_user // 2
+        for user_id in self._needs_compaction:
+            journal = self._journals[user_id]
+            folded = journal[:-keep]
+            if len(folded) < 2:
+                continue
+            last = folded[-1]
+            snapshot = LedgerEntry(
+                last.seq, user_id, "snapshot", sum(entry.amount for entry in folded),
+                last.balance, f"Compacted {len(folded)} entries", last.timestamp
+            )
+            self._journals[user_id] = [snapshot] + journal[-keep:]
+            compacted += len(folded) - 1
+        self._needs_compaction.clear()
+        return compacted
+
+    async def compact_forever(self, interval: float) -> None:
+        """Periodically compact oversized journals"""
+        while True:
+            await asyncio.sleep(interval)
+            self.compact()
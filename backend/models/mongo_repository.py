@@ -0,0 +1,520 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from core.pubsub import notification_hub
+from models import database as memory
+from models.airdrop_catalog import SORTS, decode_cursor, encode_cursor
+from models.ledger import IdempotencyConflict
+from models.repository import (
+    AirdropRepository,
+    CreditRepository,
+    NotificationRepository,
+    ReferralRepository,
+    UserRepository,
+    WalletRepository,
+    repositories,
+)
+
+# Hide Mongo's internal fields from API responses
+PROJECTION = {"_id": 0, "seq": 0}
+
+async def next_sequence(database, name: str, count: int = 1) -> int:
+    """Atomically reserve count ids from a named counter, returning the last one"""
+    counter = await database.counters.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
+async def ensure_indexes(database) -> None:
+    """Create the indexes every repository query relies on"""
+    await database.users.create_indexes([
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("id", ASCENDING)], unique=True)
+    ])
+    await database.credit_entries.create_indexes([
+        IndexModel([("user_id", ASCENDING), ("seq", DESCENDING)]),
+        # Only entries written with an idempotency key carry this field
+        IndexModel([("idempotency", ASCENDING)], unique=True, sparse=True)
+    ])
+    # Broadcast references share their broadcast's id across users
+    await database.notifications.create_indexes([
+        IndexModel([("id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("seq", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("read", ASCENDING)])
+    ])
+    # Every listing filter is an equality prefix followed by the sort key
+    await database.airdrops.create_indexes([
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("seq", ASCENDING)]),
+        IndexModel([("deadline", ASCENDING), ("seq", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("seq", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("deadline", ASCENDING), ("seq", ASCENDING)]),
+        IndexModel([("chain", ASCENDING), ("seq", ASCENDING)]),
+        IndexModel([("chain", ASCENDING), ("deadline", ASCENDING), ("seq", ASCENDING)])
+    ])
+    await database.broadcasts.create_indexes([
+        IndexModel([("id", ASCENDING)], unique=True)
+    ])
+    await database.wallets.create_indexes([
+        IndexModel([("user_id", ASCENDING)], unique=True)
+    ])
+    await database.referrals.create_indexes([
+        IndexModel([("user_id", ASCENDING)], unique=True)
+    ])
+
+def entry_to_dict(entry: Dict) -> Dict:
+    return {
+        "id": entry["seq"],
+        "action": entry["kind"],
+        "amount": entry["amount"],
+        "balance": entry["balance"],
+        "description": entry["description"],
+        "timestamp": datetime.fromtimestamp(entry["timestamp"]).isoformat()
+    }
+
+
+class MongoCreditRepository(CreditRepository):
+    """
+    Credits as an entry collection plus a balance document per user.
+
+    The balance moves first, in one find_one_and_update that also records the
+    idempotency key among the user's RECENT_KEYS, so concurrent retries cannot
+    move it twice. The entry is then inserted complete, with the balance it left.
+    """
+
+    # Idempotency keys remembered on the balance document; older ones are found through their entry
+    RECENT_KEYS = 100
+    # How long a retry waits for the entry of a concurrent request with the same key
+    ENTRY_WAIT_ATTEMPTS = 50
+    ENTRY_WAIT_INTERVAL = 0.02
+
+    def __init__(self, database):
+        self.entries = database.credit_entries
+        self.balances = database.credit_balances
+        self.database = database
+
+    async def balance(self, user_id: str) -> int:
+        doc = await self.balances.find_one({"_id": user_id})
+        return doc["balance"] if doc else 0
+
+    async def _apply(self, user_id: str, kind: str, amount: int, description: str,
+                     idempotency_key: Optional[str], fingerprint: Optional[str] = None) -> Optional[Dict]:
+        idempotency = f"{user_id}:{idempotency_key}" if idempotency_key is not None else None
+        if idempotency is not None:
+            previous = await self.entries.find_one({"idempotency": idempotency})
+            if previous:
+                return self._replayed(previous, fingerprint)
+
+        query = {"_id": user_id}
+        update = {"$inc": {"balance": amount}}
+        if amount < 0:
+            query["balance"] = {"$gte": -amount}
+        if idempotency is not None:
+            query["recent_keys"] = {"$ne": idempotency}
+            update["$push"] = {"recent_keys": {"$each": [idempotency], "$slice": -self.RECENT_KEYS}}
+        try:
+            doc = await self.balances.find_one_and_update(
+                query, update, upsert=amount >= 0, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Lost the race to create the document, or the key was applied meanwhile
+            doc = await self.balances.find_one_and_update(query, update, return_document=ReturnDocument.AFTER)
+        if doc is None:
+            if idempotency is not None and await self.balances.find_one({"_id": user_id, "recent_keys": idempotency}):
+                return self._replayed(await self._applied_entry(idempotency), fingerprint)
+            return None
+
+        entry = {
+            "seq": await next_sequence(self.database, "credit_entries"),
+            "user_id": user_id,
+            "kind": kind,
+            "amount": amount,
+            "balance": doc["balance"],
+            "description": description,
+            "timestamp": time.time()
+        }
+        if idempotency is not None:
+            entry["idempotency"] = idempotency
+        if fingerprint is not None:
+            entry["fingerprint"] = fingerprint
+        await self.entries.insert_one(entry)
+        return entry
+
+    async def _applied_entry(self, idempotency: str) -> Dict:
+        """The entry of a concurrent request that already moved the balance, once it is inserted"""
+        for _ in range(self.ENTRY_WAIT_ATTEMPTS):
+            entry = await self.entries.find_one({"idempotency": idempotency})
+            if entry is not None:
+                return entry
+            await asyncio.sleep(self.ENTRY_WAIT_INTERVAL)
+        raise RuntimeError(f"Credit entry {idempotency} was applied but its entry is missing")
+
+    async def add(self, user_id: str, amount: int, kind: str = "buy", description: str = "",
+                  idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> int:
+        entry = await self._apply(user_id, kind, amount, description, idempotency_key, fingerprint)
+        return entry["balance"]
+
+    @staticmethod
+    def _replayed(previous: Dict, fingerprint: Optional[str]) -> Dict:
+        if fingerprint is not None and previous.get("fingerprint") != fingerprint:
+            raise IdempotencyConflict(previous["idempotency"])
+        return previous
+
+    async def consume(self, user_id: str, amount: int, description: str = "",
+                      idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> bool:
+        entry = await self._apply(user_id, "consume", -amount, description, idempotency_key, fingerprint)
+        return entry is not None
+
+    async def find(self, user_id: str, idempotency_key: str) -> Optional[Dict]:
+        entry = await self.entries.find_one({"idempotency": f"{user_id}:{idempotency_key}"})
+        return entry_to_dict(entry) if entry else None
+
+    async def history(self, user_id: str, limit: int = 20) -> List[Dict]:
+        if limit <= 0:
+            return []
+        cursor = self.entries.find({"user_id": user_id}).sort("seq", DESCENDING).limit(limit)
+        return [entry_to_dict(entry) for entry in await cursor.to_list(length=limit)]
+
+    async def has_purchased(self, user_id: str) -> bool:
+        return await self.entries.find_one({"user_id": user_id, "kind": "buy"}, {"_id": 1}) is not None
+
+class MongoUserRepository(UserRepository):
+    def __init__(self, database, credits: CreditRepository, referrals: "MongoReferralRepository"):
+        self.users = database.users
+        self.credits = credits
+        self.referrals = referrals
+        self.database = database
+
+    async def get_by_email(self, email: str) -> Optional[Dict]:
+        return await self.users.find_one({"email": email}, PROJECTION)
+
+    async def get_by_id(self, user_id: str) -> Optional[Dict]:
+        return await self.users.find_one({"id": user_id}, PROJECTION)
+
+    async def create(self, username: str, email: str, password: str) -> Dict:
+        user_id = f"user_{await next_sequence(self.database, 'users')}"
+        user = {
+            "id": user_id,
+            "username": username,
+            "email": email,
+            "password": password,  # In real app, this would be hashed
+            "created_at": datetime.now().isoformat()
+        }
+        await self.users.insert_one(dict(user))
+        # Initialize credits and referral code for new user
+        await self.credits.add(user_id, 20, "bonus", "Signup bonus")
+        await self.referrals.create(user_id, username)
+        return user
+
+    async def id_batches(self, size: int) -> AsyncIterator[List[str]]:
+        batch = []
+        async for user in self.users.find({}, {"_id": 0, "id": 1}).batch_size(size):
+            batch.append(user["id"])
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+class MongoNotificationRepository(NotificationRepository):
+    def __init__(self, database):
+        self.notifications = database.notifications
+        self.broadcasts = database.broadcasts
+        self.database = database
+
+    async def _resolve(self, documents: List[Dict]) -> List[Dict]:
+        """Fill broadcast references in with their shared bodies"""
+        broadcast_ids = [d["id"] for d in documents if d.get("broadcast")]
+        if not broadcast_ids:
+            return documents
+        bodies = {
+            body["id"]: body
+            async for body in self.broadcasts.find({"id": {"$in": broadcast_ids}}, PROJECTION)
+        }
+        return [
+            {**bodies.get(d["id"], {}), "id": d["id"], "user_id": d["user_id"], "read": d["read"]}
+            if d.get("broadcast") else d
+            for d in documents
+        ]
+
+    def _document(self, seq: int, user_id: str, title: str, message: str, type: str) -> Dict:
+        return {
+            "id": f"notif-{seq}",
+            "seq": seq,
+            "user_id": user_id,
+            "title": title,
+            "message": message,
+            "type": type,
+            "read": False,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def add(self, user_id: str, title: str, message: str, type: str = "info") -> Dict:
+        seq = await next_sequence(self.database, "notifications")
+        notification = self._document(seq, user_id, title, message, type)
+        await self.notifications.insert_one(dict(notification))
+        del notification["seq"]
+        notification_hub.publish(notification)
+        return notification
+
+    async def add_many(self, notifications: Iterable[Dict]) -> int:
+        notifications = list(notifications)
+        if not notifications:
+            return 0
+        # Reserve the whole id range with a single counter update
+        last = await next_sequence(self.database, "notifications", len(notifications))
+        first = last - len(notifications) + 1
+        documents = [
+            self._document(first + i, n["user_id"], n["title"], n["message"], n.get("type", "info"))
+            for i, n in enumerate(notifications)
+        ]
+        result = await self.notifications.insert_many(documents, ordered=False)
+        for document in documents:
+            document.pop("_id", None)
+            del document["seq"]
+            notification_hub.publish(document)
+        return len(result.inserted_ids)
+
+    async def create_broadcast(self, title: str, message: str, type: str = "info") -> Dict:
+        seq = await next_sequence(self.database, "notifications")
+        body = {
+            "id": f"notif-{seq}",
+            "title": title,
+            "message": message,
+            "type": type,
+            "timestamp": datetime.now().isoformat()
+        }
+        await self.broadcasts.insert_one({**body, "seq": seq})
+        return body
+
+    async def deliver(self, broadcast_id: str, user_ids: List[str]) -> int:
+        if not user_ids:
+            return 0
+        body = await self.broadcasts.find_one({"id": broadcast_id}, {"_id": 0})
+        if body is None:
+            return 0
+        seq = body.pop("seq")
+        references = [
+            {"id": broadcast_id, "seq": seq, "user_id": user_id, "broadcast": True, "read": False}
+            for user_id in user_ids
+        ]
+        try:
+            result = await self.notifications.insert_many(references, ordered=False)
+            delivered = len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Users who already have the broadcast keep their reference
+            delivered = e.details["nInserted"]
+        notification_hub.publish_broadcast(body, user_ids)
+        return delivered
+
+    async def latest(self, user_id: str, limit: int = 5) -> List[Dict]:
+        if limit <= 0:
+            return []
+        cursor = self.notifications.find({"user_id": user_id}, PROJECTION).sort("seq", DESCENDING).limit(limit)
+        return await self._resolve(await cursor.to_list(length=limit))
+
+    async def mark_read(self, user_id: str, notification_id: str) -> Optional[Dict]:
+        notification = await self.notifications.find_one_and_update(
+            {"id": notification_id, "user_id": user_id},
+            {"$set": {"read": True}},
+            projection=PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        if notification is None:
+            return None
+        return (await self._resolve([notification]))[0]
+
+    async def mark_all_read(self, user_id: str) -> int:
+        result = await self.notifications.update_many({"user_id": user_id}, {"$set": {"read": True}})
+        return result.matched_count
+
+    async def delete(self, user_id: str, notification_id: str) -> bool:
+        result = await self.notifications.delete_one({"id": notification_id, "user_id": user_id})
+        return result.deleted_count == 1
+
+    async def unread_count(self, user_id: str) -> int:
+        return await self.notifications.count_documents({"user_id": user_id, "read": False})
+
+def airdrop_document(airdrop: Dict, seq: int) -> Dict:
+    """An airdrop as stored, its deadline a date so ranges and sorting compare instants"""
+    document = {**airdrop, "seq": seq}
+    if isinstance(document.get("deadline"), str):
+        document["deadline"] = datetime.fromisoformat(document["deadline"])
+    return document
+
+def airdrop_from_document(document: Optional[Dict]) -> Optional[Dict]:
+    """An airdrop as the API returns it, with an ISO deadline"""
+    if document is not None and isinstance(document.get("deadline"), datetime):
+        document["deadline"] = document["deadline"].isoformat()
+    return document
+
+class MongoAirdropRepository(AirdropRepository):
+    def __init__(self, database):
+        self.airdrops = database.airdrops
+        self.database = database
+
+    async def convert_deadlines(self) -> int:
+        """Rewrite deadlines stored as ISO strings by earlier versions as dates"""
+        converted = 0
+        async for document in self.airdrops.find({"deadline": {"$type": "string"}}, {"deadline": 1}):
+            await self.airdrops.update_one(
+                {"_id": document["_id"]}, {"$set": {"deadline": datetime.fromisoformat(document["deadline"])}}
+            )
+            converted += 1
+        return converted
+
+    async def add(self, airdrop: Dict) -> Dict:
+        seq = await next_sequence(self.database, "airdrops")
+        airdrop["id"] = f"airdrop-{seq:03d}"
+        await self.airdrops.insert_one(airdrop_document(airdrop, seq))
+        return airdrop
+
+    async def add_many(self, airdrops: Iterable[Dict]) -> int:
+        airdrops = list(airdrops)
+        if not airdrops:
+            return 0
+        last = await next_sequence(self.database, "airdrops", len(airdrops))
+        first = last - len(airdrops) + 1
+        operations = []
+        for i, airdrop in enumerate(airdrops):
+            airdrop["id"] = f"airdrop-{first + i:03d}"
+            operations.append(InsertOne(airdrop_document(airdrop, first + i)))
+        result = await self.airdrops.bulk_write(operations, ordered=False)
+        return result.inserted_count
+
+    async def seed(self, airdrops: Iterable[Dict]) -> None:
+        """Insert airdrops that keep their own ids, skipping ones already present"""
+        operations = [
+            UpdateOne({"id": airdrop["id"]}, {"$setOnInsert": airdrop_document(airdrop, i + 1)}, upsert=True)
+            for i, airdrop in enumerate(airdrops)
+        ]
+        if operations:
+            await self.airdrops.bulk_write(operations, ordered=False)
+            # Keep generated ids clear of the seeded ones
+            await self.database.counters.update_one(
+                {"_id": "airdrops"}, {"$max": {"seq": len(operations)}}, upsert=True
+            )
+
+    async def list(self, status: Optional[str] = None, chain: Optional[str] = None,
+                   deadline_from: Optional[datetime] = None, deadline_to: Optional[datetime] = None,
+                   sort: str = "created", descending: bool = False, limit: int = 20,
+                   cursor: Optional[str] = None) -> Dict:
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        query: Dict = {}
+        if status:
+            query["status"] = status
+        if chain:
+            query["chain"] = chain
+        if deadline_from or deadline_to:
+            query["deadline"] = {}
+            if deadline_from:
+                query["deadline"]["$gte"] = deadline_from
+            if deadline_to:
+                query["deadline"]["$lte"] = deadline_to
+
+        fields = ["seq"] if sort == "created" else ["deadline", "seq"]
+        if cursor:
+            # Keyset condition: strictly after the last key of the previous page
+            key = decode_cursor(cursor, sort, descending)
+            if sort == "deadline":
+                try:
+                    key[0] = datetime.fromisoformat(key[0])
+                except (TypeError, ValueError) as e:
+                    raise ValueError("Malformed cursor") from e
+            op = "$lt" if descending else "$gt"
+            after = []
+            for i, field in enumerate(fields):
+                condition = dict(zip(fields[:i], key[:i]))
+                condition[field] = {op: key[i]}
+                after.append(condition)
+            query = {"$and": [query, {"$or": after}]} if query else {"$or": after}
+
+        direction = DESCENDING if descending else ASCENDING
+        documents = await self.airdrops.find(query, {"_id": 0}).sort(
+            [(field, direction) for field in fields]
+        ).limit(limit + 1).to_list(length=None)
+
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = encode_cursor(sort, descending, [
+                last[field].isoformat() if field == "deadline" else last[field] for field in fields
+            ])
+        for document in documents:
+            del document["seq"]
+            airdrop_from_document(document)
+        return {"items": documents, "next_cursor": next_cursor}
+
+    async def get(self, airdrop_id: str) -> Optional[Dict]:
+        return airdrop_from_document(await self.airdrops.find_one({"id": airdrop_id}, PROJECTION))
+
+    async def set_status(self, airdrop_id: str, status: str) -> Optional[Dict]:
+        return airdrop_from_document(await self.airdrops.find_one_and_update(
+            {"id": airdrop_id}, {"$set": {"status": status}},
+            projection=PROJECTION, return_document=ReturnDocument.AFTER
+        ))
+
+class MongoReferralRepository(ReferralRepository):
+    def __init__(self, database):
+        self.referrals = database.referrals
+
+    async def create(self, user_id: str, username: str) -> Dict:
+        """Give a new user a referral code"""
+        referral = memory.make_referral(username)
+        await self.referrals.insert_one({**referral, "user_id": user_id})
+        return referral
+
+    async def add(self, referrer_id: str, referee_email: str) -> bool:
+        result = await self.referrals.update_one(
+            {"user_id": referrer_id},
+            {"$inc": {"invites": 1, "earned_credits": memory.REFERRAL_REWARD}}
+        )
+        return result.matched_count == 1
+
+    async def stats(self, user_id: str) -> Dict:
+        referral = await self.referrals.find_one({"user_id": user_id}, {"_id": 0, "user_id": 0})
+        return referral or {"code": "", "link": "", "invites": 0, "earned_credits": 0}
+
+class MongoWalletRepository(WalletRepository):
+    def __init__(self, database):
+        self.wallets = database.wallets
+
+    async def connect(self, user_id: str, wallet_address: str) -> Dict:
+        wallet = {
+            "address": wallet_address,
+            "connected_at": datetime.now().isoformat(),
+            "status": "connected"
+        }
+        await self.wallets.update_one({"user_id": user_id}, {"$set": wallet}, upsert=True)
+        return wallet
+
+    async def get(self, user_id: str) -> Optional[Dict]:
+        return await self.wallets.find_one({"user_id": user_id}, {"_id": 0, "user_id": 0})
+
+
+async def use_mongo_repositories(database) -> None:
+    """Serve every entity from MongoDB (or a motor-compatible stand-in such as mongomock-motor)"""
+    await ensure_indexes(database)
+    airdrops = MongoAirdropRepository(database)
+    await airdrops.convert_deadlines()
+    await airdrops.seed(memory.default_airdrops)
+    credits = MongoCreditRepository(database)
+    referrals = MongoReferralRepository(database)
+    repositories.use(
+        MongoUserRepository(database, credits, referrals),
+        credits,
+        MongoNotificationRepository(database),
+        airdrops,
+        MongoWalletRepository(database),
+        referrals
+    )
@@ -0,0 +1,192 @@
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from models.records import NotificationRecord
+
+class NotificationStore:
+    """
+    Notifications indexed by user and ordered by creation time.
+
+    A broadcast is stored once; each recipient only holds its id mapped to a read
+    flag, so delivering to many users allocates no per-user objects.
+    """
+
+    def __init__(self):
+        # user_id -> OrderedDict(notification_id -> notification, or read flag of a broadcast), oldest first
+        self._by_user: Dict[str, "OrderedDict[str, Union[NotificationRecord, bool]]"] = {}
+        # notification_id -> user_id, for notifications addressed to a single user
+        self._owners: Dict[str, str] = {}
+        # broadcast id -> body shared by every recipient
+        self._broadcasts: Dict[str, NotificationRecord] = {}
+        # user_id -> number of unread notifications
+        self._unread: Dict[str, int] = {}
+        self._deliveries = 0
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return len(self._owners) + self._deliveries
+
+    def __iter__(self) -> Iterator[Dict]:
+        for user_id, notifications in self._by_user.items():
+            for notification_id, notification in notifications.items():
+                yield self._materialize(user_id, notification_id, notification)
+
+    def _materialize(self, user_id: str, notification_id: str,
+                     notification: Union[NotificationRecord, bool]) -> Dict:
+        if isinstance(notification, bool):
+            return {**self._broadcasts[notification_id].to_dict(), "user_id": user_id, "read": notification}
+        return notification.to_dict()
+
+    def next_id(self) -> str:
+        """Reserve the next notification id"""
+        self._counter += 1
+        return f"notif-{self._counter}"
+
+    def records(self) -> Iterator[Union[NotificationRecord, Tuple[str, str, bool]]]:
+        """
+        Every notification, oldest first within a user: a NotificationRecord when
+        addressed to a single user, (user_id, broadcast_id, read) for a broadcast
+        """
+        for user_id, notifications in self._by_user.items():
+            for notification_id, notification in notifications.items():
+                if isinstance(notification, bool):
+                    yield user_id, notification_id, notification
+                else:
+                    yield notification
+
+    def broadcasts(self) -> Iterator[NotificationRecord]:
+        """Every broadcast body, oldest first"""
+        return iter(self._broadcasts.values())
+
+    def restore(self, notification: NotificationRecord) -> NotificationRecord:
+        """Store a notification created earlier, e.g. when replaying a log, keeping its id"""
+        self._reserve(notification.id)
+        return self.append(notification)
+
+    def restore_broadcast(self, body: NotificationRecord) -> NotificationRecord:
+        """Store a broadcast body created earlier, keeping its id"""
+        self._reserve(body.id)
+        return self.add_broadcast(body)
+
+    def _reserve(self, notification_id: str) -> None:
+        self._counter = max(self._counter, int(notification_id.rsplit("-", 1)[1]))
+
+    def add_broadcast(self, body: NotificationRecord) -> NotificationRecord:
+        """Store the shared body of a broadcast; recipients are added with deliver"""
+        self._broadcasts[body.id] = body
+        return body
+
+    def get_broadcast(self, broadcast_id: str) -> Optional[NotificationRecord]:
+        return self._broadcasts.get(broadcast_id)
+
+    def deliver(self, broadcast_id: str, user_ids: Iterable[str]) -> int:
+        """Give each user an unread reference to a broadcast, skipping users who have it"""
+        delivered = 0
+        for user_id in user_ids:
+            notifications = self._by_user.get(user_id)
+            if notifications is None:
+                notifications = self._by_user[user_id] = OrderedDict()
+            elif broadcast_id in notifications:
+                continue
+            notifications[broadcast_id] = False
+            self._unread[user_id] = self._unread.get(user_id, 0) + 1
+            delivered += 1
+        self._deliveries += delivered
+        return delivered
+
+    def append(self, notification: NotificationRecord) -> NotificationRecord:
+        """Store a notification as the newest one for its user"""
+        user_id = notification.user_id
+        notifications = self._by_user.get(user_id)
+        if notifications is None:
+            notifications = self._by_user[user_id] = OrderedDict()
+        notifications[notification.id] = notification
+        self._owners[notification.id] = user_id
+        if not notification.read:
+            self._unread[user_id] = self._unread.get(user_id, 0) + 1
+        return notification
+
+    def latest(self, user_id: str, limit: int) -> List[Dict]:
+        """Get the newest notifications for a user, newest first"""
+        notifications = self._by_user.get(user_id)
+        if not notifications or limit <= 0:
+            return []
+        return [
+            self._materialize(user_id, notification_id, notification)
+            for notification_id, notification in islice(reversed(notifications.items()), limit)
+        ]
+
+    def _find(self, notification_id: str, user_id: Optional[str]):
+        """(owner, stored notification or broadcast read flag); broadcasts need a user_id"""
+        owner = self._owners.get(notification_id, user_id)
+        if owner is None or (user_id is not None and owner != user_id):
+            return None, None
+        notifications = self._by_user.get(owner)
+        if not notifications:
+            return None, None
+        return owner, notifications.get(notification_id)
+
+    def get(self, notification_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """Get a notification by id, optionally scoped to its owner"""
+        owner, notification = self._find(notification_id, user_id)
+        return self._materialize(owner, notification_id, notification) if notification is not None else None
+
+    def mark_read(self, notification_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """Mark a single notification as read"""
+        owner, notification = self._find(notification_id, user_id)
+        if notification is None:
+            return None
+        if isinstance(notification, bool):
+            if not notification:
+                self._by_user[owner][notification_id] = True
+                self._unread[owner] -= 1
+            return self._materialize(owner, notification_id, True)
+        if not notification.read:
+            notification.read = True
+            self._unread[owner] -= 1
+        return notification.to_dict()
+
+    def mark_all_read(self, user_id: str) -> int:
+        """Mark every notification of a user as read"""
+        notifications = self._by_user.get(user_id)
+        if not notifications:
+            return 0
+        if self._unread.get(user_id):
+            for notification_id, notification in notifications.items():
+                if isinstance(notification, bool):
+                    notifications[notification_id] = True
+                else:
+                    notification.read = True
+            self._unread[user_id] = 0
+        return len(notifications)
+
+    def delete(self, notification_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """Remove a notification"""
+        owner, notification = self._find(notification_id, user_id)
+        if notification is None:
+            return None
+        if isinstance(notification, bool):
+            self._deliveries -= 1
+            read = notification
+        else:
+            del self._owners[notification_id]
+            read = notification.read
+        result = self._materialize(owner, notification_id, notification)
+        notifications = self._by_user[owner]
+        del notifications[notification_id]
+        if not read:
+            self._unread[owner] -= 1
+        if not notifications:
+            del self._by_user[owner]
+            self._unread.pop(owner, None)
+        return result
+
+    def unread_count(self, user_id: str) -> int:
+        """Get the number of unread notifications for a user"""
+        return self._unread.get(user_id, 0)
+
+    def count(self, user_id: str) -> int:
+        """Get the number of notifications for a user"""
+        notifications = self._by_user.get(user_id)
+        return len(notifications) if notifications else 0
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import mmap
+import os
+from typing import Callable, Iterable, List, Optional
+
+from core.config import settings
+from core.responses import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "snapshot.json"
+WAL_FILE = "wal.log"
+# The log segment a snapshot in progress covers, removed once the snapshot is durable
+PREVIOUS_WAL_FILE = "wal.log.1"
+# Pause before the flusher retries records a failed write put back
+FLUSH_RETRY_INTERVAL = 1.0
+
+class Persistence:
+    """
+    Write-ahead log plus periodic snapshots of the in-memory db.
+
+    Each mutation logs its effect (the stored row, with generated ids, timestamps
+    and balances) as one JSON line [lsn, kind, *row], so replaying never re-runs
+    business logic. Appends only buffer; a flusher writes and fsyncs everything
+    buffered in one go every commit_interval, and callers awaiting commit() all
+    share that fsync (group commit).
+
+    A snapshot is a compact list of [kind, *row] records for the whole state, tagged
+    with the lsn it includes. Startup mmaps the snapshot, replays it, then replays
+    the log records past its lsn.
+    """
+
+    def __init__(self, commit_interval: float = 0.005, snapshot_interval: float = 300.0):
+        self.commit_interval = commit_interval
+        self.snapshot_interval = snapshot_interval
+        self.directory: Optional[str] = None
+        # Last lsn appended and last lsn known to be on disk
+        self.lsn = 0
+        self.durable_lsn = 0
+        self._buffer: List[bytes] = []
+        self._file = None
+        # Resolved when the records buffered so far are fsynced
+        self._committed: Optional[asyncio.Future] = None
+        self._pending = asyncio.Event()
+        # Serializes writes to and rotation of the log file
+        self._lock = asyncio.Lock()
+        self._snapshotting = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def open(self, directory: str, apply: Callable[[list], None]) -> int:
+        """Restore the state kept in directory through apply, then start logging there"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        replayed = 0
+        snapshot_lsn = 0
+        snapshot_path = self._path(SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path) and os.path.getsize(snapshot_path):
+            with open(snapshot_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                with memoryview(view) as data:
+                    snapshot = loads(data)
+            snapshot_lsn = snapshot["lsn"]
+            for record in snapshot["records"]:
+                apply(record)
+                replayed += 1
+        self.lsn = snapshot_lsn
+        for name in (PREVIOUS_WAL_FILE, WAL_FILE):
+            for lsn, *record in self._read_log(self._path(name)):
+                if lsn > snapshot_lsn:
+                    apply(record)
+                    replayed += 1
+                self.lsn = max(self.lsn, lsn)
+        self.durable_lsn = self.lsn
+        self._file = open(self._path(WAL_FILE), "ab")
+        return replayed
+
+    @staticmethod
+    def _read_log(path: str) -> Iterable[list]:
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            end = data.find(b"\n", offset)
+            try:
+                if end == -1:
+                    raise ValueError("Unterminated record")
+                record = loads(data[offset:end])
+            except ValueError:
+                # A crash mid-write leaves a torn last record; drop it so appends start clean
+                logger.warning("Truncating %s at byte %d after an incomplete record", path, offset)
+                with open(path, "r+b") as f:
+                    f.truncate(offset)
+                return
+            yield record
+            offset = end + 1
+
+    def log(self, kind: str, *row) -> None:
+        """Buffer the effect of a mutation; durable once a following commit() returns"""
+        if self.directory is None:
+            return
+        self.lsn += 1
+        self._buffer.append(dumps([self.lsn, kind, *row]) + b"\n")
+        self._pending.set()
+
+    async def commit(self) -> None:
+        """Wait until every record logged so far is fsynced"""
+        if self.durable_lsn >= self.lsn:
+            return
+        if self._committed is None:
+            self._committed = asyncio.get_running_loop().create_future()
+        await asyncio.shield(self._committed)
+
+    async def flush(self) -> None:
+        """
+        Write and fsync the buffered records, resolving everyone waiting on them.
+
+        If the write fails its waiters get the error, but the records go back to
+        the front of the buffer, ahead of any logged meanwhile, for the next flush.
+        """
+        async with self._lock:
+            if not self._buffer:
+                return
+            records, self._buffer = self._buffer, []
+            lsn = self.lsn
+            committed, self._committed = self._committed, None
+            try:
+                await asyncio.to_thread(self._write, self._file, b"".join(records))
+            except Exception as e:
+                self._buffer[:0] = records
+                self._pending.set()
+                if committed is not None:
+                    committed.set_exception(e)
+                raise
+            self.durable_lsn = lsn
+            if committed is not None:
+                committed.set_result(None)
+
+    @staticmethod
+    def _write(file, data: bytes) -> None:
+        # Unbuffered, so a failed write can be cut off and retried without duplicating records
+        fd = file.fileno()
+        end = os.lseek(fd, 0, os.SEEK_END)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        except OSError:
+            try:
+                os.ftruncate(fd, end)
+            except OSError:
+                # Replay drops a torn last record, but whole ones would be applied twice
+                logger.exception("Could not drop a partial log write")
+            raise
+
+    async def snapshot(self, capture: Callable[[], Iterable[list]]) -> int:
+        """Write the state returned by capture as the new snapshot and drop the log it covers"""
+        if self._snapshotting:
+            return 0
+        self._snapshotting = True
+        try:
+            async with self._lock:
+                # No flush can run until the log is rotated, so records logged after
+                # the capture (lsn and up) all land in the new segment
+                lsn = self.lsn
+                records = list(capture())
+                await asyncio.to_thread(self._rotate)
+            await asyncio.to_thread(self._write_snapshot, lsn, records)
+            return len(records)
+        finally:
+            self._snapshotting = False
+
+    def _rotate(self) -> None:
+        current = self._path(WAL_FILE)
+        previous = self._path(PREVIOUS_WAL_FILE)
+        self._file.close()
+        if os.path.exists(previous):
+            # An earlier snapshot never completed; keep its segment until one does
+            with open(previous, "ab") as target, open(current, "rb") as source:
+                target.write(source.read())
+                target.flush()
+                os.fsync(target.fileno())
+            os.remove(current)
+        else:
+            os.replace(current, previous)
+        self._file = open(current, "ab")
+
+    def _write_snapshot(self, lsn: int, records: List[list]) -> None:
+        path = self._path(SNAPSHOT_FILE)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(dumps({"lsn": lsn, "records": records}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        os.remove(self._path(PREVIOUS_WAL_FILE))
+
+    async def run_forever(self, capture: Callable[[], Iterable[list]]) -> None:
+        """Group-commit logged records and take a snapshot every snapshot_interval"""
+        loop = asyncio.get_running_loop()
+        next_snapshot = loop.time() + self.snapshot_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._pending.wait(), max(0.0, next_snapshot - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            self._pending.clear()
+            # Let concurrent writers join this commit
+            await asyncio.sleep(self.commit_interval)
+            try:
+                await self.flush()
+                if loop.time() >= next_snapshot:
+                    next_snapshot = loop.time() + self.snapshot_interval
+                    await self.snapshot(capture)
+            except Exception:
+                logger.exception("Persisting the in-memory db failed")
+                await asyncio.sleep(FLUSH_RETRY_INTERVAL)
+
+    async def close(self, capture: Callable[[], Iterable[list]]) -> None:
+        """Flush, snapshot so the next start has little to replay, and stop logging"""
+        if self.directory is None:
+            return
+        await self.flush()
+        await self.snapshot(capture)
+        self._file.close()
+        self._file = None
+        self.directory = None
+
+persistence = Persistence(settings.PERSISTENCE_COMMIT_INTERVAL, settings.PERSISTENCE_SNAPSHOT_INTERVAL)
@@ -0,0 +1,88 @@
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+# Stored records are slotted objects: no per-instance dict, no repeated key strings,
+# integer epoch seconds instead of ISO strings, and interned user ids and enum values
+# so a million records share one copy of each. The dicts the API returns are built
+# by to_dict only when a record leaves the store.
+
+def now() -> int:
+    """Current time in integer epoch seconds"""
+    return int(time.time())
+
+def isoformat(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+class UserRecord:
+    __slots__ = ("id", "username", "email", "password", "created_at")
+
+    def __init__(self, id: str, username: str, email: str, password: str, created_at: int):
+        self.id = sys.intern(id)
+        self.username = username
+        self.email = email
+        self.password = password
+        self.created_at = created_at
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "username": self.username,
+            "email": self.email,
+            "password": self.password,
+            "created_at": isoformat(self.created_at)
+        }
+
+class NotificationRecord:
+    """A notification, or the shared body of a broadcast when user_id is None"""
+    __slots__ = ("id", "user_id", "title", "message", "type", "read", "timestamp")
+
+    def __init__(self, id: str, user_id: Optional[str], title: str, message: str, type: str,
+                 timestamp: int, read: bool = False):
+        self.id = id
+        self.user_id = sys.intern(user_id) if user_id is not None else None
+        self.title = title
+        self.message = message
+        self.type = sys.intern(type)
+        self.read = read
+        self.timestamp = timestamp
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "title": self.title,
+            "message": self.message,
+            "type": self.type,
+            "read": self.read,
+            "timestamp": isoformat(self.timestamp)
+        }
+
+class WalletRecord:
+    __slots__ = ("address", "connected_at", "status")
+
+    def __init__(self, address: str, connected_at: int, status: str = "connected"):
+        self.address = address
+        self.connected_at = connected_at
+        self.status = sys.intern(status)
+
+    def to_dict(self) -> Dict:
+        return {
+            "address": self.address,
+            "connected_at": isoformat(self.connected_at),
+            "status": self.status
+        }
+
+class SessionRecord:
+    __slots__ = ("user_id", "expires_at")
+
+    def __init__(self, user_id: str, expires_at: int):
+        self.user_id = sys.intern(user_id)
+        self.expires_at = expires_at
+
+    def to_dict(self) -> Dict:
+        return {
+            "user_id": self.user_id,
+            "expires_at": isoformat(self.expires_at)
+        }
@@ -0,0 +1,286 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from core.config import settings
+from core.metrics import TimedRepository
+from models import database as memory
+from models.persistence import persistence
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def get_by_id(self, user_id: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def create(self, username: str, email: str, password: str) -> Dict: ...
+
+    @abstractmethod
+    def id_batches(self, size: int) -> AsyncIterator[List[str]]:
+        """Every user id, in lists of at most size ids"""
+
+class CreditRepository(ABC):
+    @abstractmethod
+    async def balance(self, user_id: str) -> int: ...
+
+    @abstractmethod
+    async def add(self, user_id: str, amount: int, kind: str = "buy", description: str = "",
+                  idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> int:
+        """Credit the user; a reused idempotency key with another fingerprint raises IdempotencyConflict"""
+
+    @abstractmethod
+    async def consume(self, user_id: str, amount: int, description: str = "",
+                      idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> bool:
+        """Charge the user; a reused idempotency key with another fingerprint raises IdempotencyConflict"""
+
+    @abstractmethod
+    async def find(self, user_id: str, idempotency_key: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def history(self, user_id: str, limit: int = 20) -> List[Dict]: ...
+
+    @abstractmethod
+    async def has_purchased(self, user_id: str) -> bool:
+        """Whether the user ever bought credits"""
+
+class NotificationRepository(ABC):
+    @abstractmethod
+    async def add(self, user_id: str, title: str, message: str, type: str = "info") -> Dict: ...
+
+    @abstractmethod
+    async def add_many(self, notifications: Iterable[Dict]) -> int: ...
+
+    @abstractmethod
+    async def create_broadcast(self, title: str, message: str, type: str = "info") -> Dict:
+        """Store one body to be shared by every recipient of a broadcast"""
+
+    @abstractmethod
+    async def deliver(self, broadcast_id: str, user_ids: List[str]) -> int:
+        """Reference a broadcast from each user's notifications, returning how many were new (0 if it is unknown)"""
+
+    @abstractmethod
+    async def latest(self, user_id: str, limit: int = 5) -> List[Dict]: ...
+
+    @abstractmethod
+    async def mark_read(self, user_id: str, notification_id: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def mark_all_read(self, user_id: str) -> int: ...
+
+    @abstractmethod
+    async def delete(self, user_id: str, notification_id: str) -> bool: ...
+
+    @abstractmethod
+    async def unread_count(self, user_id: str) -> int: ...
+
+class AirdropRepository(ABC):
+    @abstractmethod
+    async def add(self, airdrop: Dict) -> Dict: ...
+
+    @abstractmethod
+    async def add_many(self, airdrops: Iterable[Dict]) -> int: ...
+
+    @abstractmethod
+    async def list(self, status: Optional[str] = None, chain: Optional[str] = None,
+                   deadline_from: Optional[datetime] = None, deadline_to: Optional[datetime] = None,
+                   sort: str = "created", descending: bool = False, limit: int = 20,
+                   cursor: Optional[str] = None) -> Dict:
+        """{"items": [...], "next_cursor": str | None}; raises ValueError on a bad cursor"""
+
+    @abstractmethod
+    async def get(self, airdrop_id: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def set_status(self, airdrop_id: str, status: str) -> Optional[Dict]: ...
+
+class ReferralRepository(ABC):
+    @abstractmethod
+    async def add(self, referrer_id: str, referee_email: str) -> bool:
+        """Count a referral and its reward in the referrer's stats; False if the referrer has none"""
+
+    @abstractmethod
+    async def stats(self, user_id: str) -> Dict: ...
+
+class WalletRepository(ABC):
+    @abstractmethod
+    async def connect(self, user_id: str, wallet_address: str) -> Dict: ...
+
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[Dict]: ...
+
+
+class InMemoryUserRepository(UserRepository):
+    async def get_by_email(self, email: str) -> Optional[Dict]:
+        return memory.get_user_by_email(email)
+
+    async def get_by_id(self, user_id: str) -> Optional[Dict]:
+        return memory.get_user_by_id(user_id)
+
+    async def create(self, username: str, email: str, password: str) -> Dict:
+        user = memory.create_user(username, email, password)
+        await persistence.commit()
+        return user
+
+    async def id_batches(self, size: int) -> AsyncIterator[List[str]]:
+        user_ids = memory.get_user_ids()
+        for start in range(0, len(user_ids), size):
+            yield user_ids[start:start + size]
+
+class InMemoryCreditRepository(CreditRepository):
+    async def balance(self, user_id: str) -> int:
+        return memory.get_user_credits(user_id)
+
+    async def add(self, user_id: str, amount: int, kind: str = "buy", description: str = "",
+                  idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> int:
+        balance = memory.add_credits(user_id, amount, kind, description, idempotency_key, fingerprint)
+        await persistence.commit()
+        return balance
+
+    async def consume(self, user_id: str, amount: int, description: str = "",
+                      idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None) -> bool:
+        consumed = memory.consume_credits(user_id, amount, description, idempotency_key, fingerprint)
+        await persistence.commit()
+        return consumed
+
+    async def find(self, user_id: str, idempotency_key: str) -> Optional[Dict]:
+        entry = memory.find_credit_transaction(user_id, idempotency_key)
+        return entry.to_dict() if entry else None
+
+    async def history(self, user_id: str, limit: int = 20) -> List[Dict]:
+        return memory.get_credit_log(user_id, limit)
+
+    async def has_purchased(self, user_id: str) -> bool:
+        return memory.has_purchased_credits(user_id)
+
+class InMemoryNotificationRepository(NotificationRepository):
+    async def add(self, user_id: str, title: str, message: str, type: str = "info") -> Dict:
+        notification = memory.add_notification(user_id, title, message, type)
+        await persistence.commit()
+        return notification
+
+    async def add_many(self, notifications: Iterable[Dict]) -> int:
+        count = 0
+        for notification in notifications:
+            memory.add_notification(
+                notification["user_id"], notification["title"], notification["message"],
+                notification.get("type", "info")
+            )
+            count += 1
+        await persistence.commit()
+        return count
+
+    async def create_broadcast(self, title: str, message: str, type: str = "info") -> Dict:
+        body = memory.add_broadcast(title, message, type)
+        await persistence.commit()
+        return body
+
+    async def deliver(self, broadcast_id: str, user_ids: List[str]) -> int:
+        delivered = memory.deliver_broadcast(broadcast_id, user_ids)
+        await persistence.commit()
+        return delivered
+
+    async def latest(self, user_id: str, limit: int = 5) -> List[Dict]:
+        return memory.get_user_notifications(user_id, limit)
+
+    async def mark_read(self, user_id: str, notification_id: str) -> Optional[Dict]:
+        notification = memory.set_notification_read(user_id, notification_id)
+        await persistence.commit()
+        return notification
+
+    async def mark_all_read(self, user_id: str) -> int:
+        count = memory.mark_all_notifications_read(user_id)
+        await persistence.commit()
+        return count
+
+    async def delete(self, user_id: str, notification_id: str) -> bool:
+        deleted = memory.remove_notification(user_id, notification_id) is not None
+        await persistence.commit()
+        return deleted
+
+    async def unread_count(self, user_id: str) -> int:
+        return memory.get_unread_count(user_id)
+
+class InMemoryAirdropRepository(AirdropRepository):
+    async def add(self, airdrop: Dict) -> Dict:
+        airdrop = memory.add_airdrop(airdrop)
+        await persistence.commit()
+        return airdrop
+
+    async def add_many(self, airdrops: Iterable[Dict]) -> int:
+        count = 0
+        for airdrop in airdrops:
+            memory.add_airdrop(airdrop)
+            count += 1
+        await persistence.commit()
+        return count
+
+    async def list(self, status: Optional[str] = None, chain: Optional[str] = None,
+                   deadline_from: Optional[datetime] = None, deadline_to: Optional[datetime] = None,
+                   sort: str = "created", descending: bool = False, limit: int = 20,
+                   cursor: Optional[str] = None) -> Dict:
+        items, next_cursor = memory.query_airdrops(
+            status, chain, deadline_from, deadline_to, sort, descending, limit, cursor
+        )
+        return {"items": items, "next_cursor": next_cursor}
+
+    async def get(self, airdrop_id: str) -> Optional[Dict]:
+        return memory.get_airdrop(airdrop_id)
+
+    async def set_status(self, airdrop_id: str, status: str) -> Optional[Dict]:
+        return memory.update_airdrop(airdrop_id, status=status)
+
+class InMemoryReferralRepository(ReferralRepository):
+    async def add(self, referrer_id: str, referee_email: str) -> bool:
+        added = memory.add_referral(referrer_id, referee_email)
+        await persistence.commit()
+        return added
+
+    async def stats(self, user_id: str) -> Dict:
+        return memory.get_referral_stats(user_id)
+
+class InMemoryWalletRepository(WalletRepository):
+    async def connect(self, user_id: str, wallet_address: str) -> Dict:
+        wallet = memory.connect_wallet(user_id, wallet_address)
+        await persistence.commit()
+        return wallet
+
+    async def get(self, user_id: str) -> Optional[Dict]:
+        return memory.get_user_wallet(user_id)
+
+
+class Repositories:
+    """The active storage backend for every entity"""
+    users: UserRepository
+    credits: CreditRepository
+    notifications: NotificationRepository
+    airdrops: AirdropRepository
+    wallets: WalletRepository
+    referrals: ReferralRepository
+
+    def use(self, users: UserRepository, credits: CreditRepository, notifications: NotificationRepository,
+            airdrops: AirdropRepository, wallets: WalletRepository, referrals: ReferralRepository) -> None:
+        # Charge repository time to the storage part of Server-Timing
+        wrap = TimedRepository if settings.METRICS_ENABLED else (lambda repository: repository)
+        self.users = wrap(users)
+        self.credits = wrap(credits)
+        self.notifications = wrap(notifications)
+        self.airdrops = wrap(airdrops)
+        self.wallets = wrap(wallets)
+        self.referrals = wrap(referrals)
+
+def use_memory_repositories() -> None:
+    """Serve every entity from the in-process db"""
+    repositories.use(
+        InMemoryUserRepository(),
+        InMemoryCreditRepository(),
+        InMemoryNotificationRepository(),
+        InMemoryAirdropRepository(),
+        InMemoryWalletRepository(),
+        InMemoryReferralRepository()
+    )
+
+repositories = Repositories()
+use_memory_repositories()
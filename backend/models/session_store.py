@@ -0,0 +1,75 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from models.records import SessionRecord
+
+
+class SessionStore:
+    """Session tokens with expiry-ordered eviction"""
+
+    def __init__(self):
+        self._sessions: Dict[str, SessionRecord] = {}
+        # (expires_at timestamp, token), may hold stale entries for removed sessions
+        self._expiry_heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._sessions
+
+    def create(self, token: str, user_id: str, expires_at: datetime) -> SessionRecord:
+        """Store a session that expires at the given time"""
+        session = SessionRecord(user_id, int(expires_at.timestamp()))
+        self._sessions[token] = session
+        heapq.heappush(self._expiry_heap, (session.expires_at, token))
+        return session
+
+    def get(self, token: str) -> Optional[SessionRecord]:
+        """Get a session, dropping it if it has expired"""
+        session = self._sessions.get(token)
+        if session is None:
+            return None
+        if session.expires_at < time.time():
+            del self._sessions[token]
+            return None
+        return session
+
+    def delete(self, token: str) -> bool:
+        """Remove a session"""
+        if self._sessions.pop(token, None) is None:
+            return False
+        # Rebuild once stale heap entries outnumber live sessions
+        if len(self._expiry_heap) > 2 * len(self._sessions) + 64:
+            self._rebuild_heap()
+        return True
+
+    def _rebuild_heap(self) -> None:
+        self._expiry_heap = [
+            (session.expires_at, token)
+            for token, session in self._sessions.items()
+        ]
+        heapq.heapify(self._expiry_heap)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Remove every session that has expired"""
+        now = time.time() if now is None else now
+        heap = self._expiry_heap
+        removed = 0
+        while heap and heap[0][0] <= now:
+            expires_at, token = heapq.heappop(heap)
+            session = self._sessions.get(token)
+            # Skip stale entries left behind by deleted or re-issued tokens
+            if session is not None and session.expires_at == expires_at:
+                del self._sessions[token]
+                removed += 1
+        return removed
+
+    async def sweep_forever(self, interval: float) -> None:
+        """Periodically evict expired sessions"""
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
@@ -1,46 +1,67 @@
 
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List
+from fastapi import APIRouter, HTTPException, Depends, Query
+from datetime import datetime
+from typing import Dict, List, Optional
 
 from schemas.airdrop import AirdropCreate, AirdropResponse
-from models.database import db, add_airdrop, get_airdrops, add_notification
+from models.repository import repositories
+from core.security import get_current_user_id
+from services.airdrop_lifecycle import airdrop_lifecycle, initial_status
+from services.broadcast import broadcasts
 from utils.helper import generate_response, simulate_delay
 
 router = APIRouter(prefix="/airdrops")
 
 @router.get("", response_model=Dict)
-async def list_airdrops(status: str = None, user_id: str = "user_1"):
+async def list_airdrops(
+    status: Optional[str] = None,
+    chain: Optional[str] = None,
+    deadline_from: Optional[datetime] = None,
+    deadline_to: Optional[datetime] = None,
+    sort: str = Query("created", pattern="^(created|deadline)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+):
     """
-    Get list of active airdrops
+    Get one page of airdrops, optionally filtered by status, chain and deadline range.
+
+    The data is {"items": [...], "next_cursor": ...}; it used to be a bare list of
+    every airdrop. Pass next_cursor back as cursor for the following page until it
+    is null. With a sparse deadline range a page may hold fewer than limit items,
+    even none, while next_cursor is still set.
     """
     # Simulate delay
     await simulate_delay()
     
-    airdrops = get_airdrops()
-    
-    # Filter by status if provided
-    if status:
-        airdrops = [a for a in airdrops if a["status"] == status]
+    try:
+        page = await repositories.airdrops.list(
+            status, chain, deadline_from, deadline_to, sort, order == "desc", limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return generate_response(data=airdrops, message="Airdrops retrieved successfully")
+    return generate_response(data=page, message="Airdrops retrieved successfully")
 
 @router.post("", response_model=Dict)
-async def create_airdrop(airdrop: AirdropCreate, user_id: str = "user_1"):
+async def create_airdrop(airdrop: AirdropCreate, user_id: str = Depends(get_current_user_id)):
     """
     Create a new airdrop
     """
     # Simulate delay
     await simulate_delay()
     
-    # Add status
-    airdrop_dict = airdrop.dict()
-    airdrop_dict["status"] = "active"
+    # Status follows the start date and deadline from here on
+    airdrop_dict = airdrop.model_dump(mode="json")
+    airdrop_dict["status"] = initial_status(airdrop_dict)
     
     # Add the airdrop
-    new_airdrop = add_airdrop(airdrop_dict)
+    new_airdrop = await repositories.airdrops.add(airdrop_dict)
+    airdrop_lifecycle.track(new_airdrop)
     
-    add_notification(
-        user_id,
+    # Announce to every user; delivery happens in the background
+    await broadcasts.broadcast(
         f"New airdrop added: {airdrop.projectName}",
         f"Deadline: {airdrop.deadline.strftime('%Y-%m-%d')}",
         "info"
@@ -49,7 +70,7 @@ async def create_airdrop(airdrop: AirdropCreate, user_id: str = "user_1"):
     return generate_response(data=new_airdrop, message="Airdrop added successfully")
 
 @router.get("/{airdrop_id}", response_model=Dict)
-async def get_airdrop(airdrop_id: str, user_id: str = "user_1"):
+async def get_airdrop(airdrop_id: str, user_id: str = Depends(get_current_user_id)):
     """
     Get details of a specific airdrop
     """
@@ -57,8 +78,7 @@ async def get_airdrop(airdrop_id: str, user_id: str = "user_1"):
     await simulate_delay()
     
     # Find the airdrop
-    airdrops = get_airdrops()
-    airdrop = next((a for a in airdrops if a["id"] == airdrop_id), None)
+    airdrop = await repositories.airdrops.get(airdrop_id)
     
     if not airdrop:
         raise HTTPException(status_code=404, detail="Airdrop not found")
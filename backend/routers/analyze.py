@@ -1,57 +1,192 @@
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-import asyncio
-from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional, Tuple
 
-from schemas.analyze import AnalyzeRequest, AnalyzeResponse
-from models.database import db, add_notification
-from utils.helper import generate_response, simulate_delay, generate_id
+from schemas.analyze import AnalyzeRequest, AnalyzeBatchRequest, AnalyzeResponse
+from core.config import settings
+from models.ledger import IdempotencyConflict
+from models.repository import repositories
+from services.analysis import (
+    analyze_for_user, analyze_batch, stream_analysis, encode_event, notify_analysis_completed,
+    notify_batch_completed, unique_projects
+)
+from services.cache import analysis_cache, fingerprint, make_key, section_store
+from core.security import get_current_user_id
+from utils.helper import generate_response
 
 router = APIRouter(prefix="/analyze")
 
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
+async def charge_analysis(
+    user_id: str, projects: List[Tuple[str, Optional[str]]], idempotency_key: Optional[str]
+) -> Dict:
+    """
+    Charge ANALYZE_CREDIT_COST per distinct project in one ledger entry, before analysing.
+
+    Sections that fail or time out and streams the client abandons are billed like
+    complete analyses; retrying with the same Idempotency-Key replays the charge,
+    so the analysis can be run again without paying twice.
+    """
+    cost = settings.ANALYZE_CREDIT_COST * len(projects)
+    if not cost:
+        return {"credits_charged": 0, "replayed": False}
+
+    # Ties the idempotency key to these exact projects, so the key cannot pay for others
+    request_fingerprint = fingerprint(cost, sorted(make_key(name, website, "")[:2] for name, website in projects))
+    previous = await repositories.credits.find(user_id, idempotency_key) if idempotency_key else None
+    try:
+        consumed = await repositories.credits.consume(
+            user_id, cost, f"Feature: analyze ({len(projects)} projects)", idempotency_key, request_fingerprint
+        )
+    except IdempotencyConflict:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different analysis")
+    if not consumed:
+        raise HTTPException(status_code=402, detail=f"Insufficient credits: this analysis costs {cost}")
+
+    # Report what the ledger recorded, which for a retry is the original charge
+    entry = await repositories.credits.find(user_id, idempotency_key) if idempotency_key else None
+    charged = -entry["amount"] if entry else cost
+    return {"credits_charged": charged, "replayed": previous is not None}
+
 @router.post("", response_model=Dict)
-async def analyze_project(request: AnalyzeRequest, user_id: str = "user_1"):
+async def analyze_project(
+    request: AnalyzeRequest,
+    refresh: bool = Query(False, description="Reload every section, recomputing only those whose inputs changed"),
+    user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None)
+):
     """
     Analyze a Web3 project and return structured information
     """
     project_name = request.project_name
-    
-    # Check if project exists in our database
-    if project_name not in db["projects"]:
-        # For demo, we'll accept any project name but return generic data
-        project_data = {
-            "about_project": f"{project_name} is an innovative Web3 project.",
-            "tokenomics": "Token distribution information not available.",
-            "roadmap": "Roadmap information not available.",
-            "backers": ["Unknown investors"],
-            "team": ["Team information not available"]
-        }
-    else:
-        project_data = db["projects"][project_name]
-    
-    # Simulate fetching data with delays
-    response = {"project_name": project_name}
-    sections_completed = 0
-    
-    for section, content in project_data.items():
-        # Simulate delay for each section
-        await simulate_delay(0.5, 1.5)
-        response[section] = content
-        sections_completed += 1
-        
-        # Add a notification after project analysis completes
-        if sections_completed == len(project_data):
-            add_notification(
-                user_id,
-                f"Analysis completed for {project_name}",
-                f"All {sections_completed} sections have been analyzed and are ready to view.",
-                "success"
-            )
-    
-    response["sections_completed"] = sections_completed
-    response["total_sections"] = len(project_data)
-    
+    website = str(request.website) if request.website else None
+    charge = await charge_analysis(user_id, [(project_name, website)], idempotency_key)
+
+    # Fetch all sections concurrently
+    response = await analyze_for_user(user_id, project_name, website, refresh)
+
     return generate_response(
-        data=response,
+        data={**response, **charge},
         message=f"Successfully analyzed {project_name}"
     )
+
+@router.post("/stream")
+async def analyze_project_stream(
+    request: AnalyzeRequest,
+    format: str = Query("ndjson", description="Stream format (ndjson, sse)"),
+    refresh: bool = Query(False, description="Reload every section, recomputing only those whose inputs changed"),
+    user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Analyze a Web3 project and stream each section as soon as it is ready
+    """
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(STREAM_MEDIA_TYPES)}")
+
+    project_name = request.project_name
+    website = str(request.website) if request.website else None
+    charge = await charge_analysis(user_id, [(project_name, website)], idempotency_key)
+
+    async def events():
+        async for event in stream_analysis(project_name, website, refresh=refresh):
+            if event["event"] == "done":
+                await notify_analysis_completed(
+                    user_id, project_name, event["sections_completed"], event["total_sections"]
+                )
+                event = {**event, **charge}
+            yield encode_event(event, format)
+
+    return StreamingResponse(events(), media_type=STREAM_MEDIA_TYPES[format])
+
+async def charge_batch(
+    request: AnalyzeBatchRequest, user_id: str, idempotency_key: Optional[str]
+) -> Tuple[List[Tuple[str, Optional[str]]], Dict]:
+    """Distinct projects of a batch, after charging all of them in one ledger entry"""
+    projects = unique_projects(
+        (project.project_name, str(project.website) if project.website else None)
+        for project in request.projects
+    )
+    if len(projects) > settings.ANALYZE_BATCH_MAX_PROJECTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ANALYZE_BATCH_MAX_PROJECTS} distinct projects per batch"
+        )
+    return projects, await charge_analysis(user_id, projects, idempotency_key)
+
+@router.post("/batch", response_model=Dict)
+async def analyze_projects(
+    request: AnalyzeBatchRequest,
+    refresh: bool = Query(False, description="Reload every section, recomputing only those whose inputs changed"),
+    user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Analyze a list of Web3 projects, fetching sections of all of them concurrently
+    """
+    projects, charge = await charge_batch(request, user_id, idempotency_key)
+
+    analyses = [
+        analysis
+        async for analysis in analyze_batch(projects, settings.ANALYZE_BATCH_CONCURRENCY, refresh=refresh)
+    ]
+    # Report projects in request order rather than completion order
+    order = {project: index for index, project in enumerate(projects)}
+    analyses.sort(key=lambda analysis: order[(analysis["project_name"], analysis["website"])])
+    await notify_batch_completed(user_id, analyses)
+
+    return generate_response(
+        data={
+            "projects": analyses,
+            "total_projects": len(projects),
+            "duplicates_removed": len(request.projects) - len(projects),
+            **charge
+        },
+        message=f"Successfully analyzed {len(projects)} projects"
+    )
+
+@router.post("/batch/stream")
+async def analyze_projects_stream(
+    request: AnalyzeBatchRequest,
+    format: str = Query("ndjson", description="Stream format (ndjson, sse)"),
+    refresh: bool = Query(False, description="Reload every section, recomputing only those whose inputs changed"),
+    user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Analyze a list of Web3 projects and stream each project as soon as it is ready
+    """
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(STREAM_MEDIA_TYPES)}")
+
+    projects, charge = await charge_batch(request, user_id, idempotency_key)
+
+    async def events():
+        analyses = []
+        async for analysis in analyze_batch(projects, settings.ANALYZE_BATCH_CONCURRENCY, refresh=refresh):
+            analyses.append(analysis)
+            yield encode_event({"event": "project", **analysis}, format)
+        await notify_batch_completed(user_id, analyses)
+        yield encode_event({
+            "event": "done",
+            "total_projects": len(projects),
+            "duplicates_removed": len(request.projects) - len(projects),
+            **charge
+        }, format)
+
+    return StreamingResponse(events(), media_type=STREAM_MEDIA_TYPES[format])
+
+@router.get("/cache/stats", response_model=Dict)
+async def get_cache_stats():
+    """
+    Get hit, miss and eviction counters of the analysis cache
+    """
+    return generate_response(
+        data={**analysis_cache.stats(), "sections": section_store.stats()},
+        message="Cache stats retrieved successfully"
+    )
@@ -1,11 +1,10 @@
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
 from typing import Dict, Optional
-import secrets
-from datetime import datetime, timedelta
 
 from schemas.user import UserCreate, UserLogin, UserResponse, Session
-from models.database import db, get_user_by_email, create_user, add_notification
+from models.repository import repositories
+from core.security import issue_token, resolve_token, revoke_token, bearer_token
 from utils.helper import generate_response, simulate_delay
 
 router = APIRouter(prefix="/auth")
@@ -19,25 +18,18 @@ async def signup(user: UserCreate):
     await simulate_delay()
     
     # Check if email already exists
-    existing_user = get_user_by_email(user.email)
+    existing_user = await repositories.users.get_by_email(user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    new_user = create_user(user.username, user.email, user.password)
+    new_user = await repositories.users.create(user.username, user.email, user.password)
     
-    # Generate token
-    token = secrets.token_hex(32)
-    expires = datetime.now() + timedelta(days=30)
-    
-    # Store session
-    db["sessions"][token] = {
-        "user_id": new_user["id"],
-        "expires_at": expires.isoformat()
-    }
+    # Issue access token
+    access = issue_token(new_user["id"])
     
     # Add welcome notification
-    add_notification(
+    await repositories.notifications.add(
         new_user["id"],
         "Welcome to Scryptex!",
         "Thank you for joining. Start by exploring the dashboard.",
@@ -51,8 +43,8 @@ async def signup(user: UserCreate):
                 "username": new_user["username"],
                 "email": new_user["email"]
             },
-            "token": token,
-            "expires_at": expires.isoformat()
+            "token": access["token"],
+            "expires_at": access["expires_at"]
         },
         message="User registered successfully"
     )
@@ -66,19 +58,12 @@ async def login(credentials: UserLogin):
     await simulate_delay()
     
     # Check if user exists
-    user = get_user_by_email(credentials.email)
+    user = await repositories.users.get_by_email(credentials.email)
     if not user or user["password"] != credentials.password:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    # Generate token
-    token = secrets.token_hex(32)
-    expires = datetime.now() + timedelta(days=30)
-    
-    # Store session
-    db["sessions"][token] = {
-        "user_id": user["id"],
-        "expires_at": expires.isoformat()
-    }
+    # Issue access token
+    access = issue_token(user["id"])
     
     return generate_response(
         data={
@@ -87,35 +72,28 @@ async def login(credentials: UserLogin):
                 "username": user["username"],
                 "email": user["email"]
             },
-            "token": token,
-            "expires_at": expires.isoformat()
+            "token": access["token"],
+            "expires_at": access["expires_at"]
         },
         message="Login successful"
     )
 
 @router.get("/me", response_model=Dict)
-async def get_current_user(token: str = None):
+async def get_current_user(token: str = None, authorization: Optional[str] = Header(None)):
     """
     Get current user profile from token
     """
     # Simulate delay
     await simulate_delay(0.2, 0.5)
     
-    # Check if token is valid
-    if not token or token not in db["sessions"]:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    session = db["sessions"][token]
-    
-    # Check if token is expired
-    expires_at = datetime.fromisoformat(session["expires_at"])
-    if expires_at < datetime.now():
-        db["sessions"].pop(token)
-        raise HTTPException(status_code=401, detail="Token expired")
+    # Check if token is valid and not expired
+    token = token or bearer_token(authorization)
+    user_id = resolve_token(token) if token else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
     
     # Get user
-    user_id = session["user_id"]
-    user = next((u for u in db["users"].values() if u["id"] == user_id), None)
+    user = await repositories.users.get_by_id(user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -131,16 +109,17 @@ async def get_current_user(token: str = None):
     )
 
 @router.post("/logout", response_model=Dict)
-async def logout(token: str = None):
+async def logout(token: str = None, authorization: Optional[str] = Header(None)):
     """
     Log out and invalidate token
     """
     # Simulate delay
     await simulate_delay(0.2, 0.5)
     
-    # Remove session if exists
-    if token and token in db["sessions"]:
-        db["sessions"].pop(token)
+    # Invalidate token if present
+    token = token or bearer_token(authorization)
+    if token:
+        revoke_token(token)
     
     return generate_response(
         data=None,
@@ -1,22 +1,25 @@
 
-from fastapi import APIRouter, HTTPException
-from typing import Dict
+from fastapi import APIRouter, HTTPException, Depends, Header
+from typing import Dict, Optional
 
 from schemas.credit import CreditBuyRequest, CreditConsumeRequest, CreditResponse
-from models.database import db, get_user_credits, add_credits, consume_credits, add_notification
+from models.ledger import IdempotencyConflict
+from models.repository import repositories
+from core.security import get_current_user_id
+from services.cache import fingerprint
 from utils.helper import generate_response, simulate_delay
 
 router = APIRouter(prefix="/credit")
 
 @router.get("", response_model=Dict)
-async def get_credits(user_id: str = "user_1"):
+async def get_credits(user_id: str = Depends(get_current_user_id)):
     """
     Get user credit balance
     """
     # Simulate delay
     await simulate_delay(0.2, 0.5)
     
-    credits = get_user_credits(user_id)
+    credits = await repositories.credits.balance(user_id)
     
     return generate_response(
         data={"user_id": user_id, "balance": credits},
@@ -24,7 +27,11 @@ async def get_credits(user_id: str = "user_1"):
     )
 
 @router.post("/buy", response_model=Dict)
-async def buy_credits(request: CreditBuyRequest, user_id: str = "user_1"):
+async def buy_credits(
+    request: CreditBuyRequest,
+    user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None)
+):
     """
     Buy credits using onchain or offchain payment
     """
@@ -35,15 +42,26 @@ async def buy_credits(request: CreditBuyRequest, user_id: str = "user_1"):
     amount = request.amount
     method = request.method
     
+    # A retried request returns the original purchase; the fingerprint keeps
+    # the key from standing in for a different purchase or a consumption
+    previous = await repositories.credits.find(user_id, idempotency_key) if idempotency_key else None
+    
     # Add credits to user account
-    new_balance = add_credits(user_id, amount)
+    try:
+        new_balance = await repositories.credits.add(
+            user_id, amount, "buy", f"Purchase via {method.value}", idempotency_key,
+            fingerprint("buy", amount, method.value)
+        )
+    except IdempotencyConflict:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different request")
     
-    add_notification(
-        user_id,
-        f"Credits purchased: {amount}",
-        f"Payment method: {method}. New balance: {new_balance}",
-        "success"
-    )
+    if not previous:
+        await repositories.notifications.add(
+            user_id,
+            f"Credits purchased: {amount}",
+            f"Payment method: {method}. New balance: {new_balance}",
+            "success"
+        )
     
     return generate_response(
         data={
@@ -51,13 +69,18 @@ async def buy_credits(request: CreditBuyRequest, user_id: str = "user_1"):
             "purchased": amount,
             "balance": new_balance,
             "transaction_successful": True,
-            "payment_method": method
+            "payment_method": method,
+            "replayed": previous is not None
         },
         message=f"Successfully purchased {amount} credits"
     )
 
 @router.post("/consume", response_model=Dict)
-async def consume_user_credits(request: CreditConsumeRequest, user_id: str = "user_1"):
+async def consume_user_credits(
+    request: CreditConsumeRequest,
+    user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None)
+):
     """
     Consume credits for using a feature
     """
@@ -67,14 +90,24 @@ async def consume_user_credits(request: CreditConsumeRequest, user_id: str = "us
     feature_type = request.feature_type
     amount = request.amount
     
+    # A retried request returns the original consumption; the fingerprint keeps
+    # the key from standing in for a different consumption or a purchase
+    previous = await repositories.credits.find(user_id, idempotency_key) if idempotency_key else None
+    
     # Try to consume credits
-    success = consume_credits(user_id, amount)
+    try:
+        success = await repositories.credits.consume(
+            user_id, amount, f"Feature: {feature_type.value}", idempotency_key,
+            fingerprint("consume", amount, feature_type.value)
+        )
+    except IdempotencyConflict:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different request")
     
     if not success:
         return generate_response(
             data={
                 "user_id": user_id,
-                "balance": get_user_credits(user_id),
+                "balance": await repositories.credits.balance(user_id),
                 "transaction_successful": False
             },
             message="Insufficient credits",
@@ -82,14 +115,17 @@ async def consume_user_credits(request: CreditConsumeRequest, user_id: str = "us
         )
     
     # Get updated balance
-    new_balance = get_user_credits(user_id)
-    
-    add_notification(
-        user_id,
-        f"Credits used: {amount}",
-        f"Feature: {feature_type}. Remaining balance: {new_balance}",
-        "info"
-    )
+    if previous:
+        new_balance = previous["balance"]
+    else:
+        new_balance = await repositories.credits.balance(user_id)
+        
+        await repositories.notifications.add(
+            user_id,
+            f"Credits used: {amount}",
+            f"Feature: {feature_type}. Remaining balance: {new_balance}",
+            "info"
+        )
     
     return generate_response(
         data={
@@ -97,7 +133,21 @@ async def consume_user_credits(request: CreditConsumeRequest, user_id: str = "us
             "consumed": amount,
             "balance": new_balance,
             "feature_used": feature_type,
-            "transaction_successful": True
+            "transaction_successful": True,
+            "replayed": previous is not None
         },
         message=f"Successfully consumed {amount} credits for {feature_type}"
     )
+
+@router.get("/log", response_model=Dict)
+async def get_credit_history(limit: int = 20, user_id: str = Depends(get_current_user_id)):
+    """
+    Get log of credit purchases, usage and referral rewards
+    """
+    # Simulate delay
+    await simulate_delay(0.2, 0.5)
+    
+    return generate_response(
+        data=await repositories.credits.history(user_id, limit),
+        message="Credit log retrieved successfully"
+    )
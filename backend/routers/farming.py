@@ -1,16 +1,18 @@
 
 from fastapi import APIRouter, HTTPException, Depends, Body
-import random
 from typing import Dict, List, Optional
 
 from schemas.farming import FarmingRequest, FarmingResponse, AddChainRequest, FarmingTask
-from models.database import db, get_user_wallet, connect_wallet, add_notification
+from models.database import db
+from models.repository import repositories
+from core.security import get_current_user_id
+from services.farming import farming_plans, farming_tasks
 from utils.helper import generate_response, simulate_delay
 
 router = APIRouter(prefix="/farming")
 
 @router.post("", response_model=Dict)
-async def get_farming_tasks(request: FarmingRequest, user_id: str = "user_1"):
+async def get_farming_tasks(request: FarmingRequest, user_id: str = Depends(get_current_user_id)):
     """
     Get farming tasks for a given project
     """
@@ -19,46 +21,12 @@ async def get_farming_tasks(request: FarmingRequest, user_id: str = "user_1"):
     # Simulate delay
     await simulate_delay()
     
-    # Check wallet connection status
-    wallet = get_user_wallet(user_id)
-    status = "ready" if wallet else "wallet not connected"
-    
-    # Get tasks for the project or generate random ones
-    if project_name in db["farming_tasks"]:
-        tasks = db["farming_tasks"][project_name]
-    else:
-        # Generate random tasks
-        task_types = ["swap", "mint", "lp", "bridge", "stake"]
-        tasks = []
-        for _ in range(random.randint(2, 4)):
-            task_type = random.choice(task_types)
-            tasks.append({
-                "type": task_type,
-                "description": f"{task_type.capitalize()} on {project_name}",
-                "credits": random.randint(5, 15)
-            })
-    
-    # Get a random chain for the project
-    chain = random.choice(db["chains"])["name"]
-    
-    response = {
-        "project_name": project_name,
-        "tasks": tasks,
-        "chain": chain,
-        "status": status
-    }
-    
-    add_notification(
-        user_id,
-        f"Farming tasks identified for {project_name}",
-        f"{len(tasks)} tasks available on {chain}.",
-        "info"
-    )
+    response = await farming_tasks(user_id, project_name)
     
     return generate_response(data=response, message="Farming tasks retrieved successfully")
 
 @router.post("/connect-wallet", response_model=Dict)
-async def connect_user_wallet(wallet_address: str = Body(..., embed=True), user_id: str = "user_1"):
+async def connect_user_wallet(wallet_address: str = Body(..., embed=True), user_id: str = Depends(get_current_user_id)):
     """
     Connect wallet to user account
     """
@@ -66,9 +34,9 @@ async def connect_user_wallet(wallet_address: str = Body(..., embed=True), user_
     await simulate_delay()
     
     # Connect the wallet
-    wallet = connect_wallet(user_id, wallet_address)
+    wallet = await repositories.wallets.connect(user_id, wallet_address)
     
-    add_notification(
+    await repositories.notifications.add(
         user_id,
         "Wallet connected successfully",
         f"Wallet {wallet_address[:6]}...{wallet_address[-4:]} is now connected to your account.",
@@ -78,7 +46,7 @@ async def connect_user_wallet(wallet_address: str = Body(..., embed=True), user_
     return generate_response(data=wallet, message="Wallet connected successfully")
 
 @router.post("/add-chain", response_model=Dict)
-async def add_new_chain(request: AddChainRequest, user_id: str = "user_1"):
+async def add_new_chain(request: AddChainRequest, user_id: str = Depends(get_current_user_id)):
     """
     Add a new chain manually
     """
@@ -102,8 +70,9 @@ async def add_new_chain(request: AddChainRequest, user_id: str = "user_1"):
     }
     
     db["chains"].append(new_chain)
+    farming_plans.invalidate()
     
-    add_notification(
+    await repositories.notifications.add(
         user_id,
         f"New chain added: {request.chain_name}",
         f"Chain ID: {request.chain_id}",
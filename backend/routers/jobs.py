@@ -0,0 +1,79 @@
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from typing import Dict, Optional
+
+from schemas.analyze import AnalyzeRequest
+from schemas.farming import FarmingRequest
+from schemas.twitter import TwitterRequest
+from models.repository import repositories
+from core.security import get_current_user_id
+from routers.analyze import charge_analysis
+from services.jobs import Job, QueueFull, job_queue
+from utils.helper import generate_response
+
+router = APIRouter(prefix="/jobs")
+
+async def submit_job(type: str, user_id: str, params: Dict, charge: Optional[Dict] = None):
+    """Queue a job, in the paid lane for users who bought credits, and answer 202 with its id"""
+    paid = await repositories.credits.has_purchased(user_id)
+    try:
+        job = job_queue.submit(type, user_id, params, paid)
+    except QueueFull as error:
+        raise HTTPException(status_code=503, detail=str(error))
+    response = generate_response(data={**job.to_dict(), **(charge or {})}, message=f"{type.capitalize()} job queued")
+    response.status_code = 202
+    return response
+
+def get_user_job(job_id: str, user_id: str) -> Job:
+    job = job_queue.get(job_id)
+    # Other users' jobs are reported missing rather than forbidden
+    if job is None or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@router.post("/analyze", response_model=Dict, status_code=202)
+async def submit_analyze_job(
+    request: AnalyzeRequest,
+    refresh: bool = Query(False, description="Reload every section, recomputing only those whose inputs changed"),
+    user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Queue a project analysis, charged like POST /analyze, and return its job id
+    """
+    website = str(request.website) if request.website else None
+    charge = await charge_analysis(user_id, [(request.project_name, website)], idempotency_key)
+    params = {"project_name": request.project_name, "website": website, "refresh": refresh}
+    return await submit_job("analyze", user_id, params, charge)
+
+@router.post("/farming", response_model=Dict, status_code=202)
+async def submit_farming_job(request: FarmingRequest, user_id: str = Depends(get_current_user_id)):
+    """
+    Queue a farming plan lookup and return its job id
+    """
+    return await submit_job("farming", user_id, {"project_name": request.project_name})
+
+@router.post("/twitter", response_model=Dict, status_code=202)
+async def submit_twitter_job(request: TwitterRequest, user_id: str = Depends(get_current_user_id)):
+    """
+    Queue a Twitter content plan and return its job id
+    """
+    params = {"project_name": request.project_name, "twitter_handle": request.twitter_handle}
+    return await submit_job("twitter", user_id, params)
+
+@router.get("/{job_id}", response_model=Dict)
+async def get_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+    """
+    Get the status of a job, and its result once finished
+    """
+    job = get_user_job(job_id, user_id)
+    return generate_response(data=job.to_dict(), message=f"Job {job.status}")
+
+@router.delete("/{job_id}", response_model=Dict)
+async def cancel_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+    """
+    Cancel a queued or running job
+    """
+    job = get_user_job(job_id, user_id)
+    if not job_queue.cancel(job):
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return generate_response(data=job.to_dict(), message="Job cancellation requested")
@@ -1,15 +1,44 @@
 
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List
+from fastapi import APIRouter, HTTPException, Depends, Header
+from typing import AsyncIterator, Dict, List, Optional
 
 from schemas.notification import NotificationCreate, NotificationResponse
-from models.database import db, add_notification, get_user_notifications
+from models.repository import repositories
+from core.config import settings
+from core.pubsub import Subscription, notification_hub, notification_seq
+from core.responses import EventStreamResponse, dumps
+from core.security import get_current_user_id
 from utils.helper import generate_response, simulate_delay
 
 router = APIRouter(prefix="/notifications")
 
+def encode_notification(notification: Dict) -> bytes:
+    """SSE message whose id lets the client resume after reconnecting"""
+    return b"id: %s\nevent: notification\ndata: %s\n\n" % (notification["id"].encode(), dumps(notification))
+
+async def notification_events(subscription: Subscription, replay: List[Dict]) -> AsyncIterator[bytes]:
+    """Replayed notifications, then live ones as they are published, with heartbeats in between"""
+    try:
+        sent = set()
+        for notification in replay:
+            sent.add(notification["id"])
+            yield encode_notification(notification)
+        while subscription.active:
+            notifications = await subscription.next(settings.NOTIFICATION_STREAM_HEARTBEAT)
+            if not notifications and subscription.active:
+                yield b": heartbeat\n\n"
+            for notification in notifications:
+                # Published while the replay was being read
+                if sent and notification["id"] in sent:
+                    continue
+                yield encode_notification(notification)
+            sent.clear()
+        # Ending the stream makes the client reconnect with Last-Event-ID and catch up
+    finally:
+        notification_hub.unsubscribe(subscription)
+
 @router.get("", response_model=Dict)
-async def get_notifications(limit: int = 5, user_id: str = "user_1"):
+async def get_notifications(limit: int = 5, user_id: str = Depends(get_current_user_id)):
     """
     Get latest notifications for user
     """
@@ -17,15 +46,51 @@ async def get_notifications(limit: int = 5, user_id: str = "user_1"):
     await simulate_delay(0.2, 0.5)
     
     # Get notifications
-    notifications = get_user_notifications(user_id, limit)
+    notifications = await repositories.notifications.latest(user_id, limit)
     
     return generate_response(
         data=notifications,
         message="Notifications retrieved successfully"
     )
 
+@router.get("/stream")
+async def stream_notifications(
+    last_event_id: Optional[str] = Header(None),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Push new notifications as server-sent events instead of polling.
+    Reconnecting clients send Last-Event-ID and receive what they missed first.
+    """
+    # Subscribe before reading the backlog so nothing falls between the two
+    subscription = notification_hub.subscribe(user_id)
+    replay = []
+    if last_event_id:
+        last_seq = notification_seq(last_event_id)
+        try:
+            recent = await repositories.notifications.latest(user_id, settings.NOTIFICATION_STREAM_QUEUE_SIZE)
+        except Exception:
+            notification_hub.unsubscribe(subscription)
+            raise
+        replay = [n for n in reversed(recent) if notification_seq(n["id"]) > last_seq]
+
+    return EventStreamResponse(notification_events(subscription, replay), on_disconnect=subscription.close)
+
+@router.get("/unread-count", response_model=Dict)
+async def get_notifications_unread_count(user_id: str = Depends(get_current_user_id)):
+    """
+    Get the number of unread notifications for user
+    """
+    # Simulate delay
+    await simulate_delay(0.2, 0.5)
+    
+    return generate_response(
+        data={"unread": await repositories.notifications.unread_count(user_id)},
+        message="Unread count retrieved successfully"
+    )
+
 @router.post("", response_model=Dict)
-async def create_notification(notification: NotificationCreate, user_id: str = "user_1"):
+async def create_notification(notification: NotificationCreate, user_id: str = Depends(get_current_user_id)):
     """
     Create a new notification
     """
@@ -33,7 +98,7 @@ async def create_notification(notification: NotificationCreate, user_id: str = "
     await simulate_delay()
     
     # Add notification
-    new_notification = add_notification(
+    new_notification = await repositories.notifications.add(
         user_id,
         notification.title,
         notification.message,
@@ -46,58 +111,49 @@ async def create_notification(notification: NotificationCreate, user_id: str = "
     )
 
 @router.post("/mark-read", response_model=Dict)
-async def mark_notification_read(notification_id: str = None, all: bool = False, user_id: str = "user_1"):
+async def mark_notification_read(notification_id: str = None, all: bool = False, user_id: str = Depends(get_current_user_id)):
     """
     Mark notification(s) as read
     """
     # Simulate delay
     await simulate_delay(0.2, 0.5)
     
-    # Get user notifications
-    user_notifications = [n for n in db["notifications"] if n["user_id"] == user_id]
-    
     if all:
         # Mark all as read
-        for notif in user_notifications:
-            notif["read"] = True
+        marked_count = await repositories.notifications.mark_all_read(user_id)
         
         return generate_response(
-            data={"marked_count": len(user_notifications)},
+            data={"marked_count": marked_count},
             message="All notifications marked as read"
         )
     
     if not notification_id:
         raise HTTPException(status_code=400, detail="Notification ID required")
     
-    # Find specific notification
-    notification = next((n for n in user_notifications if n["id"] == notification_id), None)
+    # Find and mark specific notification
+    notification = await repositories.notifications.mark_read(user_id, notification_id)
     
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification["read"] = True
-    
     return generate_response(
         data=notification,
         message="Notification marked as read"
     )
 
 @router.delete("/{notification_id}", response_model=Dict)
-async def delete_notification(notification_id: str, user_id: str = "user_1"):
+async def delete_notification(notification_id: str, user_id: str = Depends(get_current_user_id)):
     """
     Delete a notification
     """
     # Simulate delay
     await simulate_delay()
     
-    # Find notification index
-    for i, notif in enumerate(db["notifications"]):
-        if notif["id"] == notification_id and notif["user_id"] == user_id:
-            # Remove notification
-            db["notifications"].pop(i)
-            return generate_response(
-                data={"id": notification_id},
-                message="Notification deleted successfully"
-            )
+    # Remove notification
+    if not await repositories.notifications.delete(user_id, notification_id):
+        raise HTTPException(status_code=404, detail="Notification not found")
     
-    raise HTTPException(status_code=404, detail="Notification not found")
+    return generate_response(
+        data={"id": notification_id},
+        message="Notification deleted successfully"
+    )
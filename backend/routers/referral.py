@@ -1,15 +1,17 @@
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from typing import Dict
 
 from schemas.referral import ReferralRequest, ReferralResponse
-from models.database import db, add_referral, get_referral_stats, add_notification
+from models.database import REFERRAL_REWARD
+from models.repository import repositories
+from core.security import get_current_user_id
 from utils.helper import generate_response, simulate_delay
 
 router = APIRouter(prefix="/referral")
 
 @router.get("", response_model=Dict)
-async def get_user_referrals(user_id: str = "user_1"):
+async def get_user_referrals(user_id: str = Depends(get_current_user_id)):
     """
     Get referral stats for current user
     """
@@ -17,7 +19,7 @@ async def get_user_referrals(user_id: str = "user_1"):
     await simulate_delay()
     
     # Get referral stats
-    stats = get_referral_stats(user_id)
+    stats = await repositories.referrals.stats(user_id)
     
     return generate_response(
         data=stats,
@@ -25,7 +27,7 @@ async def get_user_referrals(user_id: str = "user_1"):
     )
 
 @router.post("", response_model=Dict)
-async def refer_user(request: ReferralRequest, user_id: str = "user_1"):
+async def refer_user(request: ReferralRequest, user_id: str = Depends(get_current_user_id)):
     """
     Refer a new user
     """
@@ -33,18 +35,23 @@ async def refer_user(request: ReferralRequest, user_id: str = "user_1"):
     await simulate_delay()
     
     # Process referral
-    success = add_referral(user_id, request.referee_email)
+    success = await repositories.referrals.add(user_id, request.referee_email)
     
     if not success:
         raise HTTPException(status_code=400, detail="Failed to process referral")
     
+    # Add credits to referrer
+    await repositories.credits.add(
+        user_id, REFERRAL_REWARD, "referral", f"Referral of {request.referee_email}"
+    )
+    
     # Get updated stats
-    stats = get_referral_stats(user_id)
+    stats = await repositories.referrals.stats(user_id)
     
-    add_notification(
+    await repositories.notifications.add(
         user_id,
         "Referral successful!",
-        f"You earned 10 credits for referring {request.referee_email}",
+        f"You earned {REFERRAL_REWARD} credits for referring {request.referee_email}",
         "success"
     )
     
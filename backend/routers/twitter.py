@@ -1,17 +1,20 @@
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 import random
 from datetime import datetime, timedelta
 from typing import Dict, List
 
 from schemas.twitter import TwitterRequest, TwitterResponse, Tweet
-from models.database import db, add_notification
+from models.database import db
+from models.repository import repositories
+from core.security import get_current_user_id
+from services.twitter import twitter_plan
 from utils.helper import generate_response, simulate_delay
 
 router = APIRouter(prefix="/twitter")
 
 @router.post("", response_model=Dict)
-async def generate_twitter_plan(request: TwitterRequest, user_id: str = "user_1"):
+async def generate_twitter_plan(request: TwitterRequest, user_id: str = Depends(get_current_user_id)):
     """
     Generate a Twitter content plan based on project information
     """
@@ -21,56 +24,12 @@ async def generate_twitter_plan(request: TwitterRequest, user_id: str = "user_1"
     project_name = request.project_name
     twitter_handle = request.twitter_handle
     
-    # Get project features or use generic ones
-    features = db["project_features"].get(project_name, ["innovation", "technology", "community", "scalability", "security"])
-    
-    # Generate tweets
-    tweets = []
-    now = datetime.now()
-    
-    for i in range(3):
-        # Pick random template and feature
-        template = random.choice(db["twitter_templates"])
-        feature = random.choice(features)
-        
-        # Format the tweet content
-        content = template.format(project=project_name, feature=feature)
-        
-        # Determine tweet type
-        tweet_types = ["post", "retweet", "like"]
-        weights = [0.5, 0.3, 0.2]  # Weighted probabilities
-        tweet_type = random.choices(tweet_types, weights=weights, k=1)[0]
-        
-        # Schedule time (spread over next 7 days)
-        scheduled_time = now + timedelta(
-            days=random.randint(i, i+2),
-            hours=random.randint(0, 23),
-            minutes=random.randint(0, 59)
-        )
-        
-        tweets.append({
-            "content": content,
-            "type": tweet_type,
-            "scheduled_time": scheduled_time.isoformat()
-        })
-    
-    response = {
-        "project_name": project_name,
-        "twitter_handle": twitter_handle,
-        "tweets": tweets
-    }
-    
-    add_notification(
-        user_id,
-        "Twitter content plan generated",
-        f"Created {len(tweets)} tweets for {project_name}",
-        "success"
-    )
+    response = await twitter_plan(user_id, project_name, twitter_handle)
     
     return generate_response(data=response, message="Twitter content plan generated successfully")
 
 @router.post("/schedule", response_model=Dict)
-async def schedule_tweet(tweet_id: str, user_id: str = "user_1"):
+async def schedule_tweet(tweet_id: str, user_id: str = Depends(get_current_user_id)):
     """
     Schedule a specific tweet
     """
@@ -85,7 +44,7 @@ async def schedule_tweet(tweet_id: str, user_id: str = "user_1"):
         "scheduled_time": scheduled_time.isoformat()
     }
     
-    add_notification(
+    await repositories.notifications.add(
         user_id,
         "Tweet scheduled",
         f"Tweet will be posted at {scheduled_time.strftime('%Y-%m-%d %H:%M')}",
@@ -95,7 +54,7 @@ async def schedule_tweet(tweet_id: str, user_id: str = "user_1"):
     return generate_response(data=response, message="Tweet scheduled successfully")
 
 @router.get("/history", response_model=Dict)
-async def get_twitter_history(user_id: str = "user_1"):
+async def get_twitter_history(user_id: str = Depends(get_current_user_id)):
     """
     Get history of scheduled and posted tweets
     """
@@ -3,6 +3,7 @@ from fastapi import APIRouter, HTTPException, Query, Path, Depends
 from typing import List, Optional
 
 from schemas.analyze import ProjectAnalyzeRequest, ProjectAnalysisResult, FetcherRequest
+from services.cache import analysis_cache, make_key
 from utils.helper import generate_response
 
 router = APIRouter(prefix="/analyze")
@@ -49,12 +50,17 @@ async def get_fetcher_data(
     if fetcher_type not in valid_fetchers:
         raise HTTPException(status_code=400, detail=f"Invalid fetcher type. Must be one of: {', '.join(valid_fetchers)}")
     
-    # Mock response, implement actual logic later
+    async def load():
+        # Mock response, implement actual logic later
+        return f"Mock {fetcher_type} data for project"
+    
+    result = await analysis_cache.get_or_load(make_key(project_id, None, fetcher_type), load)
+    
     return generate_response(
         data={
             "project_id": project_id,
             "fetcher_type": fetcher_type,
-            "result": f"Mock {fetcher_type} data for project"
+            "result": result
         },
         message=f"{fetcher_type.capitalize()} data retrieved successfully"
     )
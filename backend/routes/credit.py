@@ -2,6 +2,8 @@
 from fastapi import APIRouter, HTTPException, Path, Query, Depends
 from typing import List, Optional
 
+from core.security import get_current_user_id
+from models.database import get_credit_log
 from utils.helper import generate_response
 from schemas.user import CreditLog, ReferralInfo
 
@@ -72,26 +74,15 @@ async def topup_credits(
     )
 
 @router.get("/log", response_model=dict)
-async def get_credit_log():
+async def get_credit_log_entries(
+    limit: int = Query(20, description="Maximum number of entries"),
+    user_id: str = Depends(get_current_user_id)
+):
     """
     Get log of credit usage and top-ups
     """
-    # Mock response, implement actual logic later
     return generate_response(
-        data=[
-            {
-                "action": "use",
-                "amount": 1,
-                "description": "Analyze Project XYZ",
-                "timestamp": "2023-11-01T10:15:00"
-            },
-            {
-                "action": "topup",
-                "amount": 10,
-                "description": "Small package purchase",
-                "timestamp": "2023-10-28T16:30:00"
-            }
-        ],
+        data=get_credit_log(user_id, limit),
         message="Credit log retrieved successfully"
     )
 
@@ -7,6 +7,7 @@ class AirdropBase(BaseModel):
     projectName: str = Field(..., min_length=1, max_length=100)
     link: HttpUrl
     deadline: datetime
+    startDate: Optional[datetime] = None
     description: str
     chain: str
 
@@ -6,6 +6,9 @@ class AnalyzeRequest(BaseModel):
     project_name: str = Field(..., min_length=1, max_length=100)
     website: Optional[HttpUrl] = None
 
+class AnalyzeBatchRequest(BaseModel):
+    projects: List[AnalyzeRequest] = Field(..., min_length=1)
+
 class AnalysisSection(BaseModel):
     title: str
     content: str
@@ -20,3 +23,4 @@ class AnalyzeResponse(BaseModel):
     team: Optional[List[str]] = None
     sections_completed: int = 0
     total_sections: int = 5
+    failed_sections: Dict[str, str] = {}
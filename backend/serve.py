@@ -0,0 +1,67 @@
+"""
+Production entry point: no reload, one worker process per CPU core by default
+once state is shared, a single worker otherwise.
+
+Each worker has its own memory, so running more than one needs every piece of
+request state to live outside the process: STORAGE_BACKEND=mongo for users,
+credits, notifications, airdrops, wallets and referrals, and AUTH_MODE=jwt for
+tokens. Without them the default is one worker, and an explicit WORKERS above
+one is refused. The airdrop scheduler runs in a single worker (see SCHEDULER_LOCK_FILE).
+
+Run from the backend directory:
+    python serve.py
+    WORKERS=4 STORAGE_BACKEND=mongo AUTH_MODE=jwt python serve.py
+"""
+import logging
+import os
+import sys
+from typing import List, Tuple
+
+import uvicorn
+
+from core.config import settings
+
+logger = logging.getLogger("serve")
+
+def worker_count() -> int:
+    """WORKERS, or by default one per core if workers can share state and one otherwise"""
+    if settings.WORKERS:
+        return settings.WORKERS
+    errors, _ = shared_state_problems()
+    if errors:
+        return 1
+    return os.cpu_count() or 1
+
+def shared_state_problems() -> Tuple[List[str], List[str]]:
+    """(errors, warnings) about state that would differ between workers"""
+    errors = []
+    warnings = []
+    if settings.STORAGE_BACKEND != "mongo":
+        errors.append("STORAGE_BACKEND=memory keeps users, credits and notifications per worker; use mongo")
+    if settings.AUTH_MODE == "session":
+        errors.append("AUTH_MODE=session keeps tokens per worker; use jwt")
+    else:
+        warnings.append("revoked JWTs are only rejected by the worker that handled the logout")
+    warnings.append("notification streams only push notifications created by their own worker")
+    warnings.append("background jobs can only be polled on the worker that accepted them")
+    return errors, warnings
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+    workers = worker_count()
+    if workers > 1:
+        errors, warnings = shared_state_problems()
+        for warning in warnings:
+            logger.warning("%d workers: %s", workers, warning)
+        if errors:
+            for error in errors:
+                logger.error("%d workers: %s", workers, error)
+            logger.error("Refusing to start; fix the above or set WORKERS=1")
+            sys.exit(1)
+        # Workers import the settings afresh; let the scheduler see airdrops the others add
+        os.environ.setdefault("AIRDROP_SCHEDULER_REFRESH_INTERVAL", "60")
+
+    uvicorn.run("main:app", host=settings.HOST, port=settings.PORT, workers=workers, reload=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core.config import settings
+from models.airdrop_catalog import to_timestamp
+from models.repository import repositories
+from services.broadcast import broadcasts
+
+logger = logging.getLogger(__name__)
+
+# Scheduled event kinds, in the order they fire for one airdrop
+ACTIVATE = "activate"
+REMIND = "remind"
+EXPIRE = "expire"
+
+class DeadlineQueue:
+    """
+    Time-ordered (when, kind, key) events with O(log n) scheduling and O(1) cancellation.
+
+    Cancelled entries stay in the heap marked dead and are skipped when popped; the
+    heap is rebuilt once dead entries outnumber live ones.
+    """
+
+    def __init__(self):
+        # [when, order, kind, key, live]
+        self._heap: List[list] = []
+        # (kind, key) -> its live heap entry
+        self._entries: Dict[Tuple[str, str], list] = {}
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def schedule(self, when: float, kind: str, key: str) -> None:
+        """Schedule an event, replacing any pending event of the same kind and key"""
+        self.cancel(kind, key)
+        entry = [when, next(self._order), kind, key, True]
+        self._entries[(kind, key)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def cancel(self, kind: str, key: str) -> bool:
+        entry = self._entries.pop((kind, key), None)
+        if entry is None:
+            return False
+        entry[-1] = False
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [entry for entry in self._heap if entry[-1]]
+            heapq.heapify(self._heap)
+        return True
+
+    def next_due(self) -> Optional[float]:
+        """When the earliest live event fires"""
+        heap = self._heap
+        while heap and not heap[0][-1]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now: float, limit: int) -> List[Tuple[str, str]]:
+        """Up to limit (kind, key) events due at now, earliest first"""
+        heap = self._heap
+        due = []
+        while heap and len(due) < limit and heap[0][0] <= now:
+            when, _, kind, key, live = heapq.heappop(heap)
+            if live:
+                del self._entries[(kind, key)]
+                due.append((kind, key))
+        return due
+
+def initial_status(airdrop: Dict, now: Optional[float] = None) -> str:
+    """Status an airdrop should have right now given its start date and deadline"""
+    now = time.time() if now is None else now
+    if to_timestamp(airdrop["deadline"]) <= now:
+        return "expired"
+    if airdrop.get("startDate") and to_timestamp(airdrop["startDate"]) > now:
+        return "upcoming"
+    return "active"
+
+class AirdropLifecycle:
+    """Moves airdrops through upcoming -> active -> expired and broadcasts deadline reminders"""
+
+    def __init__(self, reminder_hours: float, batch_size: int, max_sleep: float = 60.0,
+                 refresh_interval: float = 0.0):
+        self.queue = DeadlineQueue()
+        self.reminder_seconds = reminder_hours * 3600
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        # Reload every airdrop this often (0 never) to pick up ones other workers added
+        self.refresh_interval = refresh_interval
+        self._wakeup = asyncio.Event()
+
+    def track(self, airdrop: Dict, now: Optional[float] = None) -> None:
+        """Schedule the remaining transitions and reminder of an airdrop"""
+        now = time.time() if now is None else now
+        airdrop_id = airdrop["id"]
+        deadline = to_timestamp(airdrop["deadline"])
+        self.untrack(airdrop_id)
+        if airdrop.get("status") == "expired":
+            return
+        if airdrop.get("status") == "upcoming" and airdrop.get("startDate"):
+            self.queue.schedule(to_timestamp(airdrop["startDate"]), ACTIVATE, airdrop_id)
+        # A reminder whose time already passed is skipped rather than sent late
+        if deadline - self.reminder_seconds > now:
+            self.queue.schedule(deadline - self.reminder_seconds, REMIND, airdrop_id)
+        self.queue.schedule(deadline, EXPIRE, airdrop_id)
+        self._wakeup.set()
+
+    def untrack(self, airdrop_id: str) -> None:
+        for kind in (ACTIVATE, REMIND, EXPIRE):
+            self.queue.cancel(kind, airdrop_id)
+
+    async def load(self) -> int:
+        """Track every airdrop in the active repository"""
+        self.queue = DeadlineQueue()
+        tracked = 0
+        cursor = None
+        while True:
+            page = await repositories.airdrops.list(limit=self.batch_size, cursor=cursor)
+            for airdrop in page["items"]:
+                self.track(airdrop)
+                tracked += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return tracked
+
+    async def run_due(self, now: Optional[float] = None) -> int:
+        """Fire every due event, a batch at a time"""
+        fired = 0
+        while True:
+            due = self.queue.pop_due(time.time() if now is None else now, self.batch_size)
+            for kind, airdrop_id in due:
+                try:
+                    await self._fire(kind, airdrop_id)
+                except Exception:
+                    logger.exception("Airdrop %s event failed for %s", kind, airdrop_id)
+            fired += len(due)
+            if len(due) < self.batch_size:
+                return fired
+            # Let requests run between batches
+            await asyncio.sleep(0)
+
+    async def run_forever(self) -> None:
+        """Fire events as they come due, sleeping until the next one"""
+        next_refresh = time.time() + self.refresh_interval if self.refresh_interval else float("inf")
+        while True:
+            if time.time() >= next_refresh:
+                await self.load()
+                next_refresh = time.time() + self.refresh_interval
+            await self.run_due()
+            next_due = self.queue.next_due()
+            timeout = min(self.max_sleep, next_refresh - time.time())
+            if next_due is not None:
+                timeout = min(timeout, next_due - time.time())
+            if timeout <= 0:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, kind: str, airdrop_id: str) -> None:
+        if kind == ACTIVATE:
+            await repositories.airdrops.set_status(airdrop_id, "active")
+        elif kind == EXPIRE:
+            await repositories.airdrops.set_status(airdrop_id, "expired")
+        elif kind == REMIND:
+            airdrop = await repositories.airdrops.get(airdrop_id)
+            if airdrop is not None:
+                await self.notify_deadline(airdrop)
+
+    async def notify_deadline(self, airdrop: Dict) -> Dict:
+        """Tell every user the airdrop deadline is near"""
+        hours = round(self.reminder_seconds / 3600)
+        return await broadcasts.broadcast(
+            f"Airdrop deadline in {hours}h: {airdrop['projectName']}",
+            f"Deadline: {airdrop['deadline'][:16].replace('T', ' ')}",
+            "warning"
+        )
+
+airdrop_lifecycle = AirdropLifecycle(
+    settings.AIRDROP_REMINDER_HOURS,
+    settings.AIRDROP_SCHEDULER_BATCH_SIZE,
+    refresh_interval=settings.AIRDROP_SCHEDULER_REFRESH_INTERVAL
+)
@@ -0,0 +1,277 @@
+import asyncio
+import html
+import json
+import logging
+import re
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from core.config import settings
+from models.database import db
+from models.repository import repositories
+from services.cache import analysis_cache, fingerprint, make_key, section_store
+from services.fetcher import FetchError, fetcher
+from services.llm import llm_client, token_sink
+from utils.helper import simulate_delay
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("about_project", "tokenomics", "roadmap", "backers", "team")
+# Part of every section fingerprint; bump it when compute_section changes so stored sections are recomputed
+SECTION_VERSION = 1
+# Sections summarized by the LLM when it is enabled; the others are lists kept as they are
+SUMMARIZED_SECTIONS = ("about_project", "tokenomics", "roadmap")
+
+# <meta name="description" content="..."> and its Open Graph twin, in either attribute order
+META_DESCRIPTION = re.compile(
+    r"""<meta\s[^>]*?(?:name|property)\s*=\s*["'](?:og:)?description["'][^>]*?content\s*=\s*["']([^"']*)["']"""
+    r"""|<meta\s[^>]*?content\s*=\s*["']([^"']*)["'][^>]*?(?:name|property)\s*=\s*["'](?:og:)?description["']""",
+    re.IGNORECASE
+)
+TITLE = re.compile(r"<title[^>]*>([^<]*)</title>", re.IGNORECASE)
+
+def get_project_data(project_name: str) -> Dict[str, Any]:
+    """Get the source data for a project, falling back to generic data"""
+    if project_name in db["projects"]:
+        return db["projects"][project_name]
+    # For demo, we'll accept any project name but return generic data
+    return {
+        "about_project": f"{project_name} is an innovative Web3 project.",
+        "tokenomics": "Token distribution information not available.",
+        "roadmap": "Roadmap information not available.",
+        "backers": ["Unknown investors"],
+        "team": ["Team information not available"]
+    }
+
+def describe_page(page: str) -> Optional[str]:
+    """The meta description of an HTML page, or its title"""
+    match = META_DESCRIPTION.search(page)
+    text = (match.group(1) or match.group(2)) if match else None
+    if not text:
+        match = TITLE.search(page)
+        text = match.group(1) if match else None
+    text = " ".join(html.unescape(text).split()) if text else ""
+    return text or None
+
+async def describe_website(website: str) -> Optional[str]:
+    """What a project's website says about it, None if it cannot be fetched"""
+    try:
+        result = await fetcher.fetch(website)
+    except FetchError as error:
+        logger.info("Could not fetch %s: %s", website, error)
+        return None
+    if "html" not in result.content_type:
+        return None
+    return describe_page(result.text())
+
+async def section_inputs(project_name: str, section: str, website: Optional[str] = None) -> Any:
+    """The source data a section is computed from, cheap to gather compared to computing it"""
+    if website and section == "about_project":
+        description = await describe_website(website)
+        if description:
+            return description
+    return get_project_data(project_name)[section]
+
+async def compute_section(project_name: str, section: str, inputs: Any, website: Optional[str] = None) -> Any:
+    """Turn the source data of a section into its analysis"""
+    if llm_client.enabled and section in SUMMARIZED_SECTIONS:
+        return await llm_client.summarize(project_name, website, section, inputs, SUMMARIZED_SECTIONS)
+    # Simulate the analysis work with delays
+    await simulate_delay(0.5, 1.5)
+    return inputs
+
+async def load_section(project_name: str, section: str, website: Optional[str] = None) -> Tuple[Any, bool]:
+    """(content, reused) of a section, computing it only if its inputs changed since it was last computed"""
+    key = make_key(project_name, website, section)
+    inputs = await section_inputs(project_name, section, website)
+    inputs_fingerprint = fingerprint(SECTION_VERSION, llm_client.version, section, inputs)
+    found, content = section_store.lookup(key, inputs_fingerprint)
+    if found:
+        return content, True
+    content = await compute_section(project_name, section, inputs, website)
+    section_store.store(key, inputs_fingerprint, content)
+    return content, False
+
+async def fetch_section(project_name: str, section: str, website: Optional[str] = None,
+                        refresh: bool = False) -> Tuple[Any, bool]:
+    """
+    (content, reused) of a section through the shared analysis cache, reloading it on
+    refresh. Reused unless this call's load computed it: a cache hit, a load shared
+    with another caller, or stored content whose inputs did not change.
+    """
+    key = make_key(project_name, website, section)
+    if refresh:
+        analysis_cache.invalidate(key)
+    outcome = {"reused": True}
+
+    async def load() -> Any:
+        content, outcome["reused"] = await load_section(project_name, section, website)
+        return content
+
+    content = await analysis_cache.get_or_load(key, load)
+    return content, outcome["reused"]
+
+async def run_section(project_name: str, section: str, website: Optional[str] = None,
+                      timeout: Optional[float] = None, refresh: bool = False) -> Dict:
+    """Fetch a section with a timeout, reporting failures instead of raising"""
+    timeout = settings.ANALYZE_SECTION_TIMEOUT if timeout is None else timeout
+    try:
+        content, reused = await asyncio.wait_for(fetch_section(project_name, section, website, refresh), timeout)
+    except asyncio.TimeoutError:
+        return {"section": section, "status": "timeout", "error": f"Timed out after {timeout}s"}
+    except Exception as e:
+        return {"section": section, "status": "failed", "error": str(e)}
+    return {"section": section, "status": "completed", "content": content, "reused": reused}
+
+def build_analysis(project_name: str, results) -> Dict:
+    """Assemble section results into the analysis response"""
+    response = {"project_name": project_name}
+    failed_sections = {}
+    reused_sections = []
+    for result in results:
+        if result["status"] == "completed":
+            response[result["section"]] = result["content"]
+            if result["reused"]:
+                reused_sections.append(result["section"])
+        else:
+            response[result["section"]] = None
+            failed_sections[result["section"]] = result["error"]
+    response["sections_completed"] = len(SECTIONS) - len(failed_sections)
+    response["total_sections"] = len(SECTIONS)
+    response["failed_sections"] = failed_sections
+    response["reused_sections"] = sorted(reused_sections, key=SECTIONS.index)
+    return response
+
+async def analyze(project_name: str, website: Optional[str] = None,
+                  timeout: Optional[float] = None, refresh: bool = False) -> Dict:
+    """Fetch all sections of a project concurrently"""
+    results = await asyncio.gather(
+        *(run_section(project_name, section, website, timeout, refresh) for section in SECTIONS)
+    )
+    return build_analysis(project_name, results)
+
+async def stream_analysis(project_name: str, website: Optional[str] = None,
+                          timeout: Optional[float] = None, refresh: bool = False) -> AsyncIterator[Dict]:
+    """
+    Yield section events in completion order, followed by a summary event.
+
+    Text of LLM summaries computed for this analysis is yielded as token events
+    while it streams in, before the section events it ends up in.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    def forward_token(text: str) -> None:
+        events.put_nowait({"event": "token", "text": text})
+
+    async def section_event(section: str) -> None:
+        # Set in this task's own context, so only summaries it starts stream here
+        token_sink.set(forward_token)
+        result = {"section": section, "status": "failed", "error": "Section was not analyzed"}
+        try:
+            result = await run_section(project_name, section, website, timeout, refresh)
+        except Exception as e:
+            result = {"section": section, "status": "failed", "error": str(e)}
+        finally:
+            # Every section ends in an event, or the stream below would wait for it forever
+            events.put_nowait({"event": "section", **result})
+
+    tasks = [asyncio.create_task(section_event(section)) for section in SECTIONS]
+    results = []
+    try:
+        while len(results) < len(tasks):
+            event = await events.get()
+            if event["event"] == "section":
+                results.append(event)
+            yield event
+    finally:
+        # Client went away before all sections finished
+        for task in tasks:
+            task.cancel()
+    summary = build_analysis(project_name, results)
+    yield {
+        "event": "done",
+        "project_name": project_name,
+        "sections_completed": summary["sections_completed"],
+        "total_sections": summary["total_sections"],
+        "failed_sections": summary["failed_sections"],
+        "reused_sections": summary["reused_sections"]
+    }
+
+def unique_projects(projects: Iterable[Tuple[str, Optional[str]]]) -> List[Tuple[str, Optional[str]]]:
+    """(project_name, website) pairs without repeats, matched as the cache matches them"""
+    unique = {}
+    for project_name, website in projects:
+        unique.setdefault(make_key(project_name, website, "")[:2], (project_name, website))
+    return list(unique.values())
+
+async def analyze_batch(projects: List[Tuple[str, Optional[str]]], concurrency: int,
+                        timeout: Optional[float] = None, refresh: bool = False) -> AsyncIterator[Dict]:
+    """
+    Yield the analysis of each project as soon as all its sections are in.
+
+    Sections of every project share one limit of concurrency fetches in flight,
+    taken in request order, so earlier projects tend to finish first. The section
+    timeout only starts once a fetch gets its turn.
+    """
+    limit = asyncio.Semaphore(concurrency)
+
+    async def limited_section(project_name: str, section: str, website: Optional[str]) -> Dict:
+        async with limit:
+            return await run_section(project_name, section, website, timeout, refresh)
+
+    async def analyze_project(project_name: str, website: Optional[str]) -> Dict:
+        results = await asyncio.gather(
+            *(limited_section(project_name, section, website) for section in SECTIONS)
+        )
+        return {**build_analysis(project_name, results), "website": website}
+
+    tasks = [asyncio.create_task(analyze_project(project_name, website)) for project_name, website in projects]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away before every project finished
+        for task in tasks:
+            task.cancel()
+
+async def notify_analysis_completed(user_id: str, project_name: str, sections_completed: int, total_sections: int):
+    """Add a notification once a project analysis finishes"""
+    if sections_completed == total_sections:
+        await repositories.notifications.add(
+            user_id,
+            f"Analysis completed for {project_name}",
+            f"All {sections_completed} sections have been analyzed and are ready to view.",
+            "success"
+        )
+    else:
+        await repositories.notifications.add(
+            user_id,
+            f"Analysis partially completed for {project_name}",
+            f"{sections_completed} of {total_sections} sections have been analyzed.",
+            "warning"
+        )
+
+async def notify_batch_completed(user_id: str, analyses: List[Dict]):
+    """Add one notification for a whole batch instead of one per project"""
+    complete = sum(1 for analysis in analyses if analysis["sections_completed"] == analysis["total_sections"])
+    await repositories.notifications.add(
+        user_id,
+        f"Batch analysis completed for {len(analyses)} projects",
+        f"{complete} of {len(analyses)} projects were fully analyzed.",
+        "success" if complete == len(analyses) else "warning"
+    )
+
+async def analyze_for_user(user_id: str, project_name: str, website: Optional[str] = None,
+                           refresh: bool = False) -> Dict:
+    """Analyze a project and notify the user who asked for it"""
+    response = await analyze(project_name, website, refresh=refresh)
+    await notify_analysis_completed(
+        user_id, project_name, response["sections_completed"], response["total_sections"]
+    )
+    return response
+
+def encode_event(event: Dict, format: str = "ndjson") -> str:
+    """Encode a stream event as an NDJSON line or an SSE message"""
+    payload = json.dumps(event, default=str)
+    if format == "sse":
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
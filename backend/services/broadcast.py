@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import Dict
+
+from core.config import settings
+from models.repository import repositories
+
+logger = logging.getLogger(__name__)
+
+class BroadcastDispatcher:
+    """
+    Sends one notification to every user.
+
+    The body is stored once; a background worker then hands each user a reference
+    to it, one bounded batch of users at a time, yielding to the event loop in between.
+    """
+
+    def __init__(self, batch_size: int, max_pending: int):
+        self.batch_size = batch_size
+        self._pending: "asyncio.Queue[str]" = asyncio.Queue(max_pending)
+
+    @property
+    def pending(self) -> int:
+        return self._pending.qsize()
+
+    async def broadcast(self, title: str, message: str, type: str = "info") -> Dict:
+        """Store the body and queue delivery; returns before any user receives it"""
+        body = await repositories.notifications.create_broadcast(title, message, type)
+        # Waits only when max_pending broadcasts are already queued
+        await self._pending.put(body["id"])
+        return body
+
+    async def fan_out(self, broadcast_id: str) -> int:
+        """Deliver a stored broadcast to every user"""
+        delivered = 0
+        async for user_ids in repositories.users.id_batches(self.batch_size):
+            delivered += await repositories.notifications.deliver(broadcast_id, user_ids)
+            await asyncio.sleep(0)
+        return delivered
+
+    async def run_forever(self) -> None:
+        """Deliver queued broadcasts one after another"""
+        while True:
+            broadcast_id = await self._pending.get()
+            try:
+                await self.fan_out(broadcast_id)
+            except Exception:
+                logger.exception("Delivering broadcast %s failed", broadcast_id)
+            finally:
+                self._pending.task_done()
+
+broadcasts = BroadcastDispatcher(settings.BROADCAST_BATCH_SIZE, settings.BROADCAST_MAX_PENDING)
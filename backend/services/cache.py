@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from core.config import settings
+
+CacheKey = Tuple[str, Optional[str], str]
+
+def make_key(project_name: str, website: Optional[str], section: str) -> CacheKey:
+    """Normalize the inputs that identify a cached section"""
+    project_name = project_name.strip().lower()
+    website = website.strip().rstrip("/").lower() if website else None
+    return (project_name, website, section)
+
+def digest(key: CacheKey) -> str:
+    """Content address of a cache key"""
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory cost of a cached value"""
+    return len(json.dumps(value, default=str))
+
+class CacheEntry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+class AnalysisCache:
+    """LRU cache with per-section TTLs, a memory budget and single-flight loading"""
+
+    def __init__(self, max_bytes: int, default_ttl: float, section_ttls: Optional[Dict[str, float]] = None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.section_ttls = section_ttls or {}
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl_for(self, section: str) -> float:
+        return self.section_ttls.get(section, self.default_ttl)
+
+    def get(self, key: CacheKey) -> Tuple[bool, Any]:
+        """Look up a key, returning (found, value)"""
+        address = digest(key)
+        entry = self._entries.get(address)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        if entry.expires_at <= time.monotonic():
+            self._remove(address)
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(address)
+        self.hits += 1
+        return True, entry.value
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        """Store a value and evict least recently used entries over budget"""
+        address = digest(key)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if address in self._entries:
+            self._remove(address)
+        self._entries[address] = CacheEntry(value, size, time.monotonic() + self.ttl_for(key[2]))
+        self.size += size
+        while self.size > self.max_bytes:
+            oldest, _ = next(iter(self._entries.items()))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, address: str) -> None:
+        entry = self._entries.pop(address)
+        self.size -= entry.size
+
+    def invalidate(self, key: CacheKey) -> bool:
+        """Drop a cached value"""
+        address = digest(key)
+        if address not in self._entries:
+            return False
+        self._remove(address)
+        return True
+
+    async def get_or_load(self, key: CacheKey, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached value or load it, sharing one load between concurrent callers"""
+        found, value = self.get(key)
+        if found:
+            return value
+        address = digest(key)
+        task = self._inflight.get(address)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[address] = task
+            task.add_done_callback(lambda done: self._loaded(key, address, done))
+        else:
+            self.coalesced += 1
+        # Shield so a cancelled caller does not abort the load for everyone else
+        return await asyncio.shield(task)
+
+    def _loaded(self, key: CacheKey, address: str, task: asyncio.Future) -> None:
+        self._inflight.pop(address, None)
+        if not task.cancelled() and task.exception() is None:
+            self.set(key, task.result())
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight)
+        }
+
+def fingerprint(*inputs: Any) -> str:
+    """Stable hash of the inputs a section is computed from"""
+    encoded = json.dumps(inputs, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+class SectionRecord:
+    __slots__ = ("fingerprint", "value")
+
+    def __init__(self, fingerprint: str, value: Any):
+        self.fingerprint = fingerprint
+        self.value = value
+
+class SectionStore:
+    """
+    The last computed value of each section with the fingerprint of its inputs.
+
+    Unlike the analysis cache nothing expires: once a section is due for a reload
+    its inputs are gathered again and, when their fingerprint is unchanged, the
+    stored value is reused instead of computing it again. At most max_entries
+    sections are kept, least recently used dropped first.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._records: "OrderedDict[str, SectionRecord]" = OrderedDict()
+        self.reused = 0
+        self.computed = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def lookup(self, key: CacheKey, fingerprint: str) -> Tuple[bool, Any]:
+        """(found, value) of a section last computed from inputs with this fingerprint"""
+        address = digest(key)
+        record = self._records.get(address)
+        if record is None or record.fingerprint != fingerprint:
+            return False, None
+        self._records.move_to_end(address)
+        self.reused += 1
+        return True, record.value
+
+    def store(self, key: CacheKey, fingerprint: str, value: Any) -> None:
+        address = digest(key)
+        self._records.pop(address, None)
+        self._records[address] = SectionRecord(fingerprint, value)
+        self.computed += 1
+        if len(self._records) > self.max_entries:
+            self._records.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._records), "reused": self.reused, "computed": self.computed}
+
+analysis_cache = AnalysisCache(
+    max_bytes=settings.ANALYSIS_CACHE_MAX_BYTES,
+    default_ttl=settings.ANALYSIS_CACHE_TTL,
+    section_ttls=settings.ANALYSIS_CACHE_SECTION_TTLS
+)
+
+section_store = SectionStore(settings.ANALYSIS_SECTION_STORE_SIZE)
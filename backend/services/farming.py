@@ -0,0 +1,103 @@
+import hashlib
+import random
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from core.config import settings
+from models.database import db
+from models.repository import repositories
+
+TASK_TYPES = ("swap", "mint", "lp", "bridge", "stake")
+
+def stable_seed(*parts: str) -> int:
+    """64-bit seed of the parts, the same in every process and run unlike hash()"""
+    digest = hashlib.blake2b("\x1f".join(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+class FarmingPlanner:
+    """
+    The farming plan (chain and tasks) of each project, derived deterministically.
+
+    A project farms on its own chain when one is named after it, otherwise on the
+    chain with the highest stable_seed(project, chain) (rendezvous hashing), so
+    adding a chain only moves the projects that now rank it first. Catalog projects
+    get their catalog tasks; others get tasks drawn from a generator seeded with
+    (project, chain). Plans of known projects are computed up front, others are kept
+    in an LRU of max_plans; both are rebuilt when the chain list changes.
+    """
+
+    def __init__(self, tasks: Dict[str, List[Dict]], chains: List[Dict],
+                 known_projects: Iterable[str] = (), max_plans: int = 10000):
+        self.tasks = tasks
+        self.chains = chains
+        self.max_plans = max_plans
+        self._known_projects = set(tasks) | set(known_projects)
+        self._known: Dict[str, Dict] = {}
+        self._recent: "OrderedDict[str, Dict]" = OrderedDict()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Recompute every plan, e.g. after the chain list changed"""
+        self._recent.clear()
+        self._known = {project: self._build(project) for project in self._known_projects}
+
+    def plan(self, project_name: str) -> Dict:
+        """{"project_name", "chain", "tasks"} of a project; shared, do not mutate"""
+        plan = self._known.get(project_name)
+        if plan is not None:
+            return plan
+        plan = self._recent.get(project_name)
+        if plan is not None:
+            self._recent.move_to_end(project_name)
+            return plan
+        plan = self._recent[project_name] = self._build(project_name)
+        if len(self._recent) > self.max_plans:
+            self._recent.popitem(last=False)
+        return plan
+
+    def chain_for(self, project_name: str) -> str:
+        names = [chain["name"] for chain in self.chains]
+        prefix = project_name.lower()
+        for name in names:
+            if name.lower() == prefix or name.lower().startswith(prefix + " "):
+                return name
+        return max(names, key=lambda name: stable_seed(project_name, name))
+
+    def tasks_for(self, project_name: str, chain: str) -> List[Dict]:
+        if project_name in self.tasks:
+            return self.tasks[project_name]
+        rng = random.Random(stable_seed(project_name, chain))
+        tasks = []
+        for _ in range(rng.randint(2, 4)):
+            task_type = rng.choice(TASK_TYPES)
+            tasks.append({
+                "type": task_type,
+                "description": f"{task_type.capitalize()} on {project_name}",
+                "credits": rng.randint(5, 15)
+            })
+        return tasks
+
+    def _build(self, project_name: str) -> Dict:
+        chain = self.chain_for(project_name)
+        return {"project_name": project_name, "tasks": self.tasks_for(project_name, chain), "chain": chain}
+
+farming_plans = FarmingPlanner(
+    db["farming_tasks"], db["chains"], db["projects"], settings.FARMING_PLAN_CACHE_SIZE
+)
+
+async def farming_tasks(user_id: str, project_name: str) -> Dict:
+    """The farming plan of a project with the user's wallet status, and notify the user"""
+    # Check wallet connection status
+    wallet = await repositories.wallets.get(user_id)
+    status = "ready" if wallet else "wallet not connected"
+
+    # The same project always gets the same chain and tasks
+    plan = farming_plans.plan(project_name)
+
+    await repositories.notifications.add(
+        user_id,
+        f"Farming tasks identified for {project_name}",
+        f"{len(plan['tasks'])} tasks available on {plan['chain']}.",
+        "info"
+    )
+    return {**plan, "status": status}
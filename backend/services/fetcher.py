@@ -0,0 +1,322 @@
+import asyncio
+import ipaddress
+import logging
+import random
+import socket
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from core.config import settings
+
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    # httpx only decodes br responses when brotli is installed
+    ACCEPT_ENCODING = "gzip, deflate"
+
+logger = logging.getLogger(__name__)
+
+# Answers worth trying again after a pause
+RETRY_STATUSES = frozenset((408, 425, 429, 500, 502, 503, 504))
+RETRY_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+ALLOWED_SCHEMES = frozenset(("http", "https"))
+
+class FetchError(Exception):
+    pass
+
+class FetchResult:
+    """A successful response, its body already decoded from gzip/deflate/br"""
+    __slots__ = ("url", "status", "content_type", "body", "revalidated")
+
+    def __init__(self, url: str, status: int, content_type: str, body: bytes, revalidated: bool = False):
+        self.url = url
+        self.status = status
+        self.content_type = content_type
+        self.body = body
+        # True when the server answered 304 and the body is the one cached earlier
+        self.revalidated = revalidated
+
+    def text(self) -> str:
+        charset = "utf-8"
+        for param in self.content_type.split(";")[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "charset" and value:
+                charset = value.strip('"')
+        try:
+            return self.body.decode(charset, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+class Validators:
+    """ETag and Last-Modified of a cached response, sent back to revalidate it"""
+    __slots__ = ("etag", "last_modified", "result")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], result: FetchResult):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.result = result
+
+class Fetcher:
+    """
+    Shared outbound HTTP GETs for the analysis fetchers.
+
+    One pooled AsyncClient (max_connections overall) is reused by every fetch, and
+    at most per_host requests run against one host at a time. Bodies above
+    max_bytes, after decompression, are refused. Timeouts, connection errors and
+    the RETRY_STATUSES are retried up to retries times after a full-jitter
+    exponential backoff, or the server's Retry-After. Responses carrying an ETag or
+    Last-Modified are kept in an LRU of cache_max_bytes and revalidated with
+    If-None-Match / If-Modified-Since, so an unchanged page costs a 304.
+
+    URLs come from users, so only http(s) is fetched, and only from hosts whose
+    every address is public; redirects are followed here, at most max_redirects,
+    checking each hop the same way and taking each hop's own host slot. New
+    connections go through PublicNetworkBackend, which dials the address it just
+    checked, so a host cannot pass the check and then resolve to a private address
+    for the connect (DNS rebinding). allow_private lifts both checks for tests.
+    """
+
+    def __init__(self, timeout: float = 10, max_connections: int = 100, per_host: int = 4,
+                 max_bytes: int = 2 * 1024 * 1024, retries: int = 2, backoff: float = 0.5,
+                 cache_max_bytes: int = 16 * 1024 * 1024, user_agent: str = "ScryptexBot",
+                 max_redirects: int = 5, allow_private: bool = False,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self.cache_max_bytes = cache_max_bytes
+        self.user_agent = user_agent
+        self.max_redirects = max_redirects
+        self.allow_private = allow_private
+        # Tests pass httpx.MockTransport or point URLs at a local stub server
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        # host -> [semaphore, requests holding or waiting for it]; dropped once unused
+        self._hosts: Dict[str, List] = {}
+        self._validators: "OrderedDict[str, Validators]" = OrderedDict()
+        self._cached_bytes = 0
+        self.requests = 0
+        self.retried = 0
+        self.revalidated = 0
+        self.errors = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections)
+            transport = self.transport
+            if transport is None and not self.allow_private:
+                transport = httpx.AsyncHTTPTransport(limits=limits)
+                # httpx 0.25 takes no network_backend; its pool reads this for every new connection
+                transport._pool._network_backend = PublicNetworkBackend()
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=limits,
+                headers={"User-Agent": self.user_agent, "Accept-Encoding": ACCEPT_ENCODING},
+                # Followed in _get_once, so every hop is checked before it is requested
+                follow_redirects=False,
+                transport=transport
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, url: str) -> FetchResult:
+        """GET a URL, raising FetchError once retries are exhausted or the answer is an error"""
+        cached = self._validators.get(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            response, body = await self._get(url, headers)
+        except FetchError:
+            self.errors += 1
+            raise
+
+        if response.status_code == 304 and cached is not None:
+            self.revalidated += 1
+            self._validators.move_to_end(url)
+            result = cached.result
+            return FetchResult(result.url, result.status, result.content_type, result.body, revalidated=True)
+        if response.status_code >= 400:
+            self.errors += 1
+            raise FetchError(f"{url} answered {response.status_code}")
+
+        result = FetchResult(
+            str(response.url), response.status_code, response.headers.get("content-type", ""), body
+        )
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if etag or last_modified:
+            self._remember(url, Validators(etag, last_modified, result))
+        return result
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str) -> AsyncIterator[None]:
+        slot = self._hosts.get(host)
+        if slot is None:
+            slot = self._hosts[host] = [asyncio.Semaphore(self.per_host), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._hosts[host]
+
+    async def _get(self, url: str, headers: Dict[str, str]) -> Tuple[httpx.Response, bytes]:
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                response, body = await self._get_once(url, headers)
+            except RETRY_ERRORS as error:
+                if attempt == self.retries:
+                    raise FetchError(f"{url}: {error!r}") from error
+            except (httpx.HTTPError, httpx.InvalidURL) as error:
+                raise FetchError(f"{url}: {error!r}") from error
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response, body
+                retry_after = response.headers.get("retry-after")
+            self.retried += 1
+            await asyncio.sleep(self._delay(attempt, retry_after))
+
+    async def _get_once(self, url: str, headers: Dict[str, str]) -> Tuple[httpx.Response, bytes]:
+        for _ in range(self.max_redirects + 1):
+            await self._check_url(url)
+            # A redirect to another host counts against that host's limit
+            async with self._host_slot(urlsplit(url).hostname or ""):
+                self.requests += 1
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    if response.has_redirect_location:
+                        url = str(response.url.join(response.headers["location"]))
+                        continue
+                    if response.status_code in RETRY_STATUSES or response.status_code == 304:
+                        return response, b""
+                    length = response.headers.get("content-length", "")
+                    if length.isdigit() and int(length) > self.max_bytes:
+                        raise FetchError(f"{url}: {length} bytes exceed the {self.max_bytes} byte limit")
+                    chunks = []
+                    size = 0
+                    # Counted after decompression, so small compressed bombs are cut off too
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise FetchError(f"{url}: body exceeds the {self.max_bytes} byte limit")
+                        chunks.append(chunk)
+                    return response, b"".join(chunks)
+        raise FetchError(f"{url}: more than {self.max_redirects} redirects")
+
+    async def _check_url(self, url: str) -> None:
+        """Raise FetchError unless url is http(s) on a host that only resolves to public addresses"""
+        parts = urlsplit(url)
+        if parts.scheme not in ALLOWED_SCHEMES or not parts.hostname:
+            raise FetchError(f"{url}: only http and https URLs can be fetched")
+        if self.allow_private:
+            return
+        try:
+            await public_addresses(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        except FetchError as error:
+            raise FetchError(f"{url}: {error}") from None
+
+    def _delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        ceiling = self.backoff * 2 ** attempt
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff * 2 ** self.retries)
+        return random.uniform(0, ceiling)
+
+    def _remember(self, url: str, validators: Validators) -> None:
+        size = len(validators.result.body)
+        if size > self.cache_max_bytes:
+            return
+        previous = self._validators.pop(url, None)
+        if previous is not None:
+            self._cached_bytes -= len(previous.result.body)
+        self._validators[url] = validators
+        self._cached_bytes += size
+        while self._cached_bytes > self.cache_max_bytes:
+            _, evicted = self._validators.popitem(last=False)
+            self._cached_bytes -= len(evicted.result.body)
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retried,
+            "revalidated": self.revalidated,
+            "errors": self.errors,
+            "cached_responses": len(self._validators),
+            "cached_bytes": self._cached_bytes
+        }
+
+def is_public(address: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> bool:
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+async def public_addresses(host: str, port: int) -> List[Union[ipaddress.IPv4Address, ipaddress.IPv6Address]]:
+    """Addresses of host, raising FetchError unless every one of them is public"""
+    try:
+        addresses = [ipaddress.ip_address(host)]
+    except ValueError:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as error:
+            raise FetchError(f"cannot resolve {host}: {error}") from error
+        # Scope ids ("fe80::1%eth0") are not part of the address
+        addresses = list(dict.fromkeys(ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos))
+    for address in addresses:
+        if not is_public(address):
+            raise FetchError(f"{host} resolves to the non-public address {address}")
+    return addresses
+
+class PublicNetworkBackend(httpcore.AsyncNetworkBackend):
+    """Opens connections only to public addresses, dialing the very address it checked"""
+
+    def __init__(self, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None,
+                          local_address: Optional[str] = None, socket_options=None) -> httpcore.AsyncNetworkStream:
+        error = None
+        for address in await public_addresses(host, port):
+            try:
+                return await self._backend.connect_tcp(str(address), port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None,
+                                  socket_options=None) -> httpcore.AsyncNetworkStream:
+        raise httpcore.ConnectError("Unix sockets are not fetched")
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+fetcher = Fetcher(
+    timeout=settings.FETCH_TIMEOUT,
+    max_connections=settings.FETCH_MAX_CONNECTIONS,
+    per_host=settings.FETCH_PER_HOST_CONNECTIONS,
+    max_bytes=settings.FETCH_MAX_BYTES,
+    retries=settings.FETCH_RETRIES,
+    backoff=settings.FETCH_RETRY_BACKOFF,
+    cache_max_bytes=settings.FETCH_CACHE_MAX_BYTES,
+    user_agent=settings.FETCH_USER_AGENT
+)
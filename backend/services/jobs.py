@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import secrets
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+from core.config import settings
+from services.analysis import analyze_for_user
+from services.farming import farming_tasks
+from services.twitter import twitter_plan
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+PAID = "paid"
+FREE = "free"
+
+# Paid jobs taken in a row before a waiting free job gets a turn
+PAID_BURST = 4
+
+Handler = Callable[..., Awaitable[Dict]]
+
+class QueueFull(Exception):
+    def __init__(self, type: str):
+        super().__init__(f"Too many {type} jobs queued")
+        self.type = type
+
+class Job:
+    """A unit of work run by the worker pool of its type; handler(user_id, **params) gives the result"""
+    __slots__ = ("id", "type", "user_id", "params", "lane", "status", "result", "error",
+                 "created_at", "started_at", "finished_at", "expires_at", "task")
+
+    def __init__(self, type: str, user_id: str, params: Dict, lane: str):
+        self.id = secrets.token_hex(12)
+        self.type = type
+        self.user_id = user_id
+        self.params = params
+        self.lane = lane
+        self.status = QUEUED
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.expires_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED, CANCELLED)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "lane": self.lane,
+            "params": self.params,
+            "result": self.result,
+            "error": self.error,
+            "created_at": isoformat(self.created_at),
+            "started_at": isoformat(self.started_at),
+            "finished_at": isoformat(self.finished_at),
+            "expires_at": isoformat(self.expires_at)
+        }
+
+def isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+class JobLanes:
+    """Queued jobs of one type: a paid and a free lane, and a semaphore counting their entries"""
+
+    def __init__(self, handler: Handler, concurrency: int):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.paid: Deque[Job] = deque()
+        self.free: Deque[Job] = deque()
+        self.available = asyncio.Semaphore(0)
+        # Queued jobs not cancelled yet; cancelled ones stay in their lane until a worker skips them
+        self.pending = 0
+        self.running = 0
+        self.paid_streak = 0
+
+    def push(self, job: Job) -> None:
+        (self.paid if job.lane == PAID else self.free).append(job)
+        self.pending += 1
+        self.available.release()
+
+    def pop(self) -> Job:
+        """Next lane entry, paid first unless free jobs have waited PAID_BURST paid ones"""
+        if self.paid and (not self.free or self.paid_streak < PAID_BURST):
+            self.paid_streak += 1
+            return self.paid.popleft()
+        self.paid_streak = 0
+        return self.free.popleft()
+
+class JobQueue:
+    """
+    Bounded worker pools for slow work, so requests return a job id right away.
+
+    Every job type has its own pool of workers, the paid lane (users who bought
+    credits) ahead of the free one, and at most max_pending queued jobs. Submitting
+    is O(1) and never awaits. Finished jobs stay pollable for result_ttl seconds,
+    at most max_retained of them, and expire oldest first on later calls. Jobs are
+    kept in this process only.
+    """
+
+    def __init__(self, concurrency: Dict[str, int], max_pending: int = 1000,
+                 result_ttl: float = 600, max_retained: int = 10000):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self._types: Dict[str, JobLanes] = {}
+        self._jobs: Dict[str, Job] = {}
+        # Finished jobs in the order they expire
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+
+    def register(self, type: str, handler: Handler, concurrency: Optional[int] = None) -> None:
+        self._types[type] = JobLanes(handler, concurrency or self.concurrency.get(type, 1))
+
+    def submit(self, type: str, user_id: str, params: Dict, paid: bool = False) -> Job:
+        """Queue a job, raising QueueFull when its type already has max_pending queued"""
+        lanes = self._types[type]
+        if lanes.pending >= self.max_pending:
+            raise QueueFull(type)
+        self._expire(time.time())
+        job = Job(type, user_id, params, PAID if paid else FREE)
+        self._jobs[job.id] = job
+        lanes.push(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire(time.time())
+        return self._jobs.get(job_id)
+
+    def cancel(self, job: Job) -> bool:
+        """Cancel a queued or running job; False if it already finished"""
+        if job.finished:
+            return False
+        if job.status == QUEUED:
+            self._types[job.type].pending -= 1
+            self._finish(job, CANCELLED)
+        elif job.task is not None:
+            # The worker records the outcome once the handler unwinds
+            job.task.cancel()
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            type: {"queued": lanes.pending, "running": lanes.running, "workers": lanes.concurrency}
+            for type, lanes in self._types.items()
+        }
+
+    async def run_forever(self) -> None:
+        """Run every worker until cancelled"""
+        for lanes in self._types.values():
+            # Bound to the running loop, counting jobs submitted before the workers started
+            lanes.available = asyncio.Semaphore(len(lanes.paid) + len(lanes.free))
+        workers = [
+            asyncio.create_task(self._work(lanes))
+            for lanes in self._types.values()
+            for _ in range(lanes.concurrency)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _work(self, lanes: JobLanes) -> None:
+        while True:
+            await lanes.available.acquire()
+            job = lanes.pop()
+            if job.status != QUEUED:
+                continue
+            lanes.pending -= 1
+            lanes.running += 1
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.task = asyncio.create_task(lanes.handler(job.user_id, **job.params))
+            try:
+                # wait() leaves the handler alone if this worker is cancelled
+                await asyncio.wait((job.task,))
+            except asyncio.CancelledError:
+                job.task.cancel()
+                self._finish(job, CANCELLED)
+                raise
+            finally:
+                lanes.running -= 1
+            self._settle(job)
+
+    def _settle(self, job: Job) -> None:
+        task = job.task
+        if task.cancelled():
+            self._finish(job, CANCELLED)
+            return
+        error = task.exception()
+        if error is None:
+            job.result = task.result()
+            self._finish(job, COMPLETED)
+            return
+        if isinstance(error, HTTPException):
+            job.error = str(error.detail)
+        else:
+            logger.error("%s job %s failed", job.type, job.id, exc_info=error)
+            job.error = "Job failed"
+        self._finish(job, FAILED)
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.task = None
+        job.finished_at = time.time()
+        job.expires_at = job.finished_at + self.result_ttl
+        self._finished[job.id] = job
+        self._expire(job.finished_at)
+
+    def _expire(self, now: float) -> None:
+        finished = self._finished
+        while finished:
+            job = next(iter(finished.values()))
+            if job.expires_at > now and len(finished) <= self.max_retained:
+                break
+            finished.popitem(last=False)
+            del self._jobs[job.id]
+
+job_queue = JobQueue(
+    settings.JOB_CONCURRENCY,
+    max_pending=settings.JOB_MAX_PENDING,
+    result_ttl=settings.JOB_RESULT_TTL,
+    max_retained=settings.JOB_MAX_RETAINED
+)
+job_queue.register("analyze", analyze_for_user)
+job_queue.register("farming", farming_tasks)
+job_queue.register("twitter", twitter_plan)
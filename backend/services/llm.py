@@ -0,0 +1,342 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from core.config import settings
+from core.responses import loads
+from services.cache import make_key
+
+logger = logging.getLogger(__name__)
+
+# Part of every prompt hash; bump it when the prompt changes so cached completions are not reused
+PROMPT_VERSION = 1
+
+SYSTEM_PROMPT = (
+    "You are a Web3 research analyst. Summarize each section of the project below in two or "
+    "three sentences for a crypto-savvy reader. Answer with one block per section: a line "
+    "\"## <section>\" followed by its summary, and nothing else."
+)
+
+# Called with each piece of completion text as it streams in, for the analysis being computed
+token_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar("token_sink", default=None)
+
+class LLMError(Exception):
+    pass
+
+def build_messages(project_name: str, website: Optional[str], inputs: Dict[str, object]) -> List[Dict]:
+    blocks = [f"Project: {project_name}", f"Website: {website or 'unknown'}"]
+    for section, value in sorted(inputs.items()):
+        text = value if isinstance(value, str) else json.dumps(value, default=str)
+        blocks.append(f"## {section}\n{text}")
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": "\n\n".join(blocks)}
+    ]
+
+def prompt_hash(model: str, messages: List[Dict]) -> str:
+    encoded = json.dumps([PROMPT_VERSION, model, messages], sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+def parse_summaries(text: str) -> Dict[str, str]:
+    """Split a "## <section>" answer into {section: summary}"""
+    summaries = {}
+    section = None
+    lines: List[str] = []
+    for line in text.splitlines() + ["## "]:
+        if line.startswith("## "):
+            if section and "\n".join(lines).strip():
+                summaries[section] = "\n".join(lines).strip()
+            section = line[3:].strip().lower()
+            lines = []
+        elif section:
+            lines.append(line)
+    return summaries
+
+class CompletionCache:
+    """
+    Completions on disk, one file per prompt hash.
+
+    Files are read and written off the event loop, replaced atomically, and the
+    least recently used are deleted once they take more than max_bytes. The index
+    is built from the directory on first use; several workers may share the
+    directory, each keeping its own approximate index.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._sizes: Optional["OrderedDict[str, int]"] = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def _index(self) -> "OrderedDict[str, int]":
+        if self._sizes is None:
+            os.makedirs(self.directory, exist_ok=True)
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".txt"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+            files.sort()
+            self._sizes = OrderedDict((key, size) for _, key, size in files)
+            self.size = sum(self._sizes.values())
+        return self._sizes
+
+    def _read(self, key: str) -> str:
+        path = self._path(key)
+        # The mtime orders files by last use when the index is rebuilt
+        os.utime(path)
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+
+    def _write(self, key: str, data: bytes, evicted: List[str]) -> None:
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+        for old in evicted:
+            try:
+                os.remove(self._path(old))
+            except FileNotFoundError:
+                pass
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        sizes = self._index()
+        if key in sizes:
+            try:
+                text = await asyncio.to_thread(self._read, key)
+            except FileNotFoundError:
+                # Evicted by another worker
+                self.size -= sizes.pop(key, 0)
+            else:
+                sizes.move_to_end(key)
+                self.hits += 1
+                return text
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, text: str) -> None:
+        data = text.encode("utf-8")
+        if not self.directory or len(data) > self.max_bytes:
+            return
+        sizes = self._index()
+        self.size -= sizes.pop(key, 0)
+        sizes[key] = len(data)
+        self.size += len(data)
+        evicted = []
+        while self.size > self.max_bytes:
+            old, size = sizes.popitem(last=False)
+            self.size -= size
+            evicted.append(old)
+        await asyncio.to_thread(self._write, key, data, evicted)
+
+class PendingPrompt:
+    """Sections of one project waiting to be summarized together"""
+    __slots__ = ("project_name", "website", "inputs", "sinks", "future", "timer")
+
+    def __init__(self, project_name: str, website: Optional[str], future: asyncio.Future):
+        self.project_name = project_name
+        self.website = website
+        self.inputs: Dict[str, object] = {}
+        self.sinks: List[Callable[[str], None]] = []
+        self.future = future
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class LLMClient:
+    """
+    Section summaries from an OpenAI-compatible chat completions API.
+
+    Sections of one project asked for within coalesce_window seconds share one
+    prompt, sent as soon as every expected section joined. Identical prompts in
+    flight share one request, completions are cached on disk by prompt hash, at
+    most max_concurrency requests are in flight, and streamed text is passed to
+    the token_sink of every analysis waiting on it.
+    Point base_url at a local mock server to test without a real provider.
+    """
+
+    def __init__(self, base_url: str, api_key: str, model: str, cache: CompletionCache,
+                 enabled: bool = False, max_concurrency: int = 4, timeout: float = 60,
+                 coalesce_window: float = 0.05, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.cache = cache
+        self.enabled = enabled
+        self.timeout = timeout
+        self.coalesce_window = coalesce_window
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self._pending: Dict[Tuple[str, Optional[str]], PendingPrompt] = {}
+        # prompt hash -> completion text of a prompt being answered
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Keeps running prompt tasks referenced until they finish
+        self._tasks = set()
+        self.requests = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    @property
+    def version(self) -> Optional[str]:
+        """What summaries depend on besides their inputs, None when summaries are off"""
+        return f"{self.model}/{PROMPT_VERSION}" if self.enabled else None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, headers=headers, timeout=self.timeout, transport=self.transport
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def summarize(self, project_name: str, website: Optional[str], section: str, inputs: object,
+                        sections: Iterable[str] = ()) -> str:
+        """Summary of one section, sent in one prompt with the project's other sections"""
+        key = make_key(project_name, website, "")[:2]
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = PendingPrompt(
+                project_name, website, asyncio.get_running_loop().create_future()
+            )
+            pending.timer = asyncio.get_running_loop().call_later(self.coalesce_window, self._send, key)
+        else:
+            self.coalesced += 1
+        pending.inputs[section] = inputs
+        sink = token_sink.get()
+        if sink is not None and sink not in pending.sinks:
+            pending.sinks.append(sink)
+        if set(sections) <= set(pending.inputs):
+            self._send(key)
+
+        # Shield so a caller that times out does not cancel the summaries of the others
+        summaries = await asyncio.shield(pending.future)
+        if section not in summaries:
+            raise LLMError(f"The completion has no {section} summary")
+        return summaries[section]
+
+    def _send(self, key: Tuple[str, Optional[str]]) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        pending.timer.cancel()
+        task = asyncio.create_task(self._run(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: PendingPrompt) -> None:
+        try:
+            summaries = await self._summaries(pending)
+        except Exception as error:
+            self.errors += 1
+            logger.warning("Summaries of %s failed: %s", pending.project_name, error)
+            pending.future.set_exception(error)
+            # Retrieved here so callers that gave up do not leave it unobserved
+            pending.future.exception()
+        else:
+            pending.future.set_result(summaries)
+
+    async def _summaries(self, pending: PendingPrompt) -> Dict[str, str]:
+        messages = build_messages(pending.project_name, pending.website, pending.inputs)
+        key = prompt_hash(self.model, messages)
+        shared = self._inflight.get(key)
+        if shared is not None:
+            # Another analysis is already waiting on this exact prompt
+            self.coalesced += 1
+            text = await asyncio.shield(shared)
+            for sink in pending.sinks:
+                sink(text)
+            return parse_summaries(text)
+
+        shared = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            text = await self._text(key, messages, pending.sinks)
+        except BaseException as error:
+            shared.set_exception(error if isinstance(error, Exception) else LLMError("The completion was cancelled"))
+            # Retrieved here so a prompt nobody else waited on does not leave it unobserved
+            shared.exception()
+            raise
+        else:
+            shared.set_result(text)
+        finally:
+            # Failures are not kept, so the next request for this prompt tries again
+            del self._inflight[key]
+        return parse_summaries(text)
+
+    async def _text(self, key: str, messages: List[Dict], sinks: List[Callable[[str], None]]) -> str:
+        text = await self.cache.get(key)
+        if text is not None:
+            for sink in sinks:
+                sink(text)
+            return text
+        async with self._limit:
+            text = await self._complete(messages, sinks)
+        if parse_summaries(text):
+            await self.cache.set(key, text)
+        return text
+
+    async def _complete(self, messages: List[Dict], sinks: List[Callable[[str], None]]) -> str:
+        """Stream one chat completion, passing each piece of text to the sinks"""
+        self.requests += 1
+        payload = {"model": self.model, "messages": messages, "stream": True, "temperature": 0.2}
+        parts = []
+        try:
+            async with self.client.stream("POST", "/chat/completions", json=payload) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise LLMError(f"LLM answered {response.status_code}: {response.text[:200]}")
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    for choice in loads(data).get("choices", ()):
+                        text = (choice.get("delta") or {}).get("content")
+                        if text:
+                            parts.append(text)
+                            for sink in sinks:
+                                sink(text)
+        except httpx.HTTPError as error:
+            raise LLMError(f"LLM request failed: {error!r}") from error
+        return "".join(parts)
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "cache_size_bytes": self.cache.size
+        }
+
+llm_client = LLMClient(
+    base_url=settings.LLM_BASE_URL,
+    api_key=settings.OPENAI_API_KEY,
+    model=settings.LLM_MODEL,
+    cache=CompletionCache(settings.LLM_CACHE_DIR, settings.LLM_CACHE_MAX_BYTES),
+    enabled=settings.LLM_ENABLED,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    timeout=settings.LLM_TIMEOUT,
+    coalesce_window=settings.LLM_COALESCE_WINDOW
+)
@@ -0,0 +1,55 @@
+import random
+from datetime import datetime, timedelta
+from typing import Dict
+
+from models.database import db
+from models.repository import repositories
+
+async def twitter_plan(user_id: str, project_name: str, twitter_handle: str) -> Dict:
+    """Three scheduled tweets about a project, and notify the user"""
+    # Get project features or use generic ones
+    features = db["project_features"].get(project_name, ["innovation", "technology", "community", "scalability", "security"])
+    
+    # Generate tweets
+    tweets = []
+    now = datetime.now()
+    
+    for i in range(3):
+        # Pick random template and feature
+        template = random.choice(db["twitter_templates"])
+        feature = random.choice(features)
+        
+        # Format the tweet content
+        content = template.format(project=project_name, feature=feature)
+        
+        # Determine tweet type
+        tweet_types = ["post", "retweet", "like"]
+        weights = [0.5, 0.3, 0.2]  # Weighted probabilities
+        tweet_type = random.choices(tweet_types, weights=weights, k=1)[0]
+        
+        # Schedule time (spread over next 7 days)
+        scheduled_time = now + timedelta(
+            days=random.randint(i, i+2),
+            hours=random.randint(0, 23),
+            minutes=random.randint(0, 59)
+        )
+        
+        tweets.append({
+            "content": content,
+            "type": tweet_type,
+            "scheduled_time": scheduled_time.isoformat()
+        })
+    
+    response = {
+        "project_name": project_name,
+        "twitter_handle": twitter_handle,
+        "tweets": tweets
+    }
+    
+    await repositories.notifications.add(
+        user_id,
+        "Twitter content plan generated",
+        f"Created {len(tweets)} tweets for {project_name}",
+        "success"
+    )
+    return response
@@ -0,0 +1,11 @@
+import os
+import sys
+
+import pytest
+
+# Tests import modules the way main.py does, relative to backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.airdrop_catalog import MAX_SCAN, AirdropCatalog, to_timestamp
+
+START = datetime(2030, 1, 1)
+
+def make_catalog(deadline_days):
+    return AirdropCatalog(
+        {
+            "id": f"airdrop-{i + 1:03d}",
+            "projectName": f"P{i}",
+            "deadline": (START + timedelta(days=days)).isoformat(),
+            "chain": ("Base", "Arbitrum One", "Optimism")[i % 3],
+            "status": ("active", "upcoming")[i % 2]
+        }
+        for i, days in enumerate(deadline_days)
+    )
+
+def all_pages(catalog, limit=7, **filters):
+    items, cursor, requests = [], None, 0
+    while True:
+        page, cursor = catalog.query(limit=limit, cursor=cursor, **filters)
+        assert len(page) <= limit
+        items.extend(airdrop["id"] for airdrop in page)
+        requests += 1
+        if cursor is None:
+            return items, requests
+
+def expected(catalog, status=None, chain=None, deadline_from=None, deadline_to=None,
+             sort="created", descending=False):
+    low = to_timestamp(deadline_from) if deadline_from else float("-inf")
+    high = to_timestamp(deadline_to) if deadline_to else float("inf")
+    rows = [
+        (to_timestamp(airdrop["deadline"]), seq, airdrop["id"])
+        for seq, airdrop in enumerate(catalog, 1)
+        if (not status or airdrop["status"] == status) and (not chain or airdrop["chain"] == chain)
+        and low <= to_timestamp(airdrop["deadline"]) <= high
+    ]
+    rows.sort(key=(lambda row: row[1]) if sort == "created" else (lambda row: row[:2]), reverse=descending)
+    return [row[2] for row in rows]
+
+@pytest.mark.parametrize("sort", ["created", "deadline"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_pages_match_a_full_scan(sort, descending):
+    rng = random.Random(12)
+    catalog = make_catalog([rng.randrange(400) for _ in range(3000)])
+    for _ in range(20):
+        first, span = rng.randrange(400), rng.choice((0, 3, 40, 400))
+        filters = {
+            "status": rng.choice((None, "active")),
+            "chain": rng.choice((None, "Base")),
+            "deadline_from": rng.choice((None, START + timedelta(days=first))),
+            "deadline_to": rng.choice((None, START + timedelta(days=first + span)))
+        }
+        items, _ = all_pages(catalog, sort=sort, descending=descending, **filters)
+        assert items == expected(catalog, sort=sort, descending=descending, **filters)
+
+def test_update_moves_between_indexes():
+    catalog = make_catalog([5, 10, 15])
+    catalog.update("airdrop-001", deadline=(START + timedelta(days=20)).isoformat(), status="ended")
+    page, _ = catalog.query(sort="deadline")
+    assert [airdrop["id"] for airdrop in page] == ["airdrop-002", "airdrop-003", "airdrop-001"]
+    assert [airdrop["id"] for airdrop in catalog.query(status="ended")[0]] == ["airdrop-001"]
+    assert [airdrop["id"] for airdrop in catalog.query(status="active")[0]] == ["airdrop-003"]
+
+def test_sparse_deadline_range_is_served_from_the_deadline_index():
+    # Only the last airdrops created are in range
+    catalog = make_catalog([1] * 5000 + [100] * 3)
+    page, cursor = catalog.query(deadline_from=START + timedelta(days=50), limit=2)
+    assert [airdrop["id"] for airdrop in page] == ["airdrop-5001", "airdrop-5002"]
+    page, cursor = catalog.query(deadline_from=START + timedelta(days=50), limit=2, cursor=cursor)
+    assert ([airdrop["id"] for airdrop in page], cursor) == (["airdrop-5003"], None)
+
+def test_wide_deadline_range_bounds_the_work_per_page():
+    # More than MAX_SCAN airdrops in range, all created after as many out of range
+    out_of_range, in_range = 3 * MAX_SCAN, MAX_SCAN + 10
+    catalog = make_catalog([1] * out_of_range + [100] * in_range)
+    first_page, cursor = catalog.query(deadline_from=START + timedelta(days=50), limit=5)
+    assert first_page == [] and cursor is not None
+    items, requests = all_pages(catalog, limit=500, deadline_from=START + timedelta(days=50))
+    assert len(items) == in_range
+    assert requests == out_of_range // MAX_SCAN + 3
+
+def test_unknown_sort_and_foreign_cursor_are_rejected():
+    catalog = make_catalog(range(10))
+    _, cursor = catalog.query(limit=2)
+    with pytest.raises(ValueError):
+        catalog.query(sort="popularity")
+    with pytest.raises(ValueError):
+        catalog.query(sort="deadline", cursor=cursor)
+    with pytest.raises(ValueError):
+        catalog.query(cursor="not-a-cursor")
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+
+from models.repository import repositories
+from services import airdrop_lifecycle as lifecycle
+from services.airdrop_lifecycle import EXPIRE, REMIND, AirdropLifecycle, DeadlineQueue, initial_status
+
+pytestmark = pytest.mark.anyio
+
+NOW = 2_000_000_000.0
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+def test_queue_pops_due_events_in_time_order():
+    queue = DeadlineQueue()
+    queue.schedule(30, EXPIRE, "a")
+    queue.schedule(10, REMIND, "a")
+    queue.schedule(20, EXPIRE, "b")
+    queue.schedule(5, EXPIRE, "b")
+    assert len(queue) == 3
+    assert queue.pop_due(25, limit=10) == [(EXPIRE, "b"), (REMIND, "a")]
+    assert queue.next_due() == 30
+
+def test_queue_skips_cancelled_events_and_honours_the_limit():
+    queue = DeadlineQueue()
+    for i in range(5):
+        queue.schedule(i, EXPIRE, f"a{i}")
+    assert queue.cancel(EXPIRE, "a0") and not queue.cancel(EXPIRE, "a0")
+    assert queue.next_due() == 1
+    assert queue.pop_due(10, limit=2) == [(EXPIRE, "a1"), (EXPIRE, "a2")]
+    assert queue.pop_due(10, limit=10) == [(EXPIRE, "a3"), (EXPIRE, "a4")]
+    assert queue.next_due() is None
+
+def test_initial_status_follows_start_date_and_deadline():
+    assert initial_status({"deadline": iso(NOW - 1)}, NOW) == "expired"
+    assert initial_status({"deadline": iso(NOW + 100), "startDate": iso(NOW + 10)}, NOW) == "upcoming"
+    assert initial_status({"deadline": iso(NOW + 100), "startDate": iso(NOW - 10)}, NOW) == "active"
+
+async def test_airdrop_is_activated_reminded_and_expired(monkeypatch):
+    reminders = []
+
+    async def broadcast(title, message, type="info"):
+        reminders.append(title)
+        return {}
+
+    monkeypatch.setattr(lifecycle.broadcasts, "broadcast", broadcast)
+    scheduler = AirdropLifecycle(reminder_hours=1, batch_size=2)
+    airdrop = await repositories.airdrops.add({
+        "projectName": "Lifecycle", "link": "https://lifecycle.example.com", "description": "d",
+        "chain": "Base", "status": "upcoming", "startDate": iso(NOW + 600), "deadline": iso(NOW + 7200)
+    })
+    scheduler.track(airdrop, NOW)
+
+    assert await scheduler.run_due(NOW) == 0
+    assert await scheduler.run_due(NOW + 600) == 1
+    assert (await repositories.airdrops.get(airdrop["id"]))["status"] == "active"
+    assert await scheduler.run_due(NOW + 3600) == 1
+    assert reminders == ["Airdrop deadline in 1h: Lifecycle"]
+    assert await scheduler.run_due(NOW + 7200) == 1
+    assert (await repositories.airdrops.get(airdrop["id"]))["status"] == "expired"
+    assert len(scheduler.queue) == 0
+
+def test_late_reminders_are_skipped_and_expired_airdrops_untracked():
+    scheduler = AirdropLifecycle(reminder_hours=1, batch_size=10)
+    scheduler.track({"id": "soon", "status": "active", "deadline": iso(NOW + 60)}, NOW)
+    scheduler.track({"id": "done", "status": "expired", "deadline": iso(NOW - 60)}, NOW)
+    assert scheduler.queue.pop_due(NOW + 60, 10) == [(EXPIRE, "soon")]
+    scheduler.track({"id": "later", "status": "upcoming", "startDate": iso(NOW + 10), "deadline": iso(NOW + 9000)}, NOW)
+    scheduler.untrack("later")
+    assert len(scheduler.queue) == 0
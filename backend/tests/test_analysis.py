@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from services import analysis
+from services.analysis import SECTIONS, analyze, stream_analysis
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def fast_sections(monkeypatch):
+    """Compute sections instantly, counting how often each one is computed"""
+    computed = []
+
+    async def compute_section(project_name, section, inputs, website=None):
+        computed.append(section)
+        return inputs
+
+    monkeypatch.setattr(analysis, "compute_section", compute_section)
+    return computed
+
+async def collect(stream):
+    return [event async for event in stream]
+
+async def test_refresh_reuses_sections_whose_inputs_did_not_change(fast_sections, monkeypatch):
+    first = await analyze("ReuseCo")
+    assert first["reused_sections"] == []
+    # Served from the analysis cache
+    assert (await analyze("ReuseCo"))["reused_sections"] == list(SECTIONS)
+
+    project = {**analysis.get_project_data("ReuseCo"), "roadmap": "Mainnet next quarter"}
+    monkeypatch.setattr(analysis, "get_project_data", lambda project_name: project)
+    fast_sections.clear()
+    refreshed = await analyze("ReuseCo", refresh=True)
+    assert fast_sections == ["roadmap"]
+    assert refreshed["roadmap"] == "Mainnet next quarter"
+    assert refreshed["reused_sections"] == [section for section in SECTIONS if section != "roadmap"]
+
+async def test_concurrent_callers_share_one_computation(fast_sections):
+    first, second = await asyncio.gather(analyze("SharedCo"), analyze("SharedCo"))
+    assert sorted(fast_sections) == sorted(SECTIONS)
+    assert first["sections_completed"] == second["sections_completed"] == len(SECTIONS)
+
+async def test_stream_ends_with_a_summary(fast_sections):
+    events = await asyncio.wait_for(collect(stream_analysis("StreamCo")), 5)
+    assert sorted(event["section"] for event in events[:-1]) == sorted(SECTIONS)
+    assert events[-1]["event"] == "done"
+    assert events[-1]["sections_completed"] == len(SECTIONS)
+
+async def test_stream_finishes_when_a_section_task_crashes(monkeypatch):
+    run_section = analysis.run_section
+
+    async def crashing_run_section(project_name, section, *args):
+        if section == "team":
+            raise RuntimeError("worker crashed")
+        return await run_section(project_name, section, *args)
+
+    monkeypatch.setattr(analysis, "run_section", crashing_run_section)
+    events = await asyncio.wait_for(collect(stream_analysis("CrashCo")), 5)
+    team = next(event for event in events if event.get("section") == "team")
+    assert (team["status"], team["error"]) == ("failed", "worker crashed")
+    assert events[-1]["event"] == "done"
+    assert events[-1]["failed_sections"] == {"team": "worker crashed"}
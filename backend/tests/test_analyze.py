@@ -0,0 +1,62 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from core.config import settings
+from core.security import issue_token
+from models.repository import repositories
+from routers import analyze, jobs
+from services import analysis
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def client(monkeypatch):
+    async def compute_section(project_name, section, inputs, website=None):
+        return inputs
+    monkeypatch.setattr(analysis, "compute_section", compute_section)
+    monkeypatch.setattr(settings, "ANALYZE_CREDIT_COST", 2)
+    app = FastAPI()
+    app.include_router(analyze.router, prefix="/api")
+    app.include_router(jobs.router, prefix="/api")
+    user = await repositories.users.create("analyst", "analyst@example.com", "password")
+    headers = {"Authorization": f"Bearer {issue_token(user['id'])['token']}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers=headers) as c:
+        c.user_id = user["id"]
+        yield c
+
+async def test_every_analyze_path_charges_per_project(client):
+    balance = await repositories.credits.balance(client.user_id)
+
+    single = await client.post("/api/analyze", json={"project_name": "BilledCo"})
+    stream = await client.post("/api/analyze/stream", json={"project_name": "BilledCo"})
+    job = await client.post("/api/jobs/analyze", json={"project_name": "BilledCo"})
+    batch = await client.post("/api/analyze/batch", json={"projects": [
+        {"project_name": "BilledCo"}, {"project_name": "OtherCo"}, {"project_name": "billedco"}
+    ]})
+
+    assert single.json()["data"]["credits_charged"] == 2
+    assert b'"credits_charged": 2' in stream.content
+    assert job.status_code == 202 and job.json()["data"]["credits_charged"] == 2
+    assert batch.json()["data"]["credits_charged"] == 4
+    assert await repositories.credits.balance(client.user_id) == balance - 10
+
+async def test_retry_with_the_same_key_runs_again_without_charging(client):
+    headers = {"Idempotency-Key": "analyze-1"}
+    first = await client.post("/api/analyze", json={"project_name": "RetryCo"}, headers=headers)
+    balance = await repositories.credits.balance(client.user_id)
+
+    retry = await client.post("/api/analyze/stream", json={"project_name": "RetryCo"}, headers=headers)
+    other = await client.post("/api/analyze", json={"project_name": "ElseCo"}, headers=headers)
+
+    assert first.json()["data"]["replayed"] is False
+    assert b'"replayed": true' in retry.content
+    assert other.status_code == 409
+    assert await repositories.credits.balance(client.user_id) == balance
+
+async def test_analysis_is_refused_without_enough_credits(client, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYZE_CREDIT_COST", 1000)
+
+    response = await client.post("/api/jobs/analyze", json={"project_name": "PricyCo"})
+
+    assert response.status_code == 402
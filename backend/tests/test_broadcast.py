@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from core.pubsub import notification_hub
+from models.mongo_repository import use_mongo_repositories
+from models.repository import repositories, use_memory_repositories
+from services.broadcast import BroadcastDispatcher
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def users():
+    """Five users in a fresh store, so deliveries can be counted exactly"""
+    await use_mongo_repositories(AsyncMongoMockClient()["scryptex_test"])
+    try:
+        yield [(await repositories.users.create(f"fan{i}", f"fan{i}@example.com", "secret"))["id"] for i in range(5)]
+    finally:
+        use_memory_repositories()
+
+async def test_broadcast_is_queued_and_delivered_in_batches(users):
+    dispatcher = BroadcastDispatcher(batch_size=2, max_pending=10)
+    body = await dispatcher.broadcast("News", "Hello everyone")
+    assert dispatcher.pending == 1
+    assert await repositories.notifications.unread_count(users[0]) == 0
+
+    assert await dispatcher.fan_out(body["id"]) == len(users)
+    for user_id in users:
+        assert (await repositories.notifications.latest(user_id, 1))[0]["title"] == "News"
+    # Users who already hold the broadcast are skipped
+    assert await dispatcher.fan_out(body["id"]) == 0
+
+async def test_worker_delivers_queued_broadcasts_and_pushes_to_streams(users):
+    dispatcher = BroadcastDispatcher(batch_size=2, max_pending=10)
+    subscription = notification_hub.subscribe(users[3])
+    worker = asyncio.ensure_future(dispatcher.run_forever())
+    try:
+        first = await dispatcher.broadcast("First", "one")
+        await dispatcher.broadcast("Second", "two")
+        await asyncio.wait_for(dispatcher._pending.join(), 2)
+        assert [n["title"] for n in await repositories.notifications.latest(users[0], 5)] == ["Second", "First"]
+        pushed = await subscription.next(1)
+        assert [(n["id"], n["user_id"]) for n in pushed[:1]] == [(first["id"], users[3])]
+    finally:
+        worker.cancel()
+        notification_hub.unsubscribe(subscription)
+
+async def test_failed_delivery_does_not_stop_the_worker(users, monkeypatch):
+    dispatcher = BroadcastDispatcher(batch_size=2, max_pending=10)
+    deliver = repositories.notifications.deliver
+    failures = []
+
+    async def flaky(broadcast_id, user_ids):
+        if not failures:
+            failures.append(broadcast_id)
+            raise RuntimeError("storage unavailable")
+        return await deliver(broadcast_id, user_ids)
+
+    monkeypatch.setattr(repositories.notifications, "deliver", flaky)
+    worker = asyncio.ensure_future(dispatcher.run_forever())
+    try:
+        await dispatcher.broadcast("Lost", "one")
+        second = await dispatcher.broadcast("Kept", "two")
+        await asyncio.wait_for(dispatcher._pending.join(), 2)
+        assert (await repositories.notifications.latest(users[4], 1))[0]["id"] == second["id"]
+    finally:
+        worker.cancel()
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from services import cache
+from services.cache import AnalysisCache, estimate_size, make_key
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+def test_keys_are_normalized():
+    assert make_key(" Arbitrum ", "https://Arbitrum.io/", "overview") == make_key("arbitrum", "https://arbitrum.io", "overview")
+
+def test_entries_expire_after_their_section_ttl(clock):
+    analysis_cache = AnalysisCache(10_000, default_ttl=60, section_ttls={"news": 5})
+    analysis_cache.set(make_key("p", None, "news"), "fresh")
+    analysis_cache.set(make_key("p", None, "overview"), "stable")
+    clock[0] += 10
+    assert analysis_cache.get(make_key("p", None, "news")) == (False, None)
+    assert analysis_cache.get(make_key("p", None, "overview")) == (True, "stable")
+    assert analysis_cache.stats()["expirations"] == 1
+
+def test_least_recently_used_entries_are_evicted_over_budget():
+    value = "x" * 100
+    analysis_cache = AnalysisCache(3 * estimate_size(value), default_ttl=60)
+    for name in ("a", "b", "c"):
+        analysis_cache.set(make_key(name, None, "s"), value)
+    analysis_cache.get(make_key("a", None, "s"))
+    analysis_cache.set(make_key("d", None, "s"), value)
+    assert [analysis_cache.get(make_key(name, None, "s"))[0] for name in "abcd"] == [True, False, True, True]
+    assert analysis_cache.size <= analysis_cache.max_bytes
+    analysis_cache.set(make_key("huge", None, "s"), "x" * 1000)
+    assert analysis_cache.get(make_key("huge", None, "s"))[0] is False
+
+async def test_concurrent_loads_share_one_call():
+    analysis_cache = AnalysisCache(10_000, default_ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    key = make_key("p", None, "s")
+    assert await asyncio.gather(*(analysis_cache.get_or_load(key, loader) for _ in range(5))) == ["value"] * 5
+    assert await analysis_cache.get_or_load(key, loader) == "value"
+    assert len(calls) == 1
+    assert analysis_cache.stats()["coalesced"] == 4
+
+async def test_failed_loads_are_not_cached():
+    analysis_cache = AnalysisCache(10_000, default_ttl=60)
+    key = make_key("p", None, "s")
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def working():
+        return "value"
+
+    with pytest.raises(RuntimeError):
+        await analysis_cache.get_or_load(key, failing)
+    assert await analysis_cache.get_or_load(key, working) == "value"
+
+async def test_a_cancelled_caller_does_not_abort_the_shared_load():
+    analysis_cache = AnalysisCache(10_000, default_ttl=60)
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "value"
+
+    key = make_key("p", None, "s")
+    first = asyncio.ensure_future(analysis_cache.get_or_load(key, loader))
+    second = asyncio.ensure_future(analysis_cache.get_or_load(key, loader))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == "value"
+    assert analysis_cache.get(key) == (True, "value")
@@ -0,0 +1,43 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from core.security import issue_token
+from models.repository import repositories
+from routers import credit
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def client(monkeypatch):
+    async def no_delay(*args):
+        pass
+    monkeypatch.setattr(credit, "simulate_delay", no_delay)
+    app = FastAPI()
+    app.include_router(credit.router, prefix="/api")
+    user = await repositories.users.create("credit-tester", "credit-tester@example.com", "password")
+    headers = {"Authorization": f"Bearer {issue_token(user['id'])['token']}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers=headers) as c:
+        c.user_id = user["id"]
+        yield c
+
+async def test_retried_purchase_is_not_applied_twice(client):
+    headers = {"Idempotency-Key": "buy-1"}
+    first = await client.post("/api/credit/buy", json={"method": "onchain", "amount": 50}, headers=headers)
+    retry = await client.post("/api/credit/buy", json={"method": "onchain", "amount": 50}, headers=headers)
+
+    assert first.json()["data"]["balance"] == retry.json()["data"]["balance"]
+    assert retry.json()["data"]["replayed"] is True
+    assert await repositories.credits.balance(client.user_id) == first.json()["data"]["balance"]
+
+async def test_key_reused_for_another_operation_conflicts(client):
+    headers = {"Idempotency-Key": "shared"}
+    await client.post("/api/credit/buy", json={"method": "onchain", "amount": 50}, headers=headers)
+    balance = await repositories.credits.balance(client.user_id)
+
+    consume = await client.post("/api/credit/consume", json={"feature_type": "analyze", "amount": 5}, headers=headers)
+    other_amount = await client.post("/api/credit/buy", json={"method": "onchain", "amount": 60}, headers=headers)
+
+    assert consume.status_code == 409
+    assert other_amount.status_code == 409
+    assert await repositories.credits.balance(client.user_id) == balance
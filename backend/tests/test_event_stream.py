@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+
+from core.config import settings
+from core.pubsub import notification_hub
+from core.responses import EventStreamResponse
+from core.security import issue_token
+from routers import notification
+
+pytestmark = pytest.mark.anyio
+
+class Client:
+    """ASGI receive/send of a GET: its empty request body, then a disconnect once closed"""
+
+    def __init__(self):
+        self.closed = asyncio.Event()
+        self.messages = []
+        self.received = asyncio.Condition()
+        self._request_sent = False
+
+    async def receive(self):
+        if not self._request_sent:
+            self._request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.closed.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        async with self.received:
+            self.messages.append(message)
+            self.received.notify_all()
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(m.get("body", b"") for m in self.messages if m["type"] == "http.response.body")
+
+    async def wait_for(self, data: bytes, timeout: float = 2) -> None:
+        async def arrived():
+            async with self.received:
+                await self.received.wait_for(lambda: data in self.body)
+        await asyncio.wait_for(arrived(), timeout)
+
+def get_scope(path: str, headers=()):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"test"), *headers], "client": ("127.0.0.1", 5000), "server": ("test", 80)
+    }
+
+async def test_stream_survives_the_request_message():
+    chunks = asyncio.Queue()
+
+    async def content():
+        while True:
+            yield await chunks.get()
+
+    disconnects = []
+    response = EventStreamResponse(content(), on_disconnect=lambda: disconnects.append(True))
+    client = Client()
+    served = asyncio.create_task(response(get_scope("/"), client.receive, client.send))
+
+    chunks.put_nowait(b": heartbeat\n\n")
+    await client.wait_for(b": heartbeat")
+    chunks.put_nowait(b"data: 1\n\n")
+    await client.wait_for(b"data: 1")
+    assert not served.done() and not disconnects
+
+    client.closed.set()
+    chunks.put_nowait(b"data: 2\n\n")
+    await asyncio.wait_for(served, 2)
+    assert disconnects
+    assert b"data: 2" not in client.body
+
+async def test_notification_stream_pushes_heartbeats_and_events(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_STREAM_HEARTBEAT", 0.05)
+    app = FastAPI()
+    app.include_router(notification.router, prefix="/api")
+    token = issue_token("user_stream")["token"]
+    client = Client()
+    scope = get_scope("/api/notifications/stream", [(b"authorization", f"Bearer {token}".encode())])
+    connections = notification_hub.connections
+    served = asyncio.create_task(app(scope, client.receive, client.send))
+
+    await client.wait_for(b": heartbeat")
+    assert client.messages[0]["status"] == 200
+    notification_hub.publish({"id": "notif-900", "user_id": "user_stream", "title": "Hi", "message": "m"})
+    await client.wait_for(b"id: notif-900\nevent: notification")
+
+    client.closed.set()
+    await asyncio.wait_for(served, 2)
+    assert notification_hub.connections == connections
@@ -0,0 +1,54 @@
+import pytest
+
+from models.repository import repositories
+from services.farming import FarmingPlanner, farming_tasks, stable_seed
+
+pytestmark = pytest.mark.anyio
+
+CHAINS = [{"name": "Arbitrum One"}, {"name": "Optimism"}, {"name": "Base"}, {"name": "Scroll"}]
+TASKS = {"Arbitrum": [{"type": "bridge", "description": "Bridge to Arbitrum", "credits": 10}]}
+
+def test_seed_is_stable_across_processes():
+    # A fixed value, unlike hash(), which is salted per process
+    assert stable_seed("Arbitrum", "Base") == 17916177121001916803
+    assert stable_seed("ab", "c") != stable_seed("a", "bc")
+
+def test_plans_are_the_same_for_every_planner():
+    first = FarmingPlanner(TASKS, CHAINS, max_plans=10)
+    second = FarmingPlanner(TASKS, list(CHAINS), max_plans=10)
+    for project in ("Arbitrum", "Unlisted", "Another Project"):
+        assert first.plan(project) == second.plan(project)
+        assert first.plan(project) is first.plan(project)
+
+def test_named_chains_and_catalog_tasks_are_used():
+    planner = FarmingPlanner(TASKS, CHAINS)
+    assert planner.plan("Arbitrum") == {"project_name": "Arbitrum", "tasks": TASKS["Arbitrum"], "chain": "Arbitrum One"}
+    assert planner.chain_for("optimism") == "Optimism"
+    tasks = planner.plan("Unlisted")["tasks"]
+    assert 2 <= len(tasks) <= 4
+    assert all(5 <= task["credits"] <= 15 and task["description"].endswith("on Unlisted") for task in tasks)
+
+def test_adding_a_chain_only_moves_projects_to_it():
+    projects = [f"project{i}" for i in range(300)]
+    before = FarmingPlanner({}, CHAINS, projects)
+    after = FarmingPlanner({}, CHAINS + [{"name": "Linea"}], projects)
+    moved = [p for p in projects if before.plan(p)["chain"] != after.plan(p)["chain"]]
+    assert moved and all(after.plan(p)["chain"] == "Linea" for p in moved)
+    assert len(moved) < len(projects) / 2
+
+def test_unknown_plans_are_bounded_and_rebuilt_on_invalidate():
+    planner = FarmingPlanner(TASKS, CHAINS, max_plans=2)
+    for project in ("a", "b", "c"):
+        planner.plan(project)
+    assert list(planner._recent) == ["b", "c"]
+    planner.chains = [{"name": "Base"}]
+    planner.invalidate()
+    assert not planner._recent
+    assert planner.plan("Arbitrum")["chain"] == "Base"
+
+async def test_farming_tasks_reports_wallet_status_and_notifies():
+    user = await repositories.users.create("farmer", "farmer@example.com", "secret")
+    result = await farming_tasks(user["id"], "Unlisted")
+    assert result["status"] == "wallet not connected"
+    latest = (await repositories.notifications.latest(user["id"], 1))[0]
+    assert latest["message"] == f"{len(result['tasks'])} tasks available on {result['chain']}."
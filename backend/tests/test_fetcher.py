@@ -0,0 +1,210 @@
+import asyncio
+import gzip
+import socket
+
+import httpcore
+import httpx
+import pytest
+
+from services.fetcher import Fetcher, FetchError
+
+pytestmark = pytest.mark.anyio
+
+# A public address, so the address check passes without resolving anything
+SITE = "http://93.184.216.34"
+
+def make_fetcher(handler, **options) -> Fetcher:
+    options.setdefault("backoff", 0)
+    return Fetcher(transport=httpx.MockTransport(handler), **options)
+
+async def test_client_is_shared_until_closed():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, text="ok")
+
+    fetcher = make_fetcher(handler)
+    client = fetcher.client
+    for path in ("/a", "/b", "/c"):
+        await fetcher.fetch(SITE + path)
+    assert fetcher.client is client
+    assert requests[0].headers["user-agent"] == fetcher.user_agent
+    await fetcher.close()
+    assert fetcher.client is not client
+    await fetcher.close()
+
+async def test_per_host_concurrency_is_bounded():
+    running = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return httpx.Response(200, text="ok")
+
+    fetcher = make_fetcher(handler, per_host=2)
+    await asyncio.gather(*(fetcher.fetch(f"{SITE}/{i}") for i in range(8)))
+    assert running["peak"] == 2
+    assert fetcher._hosts == {}
+    assert fetcher.stats()["requests"] == 8
+
+async def test_timeouts_are_retried_then_reported():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        raise httpx.ReadTimeout("slow", request=request)
+
+    fetcher = make_fetcher(handler, retries=2)
+    with pytest.raises(FetchError, match="ReadTimeout"):
+        await fetcher.fetch(SITE)
+    assert len(attempts) == 3
+    assert fetcher.stats()["retries"] == 2
+    assert fetcher.stats()["errors"] == 1
+
+async def test_transient_failure_recovers():
+    statuses = [503, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), text="ok")
+
+    fetcher = make_fetcher(handler, retries=2)
+    result = await fetcher.fetch(SITE)
+    assert (result.status, result.text()) == (200, "ok")
+    assert fetcher.stats()["retries"] == 1
+
+async def test_error_statuses_and_connection_errors_raise_fetch_error():
+    def handler(request):
+        if request.url.path == "/refused":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(404 if request.url.path == "/missing" else 500)
+
+    fetcher = make_fetcher(handler, retries=1)
+    with pytest.raises(FetchError, match="answered 404"):
+        await fetcher.fetch(SITE + "/missing")
+    with pytest.raises(FetchError, match="answered 500"):
+        await fetcher.fetch(SITE + "/down")
+    with pytest.raises(FetchError, match="ConnectError"):
+        await fetcher.fetch(SITE + "/refused")
+    assert fetcher.stats()["errors"] == 3
+
+async def test_declared_length_over_the_cap_is_refused():
+    fetcher = make_fetcher(lambda request: httpx.Response(200, content=b"x" * 101), max_bytes=100)
+    with pytest.raises(FetchError, match="exceed the 100 byte limit"):
+        await fetcher.fetch(SITE)
+
+async def test_streamed_body_over_the_cap_is_cut_off():
+    async def chunks():
+        for _ in range(10):
+            yield b"x" * 50
+
+    fetcher = make_fetcher(lambda request: httpx.Response(200, content=chunks()), max_bytes=100)
+    with pytest.raises(FetchError, match="body exceeds the 100 byte limit"):
+        await fetcher.fetch(SITE)
+
+async def test_cap_applies_after_decompression():
+    bomb = gzip.compress(b"0" * 10_000)
+
+    def handler(request):
+        return httpx.Response(200, content=bomb, headers={"content-encoding": "gzip"})
+
+    fetcher = make_fetcher(handler, max_bytes=1000)
+    assert len(bomb) < 1000
+    with pytest.raises(FetchError, match="byte limit"):
+        await fetcher.fetch(SITE)
+
+async def test_unchanged_page_is_revalidated():
+    def handler(request):
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text="page", headers={"etag": '"v1"'})
+
+    fetcher = make_fetcher(handler)
+    first = await fetcher.fetch(SITE)
+    again = await fetcher.fetch(SITE)
+    assert (first.revalidated, again.revalidated) == (False, True)
+    assert again.body == b"page"
+
+async def test_only_http_urls_are_fetched():
+    fetcher = make_fetcher(lambda request: httpx.Response(200))
+    for url in ("file:///etc/passwd", "ftp://93.184.216.34/", "http:///nohost"):
+        with pytest.raises(FetchError, match="only http and https"):
+            await fetcher.fetch(url)
+
+async def test_non_public_addresses_are_refused():
+    fetcher = make_fetcher(lambda request: httpx.Response(200))
+    for url in ("http://127.0.0.1/", "http://10.0.0.5/", "http://169.254.169.254/", "http://[::1]/",
+                "http://[::ffff:127.0.0.1]/"):
+        with pytest.raises(FetchError, match="non-public address"):
+            await fetcher.fetch(url)
+    assert fetcher.stats()["requests"] == 0
+
+async def test_every_redirect_hop_is_checked():
+    requested = []
+
+    def handler(request):
+        requested.append(str(request.url))
+        if request.url.path == "/moved":
+            return httpx.Response(301, headers={"location": "/final"})
+        if request.url.path == "/metadata":
+            return httpx.Response(302, headers={"location": "http://169.254.169.254/latest/meta-data"})
+        if request.url.path == "/loop":
+            return httpx.Response(302, headers={"location": "/loop"})
+        return httpx.Response(200, text="final")
+
+    fetcher = make_fetcher(handler, max_redirects=3)
+    result = await fetcher.fetch(SITE + "/moved")
+    assert result.url == SITE + "/final"
+    with pytest.raises(FetchError, match="non-public address"):
+        await fetcher.fetch(SITE + "/metadata")
+    assert not any("169.254" in url for url in requested)
+    with pytest.raises(FetchError, match="more than 3 redirects"):
+        await fetcher.fetch(SITE + "/loop")
+
+async def test_redirects_take_the_slot_of_their_own_host():
+    running = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        if request.url.path == "/elsewhere":
+            return httpx.Response(302, headers={"location": "http://93.184.216.35/page"})
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return httpx.Response(200, text="ok")
+
+    fetcher = make_fetcher(handler, per_host=1)
+    urls = ["http://93.184.216.35/page"] * 2 + [SITE + "/elsewhere"] * 2
+    await asyncio.gather(*(fetcher.fetch(url) for url in urls))
+    assert running["peak"] == 1
+    assert fetcher._hosts == {}
+
+class Dialer(httpcore.AsyncNetworkBackend):
+    """Records the addresses connections are opened to, without opening any"""
+
+    def __init__(self):
+        self.dialed = []
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        self.dialed.append(host)
+        raise httpcore.ConnectError("unreachable in tests")
+
+async def test_connections_dial_the_checked_address(monkeypatch):
+    # The first lookup of rebind.test is public, later ones point inside the network
+    answers = {"pinned.test": ["93.184.216.34"] * 2, "rebind.test": ["93.184.216.34", "127.0.0.1"]}
+
+    async def getaddrinfo(host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (answers[host].pop(0), port))]
+
+    monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+    fetcher = Fetcher(retries=0)
+    dialer = fetcher.client._transport._pool._network_backend._backend = Dialer()
+
+    with pytest.raises(FetchError, match="ConnectError"):
+        await fetcher.fetch("http://pinned.test/")
+    with pytest.raises(FetchError, match="non-public address 127.0.0.1"):
+        await fetcher.fetch("http://rebind.test/")
+    assert dialer.dialed == ["93.184.216.34"]
+    await fetcher.close()
@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from services import jobs
+from services.jobs import CANCELLED, COMPLETED, FAILED, PAID, QUEUED, RUNNING, JobQueue, QueueFull
+
+pytestmark = pytest.mark.anyio
+
+async def settle(*submitted):
+    """Wait until every job submitted has finished"""
+    async def finished():
+        while not all(job.finished for job in submitted):
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(finished(), 2)
+
+async def test_paid_lane_goes_first_without_starving_free_jobs():
+    order = []
+
+    async def record(user_id, name):
+        order.append(name)
+        return {"name": name}
+
+    queue = JobQueue({})
+    queue.register("work", record, concurrency=1)
+    submitted = [queue.submit("work", "user_1", {"name": f"f{i}"}) for i in range(2)]
+    submitted += [queue.submit("work", "user_1", {"name": f"p{i}"}, paid=True) for i in range(6)]
+    assert submitted[-1].lane == PAID
+    worker = asyncio.ensure_future(queue.run_forever())
+    try:
+        await settle(*submitted)
+    finally:
+        worker.cancel()
+    assert order == ["p0", "p1", "p2", "p3", "f0", "p4", "p5", "f1"]
+    assert submitted[0].status == COMPLETED and submitted[0].result == {"name": "f0"}
+
+async def test_queued_and_running_jobs_can_be_cancelled():
+    started = asyncio.Event()
+
+    async def block(user_id):
+        started.set()
+        await asyncio.Event().wait()
+
+    queue = JobQueue({})
+    queue.register("work", block, concurrency=1)
+    running = queue.submit("work", "user_1", {})
+    waiting = queue.submit("work", "user_1", {})
+    worker = asyncio.ensure_future(queue.run_forever())
+    try:
+        await asyncio.wait_for(started.wait(), 2)
+        assert running.status == RUNNING and waiting.status == QUEUED
+        assert queue.cancel(waiting)
+        assert queue.stats()["work"] == {"queued": 0, "running": 1, "workers": 1}
+        assert queue.cancel(running)
+        await settle(running)
+    finally:
+        worker.cancel()
+    assert running.status == waiting.status == CANCELLED
+    assert not queue.cancel(running)
+    assert queue.stats()["work"]["running"] == 0
+
+async def test_failed_jobs_report_only_http_details():
+    async def fail(user_id, error):
+        raise error
+
+    queue = JobQueue({})
+    queue.register("work", fail, concurrency=2)
+    rejected = queue.submit("work", "user_1", {"error": HTTPException(status_code=404, detail="Project not found")})
+    crashed = queue.submit("work", "user_1", {"error": RuntimeError("secret connection string")})
+    worker = asyncio.ensure_future(queue.run_forever())
+    try:
+        await settle(rejected, crashed)
+    finally:
+        worker.cancel()
+    assert (rejected.status, rejected.error) == (FAILED, "Project not found")
+    assert (crashed.status, crashed.error) == (FAILED, "Job failed")
+
+def test_full_queue_rejects_until_a_job_leaves():
+    queue = JobQueue({}, max_pending=2)
+    queue.register("work", None)
+    first = queue.submit("work", "user_1", {})
+    queue.submit("work", "user_1", {}, paid=True)
+    with pytest.raises(QueueFull):
+        queue.submit("work", "user_1", {})
+    queue.cancel(first)
+    assert queue.submit("work", "user_1", {}).status == QUEUED
+
+def test_finished_jobs_expire_after_the_ttl_or_the_retention_limit(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(jobs, "time", SimpleNamespace(time=lambda: clock.now))
+    queue = JobQueue({}, result_ttl=60, max_retained=2)
+    queue.register("work", None)
+    submitted = [queue.submit("work", "user_1", {}) for _ in range(3)]
+    for job in submitted:
+        queue.cancel(job)
+    # Only the newest max_retained finished jobs are kept
+    assert queue.get(submitted[0].id) is None
+    assert queue.get(submitted[2].id).to_dict()["expires_at"] is not None
+    clock.now += 59
+    assert queue.get(submitted[1].id) is submitted[1]
+    clock.now += 1
+    assert queue.get(submitted[1].id) is None and queue.get(submitted[2].id) is None
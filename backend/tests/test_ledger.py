@@ -0,0 +1,64 @@
+import pytest
+
+from models.ledger import CreditLedger, IdempotencyConflict, InsufficientCredits, LedgerEntry
+
+def test_balance_follows_applied_entries():
+    ledger = CreditLedger()
+    ledger.apply("u", "bonus", 20)
+    entry = ledger.apply("u", "consume", -5)
+    assert (entry.seq, entry.balance, ledger.balance("u")) == (2, 15, 15)
+    with pytest.raises(InsufficientCredits):
+        ledger.apply("u", "consume", -16)
+    assert ledger.balance("u") == 15 and ledger.last_seq == 2
+
+def test_idempotency_key_applies_once():
+    ledger = CreditLedger()
+    first = ledger.apply("u", "buy", 10, idempotency_key="k", fingerprint="buy-10")
+    assert ledger.apply("u", "buy", 10, idempotency_key="k", fingerprint="buy-10") is first
+    assert ledger.apply("u", "buy", 10, idempotency_key="k") is first
+    assert ledger.balance("u") == 10
+    assert ledger.find("u", "k") is first and ledger.find("v", "k") is None
+    with pytest.raises(IdempotencyConflict):
+        ledger.apply("u", "consume", -3, idempotency_key="k", fingerprint="consume-3")
+    assert ledger.balance("u") == 10
+
+def test_insufficient_credits_do_not_claim_the_key():
+    ledger = CreditLedger()
+    with pytest.raises(InsufficientCredits):
+        ledger.apply("u", "consume", -3, idempotency_key="k")
+    ledger.apply("u", "buy", 5)
+    assert ledger.apply("u", "consume", -3, idempotency_key="k").balance == 2
+
+def test_oldest_idempotency_keys_are_forgotten_past_the_limit():
+    ledger = CreditLedger(max_idempotency_keys=2)
+    for key in ("a", "b", "c"):
+        ledger.apply("u", "buy", 1, idempotency_key=key)
+    assert [ledger.find("u", key) is not None for key in "abc"] == [False, True, True]
+
+def test_compaction_folds_old_entries_and_keeps_the_balance():
+    ledger = CreditLedger(max_entries_per_user=10)
+    ledger.apply("u", "buy", 100)
+    for _ in range(11):
+        ledger.apply("u", "consume", -1)
+    history = [entry.amount for entry in ledger.history("u", 20)]
+    assert ledger.compact() == 6
+    compacted = ledger.history("u", 20)
+    assert len(compacted) == 6
+    assert compacted[-1].kind == "snapshot"
+    assert sum(entry.amount for entry in compacted) == sum(history) == ledger.balance("u") == 89
+    # Compaction folds away the purchase but the user is still a buyer
+    assert ledger.has_purchased("u")
+    assert ledger.compact() == 0
+
+def test_restore_rebuilds_balances_keys_and_sequence():
+    original = CreditLedger()
+    original.apply("u", "buy", 10, idempotency_key="k")
+    original.apply("u", "consume", -4)
+    restored = CreditLedger()
+    for entry in original.entries():
+        restored.restore(LedgerEntry(entry.seq, entry.user_id, entry.kind, entry.amount, entry.balance,
+                                     entry.description, entry.timestamp, entry.idempotency_key))
+    assert restored.balance("u") == 6
+    assert restored.find("u", "k").seq == 1
+    assert restored.has_purchased("u")
+    assert restored.apply("u", "bonus", 1).seq == 3
@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from services.llm import CompletionCache, LLMClient, LLMError, token_sink
+
+pytestmark = pytest.mark.anyio
+
+def completion(text: str) -> httpx.Response:
+    """A streamed chat completion answering text in two pieces"""
+    middle = len(text) // 2
+    lines = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": piece}}]})
+        for piece in (text[:middle], text[middle:])
+    ]
+    return httpx.Response(200, text="\n\n".join(lines + ["data: [DONE]"]) + "\n\n")
+
+class Upstream:
+    """A mock provider that counts requests and can hold them until released"""
+
+    def __init__(self, answer: str = "## about\nA rollup.\n## team\nBuilders."):
+        self.answer = answer
+        self.requests = []
+        self.release = asyncio.Event()
+        self.release.set()
+        self.fail_with = None
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(json.loads(request.content))
+        await self.release.wait()
+        if self.fail_with is not None:
+            return httpx.Response(self.fail_with, text="upstream broke")
+        return completion(self.answer)
+
+@pytest.fixture
+def upstream():
+    return Upstream()
+
+@pytest.fixture
+async def make_client(upstream, tmp_path):
+    clients = []
+
+    def make_client(**options) -> LLMClient:
+        options.setdefault("coalesce_window", 0.01)
+        client = LLMClient(
+            "http://llm.test/v1", "key", "test-model", CompletionCache(str(tmp_path), 1 << 20),
+            enabled=True, transport=httpx.MockTransport(upstream), **options
+        )
+        clients.append(client)
+        return client
+
+    yield make_client
+    for client in clients:
+        await client.close()
+
+async def test_concurrent_identical_prompts_make_one_request(upstream, make_client):
+    client = make_client()
+    upstream.release.clear()
+    # Each call has every expected section, so each sends its own prompt right away
+    calls = [asyncio.create_task(client.summarize("Base", None, "about", "L2", sections=["about"])) for _ in range(5)]
+    await asyncio.sleep(0.05)
+    upstream.release.set()
+    assert await asyncio.gather(*calls) == ["A rollup."] * 5
+    assert len(upstream.requests) == 1
+    assert client.stats()["requests"] == 1
+
+async def test_sections_of_one_project_share_a_prompt(upstream, make_client):
+    client = make_client()
+    about, team = await asyncio.gather(
+        client.summarize("Base", None, "about", "L2", sections=["about", "team"]),
+        client.summarize("Base", None, "team", ["Jesse"], sections=["about", "team"])
+    )
+    assert (about, team) == ("A rollup.", "Builders.")
+    assert len(upstream.requests) == 1
+    prompt = upstream.requests[0]["messages"][1]["content"]
+    assert "## about\nL2" in prompt and "## team" in prompt
+
+async def test_completions_are_cached_on_disk(upstream, make_client):
+    assert await make_client().summarize("Base", None, "about", "L2", sections=["about"]) == "A rollup."
+    # A new client, as after a restart, reads the completion back from the directory
+    client = make_client()
+    assert await client.summarize("Base", None, "about", "L2", sections=["about"]) == "A rollup."
+    assert len(upstream.requests) == 1
+    assert client.stats()["cache_hits"] == 1
+
+async def test_failures_do_not_poison_the_cache(upstream, make_client):
+    client = make_client()
+    upstream.fail_with = 500
+    upstream.release.clear()
+    calls = [asyncio.create_task(client.summarize("Base", None, "about", "L2", sections=["about"])) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    upstream.release.set()
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    assert all(isinstance(result, LLMError) for result in results)
+    assert len(upstream.requests) == 1
+    assert client.cache.size == 0
+
+    upstream.fail_with = None
+    assert await client.summarize("Base", None, "about", "L2", sections=["about"]) == "A rollup."
+    assert len(upstream.requests) == 2
+    assert client.cache.size > 0
+
+async def test_unusable_completions_are_not_cached(upstream, make_client):
+    client = make_client()
+    upstream.answer = "I cannot help with that."
+    with pytest.raises(LLMError, match="no about summary"):
+        await client.summarize("Base", None, "about", "L2", sections=["about"])
+    upstream.answer = "## about\nA rollup."
+    assert await client.summarize("Base", None, "about", "L2", sections=["about"]) == "A rollup."
+    assert len(upstream.requests) == 2
+
+async def test_streamed_text_reaches_the_token_sink(upstream, make_client):
+    client = make_client()
+    pieces = []
+    token_sink.set(pieces.append)
+    try:
+        await client.summarize("Base", None, "about", "L2", sections=["about"])
+    finally:
+        token_sink.set(None)
+    assert len(pieces) == 2
+    assert "".join(pieces) == upstream.answer
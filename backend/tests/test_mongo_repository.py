@@ -0,0 +1,266 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DuplicateKeyError
+
+from models.ledger import IdempotencyConflict
+from models.mongo_repository import (
+    MongoAirdropRepository,
+    MongoCreditRepository,
+    MongoNotificationRepository,
+    MongoReferralRepository,
+    MongoUserRepository,
+    ensure_indexes,
+)
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def database():
+    database = AsyncMongoMockClient()["scryptex_test"]
+    await ensure_indexes(database)
+    return database
+
+@pytest.fixture
+def credits(database):
+    return MongoCreditRepository(database)
+
+@pytest.fixture
+def referrals(database):
+    return MongoReferralRepository(database)
+
+@pytest.fixture
+def users(database, credits, referrals):
+    return MongoUserRepository(database, credits, referrals)
+
+@pytest.fixture
+def notifications(database):
+    return MongoNotificationRepository(database)
+
+@pytest.fixture
+def airdrops(database):
+    return MongoAirdropRepository(database)
+
+# Users
+
+async def test_create_user_assigns_ids_and_signup_bonus(users, credits):
+    alice = await users.create("alice", "alice@example.com", "secret")
+    bob = await users.create("bob", "bob@example.com", "secret")
+    assert (alice["id"], bob["id"]) == ("user_1", "user_2")
+    assert await credits.balance("user_1") == 20
+    assert (await credits.history("user_1"))[0]["action"] == "bonus"
+
+async def test_get_user_hides_internal_fields(users):
+    await users.create("alice", "alice@example.com", "secret")
+    by_email = await users.get_by_email("alice@example.com")
+    assert by_email["id"] == "user_1"
+    assert "_id" not in by_email
+    assert await users.get_by_id("user_1") == by_email
+    assert await users.get_by_id("user_9") is None
+
+async def test_duplicate_email_is_rejected(users):
+    await users.create("alice", "alice@example.com", "secret")
+    with pytest.raises(DuplicateKeyError):
+        await users.create("alice2", "alice@example.com", "secret")
+
+async def test_id_batches(users):
+    for i in range(5):
+        await users.create(f"user{i}", f"user{i}@example.com", "secret")
+    batches = [batch async for batch in users.id_batches(2)]
+    assert batches == [["user_1", "user_2"], ["user_3", "user_4"], ["user_5"]]
+
+async def test_referrals_are_stored_with_the_user(users, referrals):
+    await users.create("Alice", "alice@example.com", "secret")
+    stats = await referrals.stats("user_1")
+    assert stats["code"].startswith("alice") and stats["invites"] == 0
+    assert await referrals.add("user_1", "friend@example.com")
+    assert not await referrals.add("user_9", "friend@example.com")
+    assert (await referrals.stats("user_1"))["earned_credits"] == 10
+    assert (await referrals.stats("user_9"))["code"] == ""
+
+# Credits
+
+async def test_consume_needs_enough_credits(credits):
+    assert await credits.add("u", 10) == 10
+    assert not await credits.consume("u", 11)
+    assert await credits.consume("u", 4)
+    assert await credits.balance("u") == 6
+    assert [entry["amount"] for entry in await credits.history("u")] == [-4, 10]
+
+async def test_consume_without_balance_document(credits):
+    assert not await credits.consume("nobody", 1)
+    assert await credits.balance("nobody") == 0
+    assert await credits.history("nobody") == []
+
+async def test_idempotent_add_is_applied_once(credits):
+    assert await credits.add("u", 10, "buy", "", "purchase-1") == 10
+    assert await credits.add("u", 10, "buy", "", "purchase-1") == 10
+    assert await credits.balance("u") == 10
+    assert len(await credits.history("u")) == 1
+    entry = await credits.find("u", "purchase-1")
+    assert (entry["amount"], entry["balance"]) == (10, 10)
+
+async def test_idempotency_keys_are_per_user(credits):
+    await credits.add("u", 10, "buy", "", "k")
+    await credits.add("v", 5, "buy", "", "k")
+    assert (await credits.balance("u"), await credits.balance("v")) == (10, 5)
+
+async def test_concurrent_retries_charge_once(credits):
+    await credits.add("u", 10)
+    results = await asyncio.gather(*(credits.consume("u", 3, "", "charge-1", "batch-a") for _ in range(5)))
+    assert results == [True] * 5
+    assert await credits.balance("u") == 7
+    assert len(await credits.history("u")) == 2
+
+async def test_reused_key_with_another_fingerprint_conflicts(credits):
+    await credits.add("u", 10)
+    assert await credits.consume("u", 3, "", "charge-1", "batch-a")
+    with pytest.raises(IdempotencyConflict):
+        await credits.consume("u", 5, "", "charge-1", "batch-b")
+    assert await credits.balance("u") == 7
+
+async def test_failed_charge_does_not_claim_the_key(credits):
+    assert not await credits.consume("u", 3, "", "charge-1")
+    await credits.add("u", 10)
+    assert await credits.consume("u", 3, "", "charge-1")
+    assert await credits.balance("u") == 7
+
+async def test_has_purchased(credits):
+    await credits.add("u", 20, "bonus")
+    assert not await credits.has_purchased("u")
+    await credits.add("u", 5, "buy")
+    assert await credits.has_purchased("u")
+
+# Notifications
+
+async def test_latest_is_newest_first(notifications):
+    for i in range(3):
+        await notifications.add("u", f"Title {i}", "message")
+    await notifications.add("v", "Other", "message")
+    latest = await notifications.latest("u", 2)
+    assert [n["title"] for n in latest] == ["Title 2", "Title 1"]
+    assert all("seq" not in n and "_id" not in n for n in latest)
+    assert await notifications.latest("u", 0) == []
+
+async def test_add_many(notifications):
+    count = await notifications.add_many(
+        {"user_id": "u", "title": f"Title {i}", "message": "message"} for i in range(3)
+    )
+    assert count == 3
+    assert [n["id"] for n in await notifications.latest("u", 5)] == ["notif-3", "notif-2", "notif-1"]
+
+async def test_broadcast_is_shared_and_delivered_once(notifications):
+    body = await notifications.create_broadcast("News", "Hello everyone")
+    assert await notifications.deliver(body["id"], ["u", "v"]) == 2
+    assert await notifications.deliver(body["id"], ["v", "w"]) == 1
+    latest = await notifications.latest("w", 5)
+    assert [(n["id"], n["title"], n["user_id"], n["read"]) for n in latest] == [(body["id"], "News", "w", False)]
+    assert await notifications.database.broadcasts.count_documents({}) == 1
+
+async def test_deliver_of_an_unknown_broadcast_is_a_no_op(notifications):
+    assert await notifications.deliver("notif-404", ["u"]) == 0
+    assert await notifications.latest("u", 5) == []
+
+async def test_read_flags_and_unread_count(notifications):
+    own = await notifications.add("u", "Own", "message")
+    body = await notifications.create_broadcast("News", "Hello")
+    await notifications.deliver(body["id"], ["u", "v"])
+    assert await notifications.unread_count("u") == 2
+    marked = await notifications.mark_read("u", body["id"])
+    assert (marked["title"], marked["read"]) == ("News", True)
+    assert await notifications.unread_count("u") == 1
+    assert await notifications.unread_count("v") == 1
+    assert await notifications.mark_read("v", own["id"]) is None
+    assert await notifications.mark_all_read("u") == 2
+    assert await notifications.unread_count("u") == 0
+
+async def test_delete_is_scoped_to_owner(notifications):
+    own = await notifications.add("u", "Own", "message")
+    assert not await notifications.delete("v", own["id"])
+    assert await notifications.delete("u", own["id"])
+    assert not await notifications.delete("u", own["id"])
+    assert await notifications.latest("u", 5) == []
+
+# Airdrops
+
+def make_airdrops(count, start=None):
+    start = start or datetime(2030, 1, 1)
+    return [
+        {
+            "projectName": f"P{i}",
+            "link": f"https://p{i}.example.com",
+            # Deadlines in reverse order of creation, so the two sorts differ
+            "deadline": (start + timedelta(days=count - i)).isoformat(),
+            "description": "d",
+            "chain": "Base" if i % 2 else "Arbitrum One",
+            "status": "active" if i % 3 else "upcoming"
+        }
+        for i in range(count)
+    ]
+
+async def collect_pages(airdrops, **filters):
+    pages, cursor = [], None
+    while True:
+        page = await airdrops.list(limit=4, cursor=cursor, **filters)
+        pages.append([a["projectName"] for a in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+async def test_pages_cover_the_catalog_once(airdrops):
+    assert await airdrops.add_many(make_airdrops(10)) == 10
+    pages = await collect_pages(airdrops)
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert sum(pages, []) == [f"P{i}" for i in range(10)]
+
+async def test_pages_by_deadline_descending(airdrops):
+    await airdrops.add_many(make_airdrops(10))
+    pages = await collect_pages(airdrops, sort="deadline", descending=True)
+    assert sum(pages, []) == [f"P{i}" for i in range(10)]
+    pages = await collect_pages(airdrops, sort="deadline")
+    assert sum(pages, []) == [f"P{i}" for i in reversed(range(10))]
+
+async def test_pages_with_filters(airdrops):
+    await airdrops.add_many(make_airdrops(12))
+    pages = await collect_pages(
+        airdrops, chain="Base", deadline_from=datetime(2030, 1, 3), deadline_to=datetime(2030, 1, 10)
+    )
+    # P3..P10 have deadlines in range; the odd ones are on Base
+    assert sum(pages, []) == ["P3", "P5", "P7", "P9"]
+
+async def test_deadlines_are_stored_as_dates(airdrops):
+    # ISO strings with an offset compare differently from the instants they name
+    await airdrops.add_many([
+        dict(make_airdrops(1)[0], projectName="Late", deadline="2030-01-01T21:00:00-05:00"),
+        dict(make_airdrops(1)[0], projectName="Early", deadline="2030-01-01T23:00:00")
+    ])
+    stored = await airdrops.airdrops.find_one({"projectName": "Late"})
+    assert isinstance(stored["deadline"], datetime)
+    page = await airdrops.list(sort="deadline", limit=1)
+    assert [a["projectName"] for a in page["items"]] == ["Early"]
+    assert isinstance(page["items"][0]["deadline"], str)
+    rest = await airdrops.list(sort="deadline", limit=1, cursor=page["next_cursor"])
+    assert [a["projectName"] for a in rest["items"]] == ["Late"]
+
+async def test_string_deadlines_are_converted(airdrops):
+    await airdrops.airdrops.insert_one({**make_airdrops(1)[0], "id": "airdrop-001", "seq": 1})
+    assert await airdrops.convert_deadlines() == 1
+    assert (await airdrops.list(deadline_from=datetime(2030, 1, 1)))["items"][0]["id"] == "airdrop-001"
+
+async def test_cursor_is_tied_to_its_sort(airdrops):
+    await airdrops.add_many(make_airdrops(6))
+    page = await airdrops.list(limit=2)
+    with pytest.raises(ValueError):
+        await airdrops.list(sort="deadline", cursor=page["next_cursor"])
+
+async def test_seed_keeps_ids_and_generated_ids_follow(airdrops):
+    seeded = [dict(airdrop, id=f"airdrop-00{i + 1}") for i, airdrop in enumerate(make_airdrops(3))]
+    await airdrops.seed(seeded)
+    await airdrops.seed(seeded)
+    added = await airdrops.add(make_airdrops(1)[0])
+    assert added["id"] == "airdrop-004"
+    assert (await airdrops.get("airdrop-002"))["projectName"] == "P1"
+    updated = await airdrops.set_status("airdrop-002", "ended")
+    assert updated["status"] == "ended"
@@ -0,0 +1,58 @@
+from models.notification_store import NotificationStore
+from models.records import NotificationRecord
+
+def notify(store, user_id, title="Title", read=False):
+    return store.append(NotificationRecord(store.next_id(), user_id, title, "message", "info", 0, read))
+
+def test_latest_is_per_user_and_newest_first():
+    store = NotificationStore()
+    for i in range(4):
+        notify(store, "u", f"Title {i}")
+    notify(store, "v")
+    assert [n["title"] for n in store.latest("u", 3)] == ["Title 3", "Title 2", "Title 1"]
+    assert store.latest("u", 0) == [] and store.latest("nobody", 5) == []
+    assert (store.count("u"), store.count("v"), len(store)) == (4, 1, 5)
+
+def test_unread_count_follows_reads_and_deletes():
+    store = NotificationStore()
+    first = notify(store, "u")
+    second = notify(store, "u")
+    notify(store, "u", read=True)
+    assert store.unread_count("u") == 2
+    assert store.mark_read(first.id, "u")["read"] is True
+    store.mark_read(first.id, "u")
+    assert store.unread_count("u") == 1
+    assert store.delete(second.id, "u")["id"] == second.id
+    assert store.unread_count("u") == 0
+    assert store.mark_all_read("u") == 2
+
+def test_operations_are_scoped_to_the_owner():
+    store = NotificationStore()
+    own = notify(store, "u")
+    assert store.get(own.id, "v") is None
+    assert store.mark_read(own.id, "v") is None
+    assert store.delete(own.id, "v") is None
+    assert store.get(own.id)["user_id"] == "u"
+
+def test_broadcast_is_stored_once_and_read_per_user():
+    store = NotificationStore()
+    body = store.add_broadcast(NotificationRecord(store.next_id(), None, "News", "Hello", "info", 0))
+    assert store.deliver(body.id, ["u", "v"]) == 2
+    assert store.deliver(body.id, ["v", "w"]) == 1
+    assert store.latest("w", 5)[0] == {**body.to_dict(), "user_id": "w", "read": False}
+
+    store.mark_read(body.id, "u")
+    assert (store.unread_count("u"), store.unread_count("v")) == (0, 1)
+    # A broadcast id is shared, so it needs the recipient to be found
+    assert store.get(body.id) is None
+    assert store.delete(body.id, "v")["title"] == "News"
+    assert store.get(body.id, "v") is None and store.get(body.id, "w") is not None
+    assert len(store) == 2
+
+def test_restore_keeps_ids_and_advances_the_counter():
+    store = NotificationStore()
+    store.restore(NotificationRecord("notif-7", "u", "Old", "message", "info", 0))
+    store.restore_broadcast(NotificationRecord("notif-9", None, "News", "message", "info", 0))
+    assert store.next_id() == "notif-10"
+    assert [n.id for n in store.records()] == ["notif-7"]
+    assert [b.id for b in store.broadcasts()] == ["notif-9"]
@@ -0,0 +1,91 @@
+import asyncio
+import os
+
+import pytest
+
+from models.persistence import PREVIOUS_WAL_FILE, WAL_FILE, Persistence
+
+pytestmark = pytest.mark.anyio
+
+def reopen(directory):
+    """Records a fresh Persistence replays from directory"""
+    replayed = []
+    restarted = Persistence()
+    restarted.open(directory, replayed.append)
+    return replayed
+
+async def test_flushed_records_replay_in_order(tmp_path):
+    persistence = Persistence()
+    assert persistence.open(str(tmp_path), lambda record: None) == 0
+    for i in range(3):
+        persistence.log("credit", i)
+    await persistence.flush()
+    assert persistence.durable_lsn == 3
+    assert reopen(str(tmp_path)) == [["credit", 0], ["credit", 1], ["credit", 2]]
+
+async def test_commit_waits_for_the_flusher(tmp_path):
+    persistence = Persistence(commit_interval=0)
+    persistence.open(str(tmp_path), lambda record: None)
+    flusher = asyncio.ensure_future(persistence.run_forever(lambda: []))
+    try:
+        persistence.log("user", "user_1")
+        await asyncio.wait_for(persistence.commit(), 2)
+        assert persistence.durable_lsn == 1
+    finally:
+        flusher.cancel()
+
+async def test_snapshot_replaces_the_log_it_covers(tmp_path):
+    persistence = Persistence()
+    persistence.open(str(tmp_path), lambda record: None)
+    state = []
+    for i in range(3):
+        state.append(["credit", i])
+        persistence.log("credit", i)
+    await persistence.flush()
+    assert await persistence.snapshot(lambda: list(state)) == 3
+    persistence.log("credit", 3)
+    await persistence.flush()
+
+    assert not os.path.exists(tmp_path / PREVIOUS_WAL_FILE)
+    assert len((tmp_path / WAL_FILE).read_bytes().splitlines()) == 1
+    assert reopen(str(tmp_path)) == [["credit", 0], ["credit", 1], ["credit", 2], ["credit", 3]]
+
+async def test_torn_last_record_is_dropped(tmp_path):
+    persistence = Persistence()
+    persistence.open(str(tmp_path), lambda record: None)
+    persistence.log("user", "user_1")
+    await persistence.flush()
+    with open(tmp_path / WAL_FILE, "ab") as f:
+        f.write(b'[2,"user","us')
+    assert reopen(str(tmp_path)) == [["user", "user_1"]]
+    # Appends after the restart start on a clean line
+    restarted = Persistence()
+    restarted.open(str(tmp_path), lambda record: None)
+    restarted.log("user", "user_2")
+    await restarted.flush()
+    assert reopen(str(tmp_path)) == [["user", "user_1"], ["user", "user_2"]]
+
+async def test_failed_write_keeps_records_for_the_next_flush(tmp_path, monkeypatch):
+    persistence = Persistence()
+    persistence.open(str(tmp_path), lambda record: None)
+    persistence.log("user", "user_1")
+    persistence.log("credit", 1, "user_1", 20)
+
+    write = os.write
+
+    def partial_write(fd, data):
+        # Half a batch reaches the file before the disk gives up
+        write(fd, bytes(data[:len(data) // 2]))
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(os, "write", partial_write)
+    with pytest.raises(OSError):
+        await persistence.flush()
+    assert persistence.durable_lsn == 0
+
+    monkeypatch.setattr(os, "write", write)
+    persistence.log("wallet", "user_1", "0xabc")
+    await persistence.flush()
+
+    assert persistence.durable_lsn == 3
+    assert reopen(str(tmp_path)) == [["user", "user_1"], ["credit", 1, "user_1", 20], ["wallet", "user_1", "0xabc"]]
@@ -0,0 +1,85 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DuplicateKeyError
+
+from core.rate_limit import MongoTokenBuckets, RateLimit, RateLimiter, RateLimitMiddleware, TokenBuckets
+from core.security import issue_token
+
+pytestmark = pytest.mark.anyio
+
+def test_limits_are_parsed_as_capacity_and_rate():
+    limit = RateLimit.parse("30/minute")
+    assert (limit.capacity, limit.rate) == (30.0, 0.5)
+    for spec in ("0/second", "ten/minute", "5/fortnight"):
+        with pytest.raises(ValueError):
+            RateLimit.parse(spec)
+
+async def test_bucket_refills_continuously():
+    buckets = TokenBuckets(max_keys=100)
+    limit = RateLimit.parse("2/second")
+    assert [await buckets.take("k", limit, 100.0) for _ in range(3)] == [0.0, 0.0, 0.5]
+    assert await buckets.take("k", limit, 100.25) == 0.25
+    assert await buckets.take("k", limit, 100.5) == 0.0
+    # Idle time never fills past capacity
+    assert [await buckets.take("k", limit, 1000.0) for _ in range(3)] == [0.0, 0.0, 0.5]
+
+async def test_least_recently_used_keys_are_dropped():
+    buckets = TokenBuckets(max_keys=2)
+    limit = RateLimit.parse("1/hour")
+    for key in ("a", "b"):
+        await buckets.take(key, limit, 0.0)
+    await buckets.take("a", limit, 1.0)
+    await buckets.take("c", limit, 2.0)
+    assert len(buckets) == 2
+    # b was evicted, so it starts with a full bucket again
+    assert await buckets.take("b", limit, 3.0) == 0.0
+    assert await buckets.take("c", limit, 3.0) > 0
+
+def test_rules_match_method_and_longest_prefix():
+    limiter = RateLimiter({"/api/analyze": "10/minute", "POST /api/analyze/batch": "1/minute"}, TokenBuckets(10))
+    assert limiter.match("POST", "/api/analyze/batch")[0] == "POST /api/analyze/batch"
+    assert limiter.match("GET", "/api/analyze/batch")[0] == "/api/analyze"
+    assert limiter.match("GET", "/api/credit") is None
+
+async def test_middleware_answers_429_per_client():
+    app = FastAPI()
+
+    @app.get("/api/analyze")
+    async def analyze():
+        return {"ok": True}
+
+    limiter = RateLimiter({"/api/analyze": "2/hour"}, TokenBuckets(100))
+    transport = httpx.ASGITransport(app=RateLimitMiddleware(app, limiter), client=("10.0.0.1", 5000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert [(await client.get("/api/analyze")).status_code for _ in range(3)] == [200, 200, 429]
+        limited = await client.get("/api/analyze", params={"user_id": "someone_else"})
+        assert limited.status_code == 429 and int(limited.headers["retry-after"]) > 0
+        # A verified token counts against its user rather than the shared address
+        headers = {"Authorization": f"Bearer {issue_token('user_1')['token']}"}
+        assert (await client.get("/api/analyze", headers=headers)).status_code == 200
+    assert limiter.rejected == 2
+
+class RacingCollection:
+    """A collection whose first upsert loses to another worker inserting the same key"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.raced = False
+
+    async def find_one_and_update(self, filter, update, **kwargs):
+        if not self.raced:
+            self.raced = True
+            await self.collection.insert_one({"_id": filter["_id"]})
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return await self.collection.find_one_and_update(filter, update, **kwargs)
+
+async def test_mongo_take_retries_a_lost_upsert_race():
+    buckets = MongoTokenBuckets(AsyncMongoMockClient()["scryptex_test"])
+    buckets.collection = RacingCollection(buckets.collection)
+    limit = RateLimit.parse("2/second")
+
+    assert await buckets.take("ip:1.2.3.4", limit, 100.0) == 0.0
+    assert await buckets.take("ip:1.2.3.4", limit, 100.0) == 0.0
+    assert await buckets.take("ip:1.2.3.4", limit, 100.0) == 0.5
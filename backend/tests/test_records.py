@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pytest
+
+from models.records import NotificationRecord, SessionRecord, UserRecord, WalletRecord
+
+TIMESTAMP = 1_700_000_000
+
+@pytest.mark.parametrize("record", [
+    UserRecord("user_1", "alice", "alice@example.com", "secret", TIMESTAMP),
+    NotificationRecord("notif-1", "user_1", "Title", "message", "info", TIMESTAMP),
+    WalletRecord("0xabc", TIMESTAMP),
+    SessionRecord("user_1", TIMESTAMP)
+])
+def test_records_carry_no_instance_dict(record):
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(AttributeError):
+        record.extra = True
+
+def test_repeated_values_share_one_string():
+    first = NotificationRecord("notif-1", "".join(["user_", "42"]), "A", "m", "".join(["in", "fo"]), TIMESTAMP)
+    second = NotificationRecord("notif-2", "".join(["user_", "4", "2"]), "B", "m", "".join(["inf", "o"]), TIMESTAMP)
+    assert first.user_id is second.user_id
+    assert first.type is second.type
+
+def test_to_dict_returns_the_api_shape():
+    iso = datetime.fromtimestamp(TIMESTAMP).isoformat()
+    assert NotificationRecord("notif-1", "user_1", "Title", "message", "info", TIMESTAMP).to_dict() == {
+        "id": "notif-1", "user_id": "user_1", "title": "Title", "message": "message",
+        "type": "info", "read": False, "timestamp": iso
+    }
+    assert UserRecord("user_1", "alice", "a@example.com", "secret", TIMESTAMP).to_dict()["created_at"] == iso
+    assert WalletRecord("0xabc", TIMESTAMP).to_dict() == {"address": "0xabc", "connected_at": iso, "status": "connected"}
+    assert SessionRecord("user_1", TIMESTAMP).to_dict() == {"user_id": "user_1", "expires_at": iso}
+    # Broadcast bodies have no recipient
+    assert NotificationRecord("notif-2", None, "News", "m", "info", TIMESTAMP).user_id is None
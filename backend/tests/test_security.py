@@ -0,0 +1,66 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from core import security
+from core.config import settings
+from core.security import RevocationList, get_current_user_id, issue_token, resolve_token, revoke_token
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def jwt_mode(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_MODE", "jwt")
+
+def signed(claims, secret=None):
+    return jwt.encode(claims, secret or security._jwt_secret, algorithm=settings.JWT_ALGORITHM)
+
+def test_issued_tokens_resolve_to_their_user():
+    token = issue_token("user_7")["token"]
+    assert resolve_token(token) == "user_7"
+    # Served from the verified cache the second time
+    assert resolve_token(token) == "user_7"
+
+def test_forged_and_expired_tokens_are_rejected():
+    now = int(time.time())
+    assert resolve_token(signed({"sub": "user_7", "exp": now + 60, "jti": "a"}, "another-secret")) is None
+    assert resolve_token(signed({"sub": "user_7", "exp": now - 1, "jti": "b"})) is None
+    header, payload, _ = issue_token("user_7")["token"].split(".")
+    assert resolve_token(f"{header}.{payload}.{'A' * 43}") is None
+
+def test_cached_tokens_still_expire(monkeypatch):
+    token = signed({"sub": "user_7", "exp": int(time.time()) + 60, "jti": "c"})
+    assert resolve_token(token) == "user_7"
+    later = time.time() + 120
+    monkeypatch.setattr(security.time, "time", lambda: later)
+    assert resolve_token(token) is None
+
+def test_revoked_tokens_are_rejected_until_they_expire():
+    token = issue_token("user_7")["token"]
+    revoke_token(token)
+    assert resolve_token(token) is None
+    assert resolve_token(issue_token("user_7")["token"]) == "user_7"
+
+def test_revocation_list_forgets_expired_tokens():
+    revoked = RevocationList()
+    now = time.time()
+    revoked.add("soon", now + 10)
+    revoked.add("later", now + 1000)
+    revoked.add("past", now - 1)
+    assert ("soon" in revoked, "later" in revoked, "past" in revoked) == (True, True, False)
+    revoked.prune(now + 100)
+    assert len(revoked) == 1 and "later" in revoked
+
+async def test_current_user_needs_a_valid_token(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_ALLOW_QUERY_USER_ID", False)
+    token = issue_token("user_7")["token"]
+    assert await get_current_user_id(f"Bearer {token}", "user_1") == "user_7"
+    for authorization in (None, "Basic abc", "Bearer not-a-token"):
+        with pytest.raises(HTTPException) as error:
+            await get_current_user_id(authorization, "user_1")
+        assert error.value.status_code == 401
+
+    monkeypatch.setattr(settings, "AUTH_ALLOW_QUERY_USER_ID", True)
+    assert await get_current_user_id(None, "user_3") == "user_3"
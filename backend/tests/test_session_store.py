@@ -0,0 +1,51 @@
+import time
+from datetime import datetime
+
+from models import database
+from models.session_store import SessionStore
+
+def at(seconds):
+    return datetime.fromtimestamp(time.time() + seconds)
+
+def test_expired_sessions_are_not_returned():
+    store = SessionStore()
+    store.create("old", "u", at(-10))
+    store.create("live", "u", at(3600))
+    assert store.get("old") is None
+    assert "old" not in store
+    assert store.get("live").user_id == "u"
+
+def test_sweep_removes_only_expired_sessions():
+    store = SessionStore()
+    for i in range(5):
+        store.create(f"t{i}", "u", at(i * 100))
+    assert store.sweep(time.time() + 250) == 3
+    assert len(store) == 2 and "t3" in store and "t4" in store
+    assert store.sweep(time.time() + 250) == 0
+
+def test_reissued_token_outlives_its_stale_expiry():
+    store = SessionStore()
+    store.create("t", "u", at(10))
+    store.create("t", "u", at(3600))
+    assert store.sweep(time.time() + 60) == 0
+    assert "t" in store
+
+def test_deletes_compact_the_expiry_heap():
+    store = SessionStore()
+    for i in range(200):
+        store.create(f"t{i}", "u", at(3600))
+    for i in range(190):
+        assert store.delete(f"t{i}")
+    assert not store.delete("t0")
+    assert len(store) == 10
+    assert len(store._expiry_heap) <= 2 * len(store) + 64
+    assert store.sweep(time.time() + 7200) == 10
+
+def test_users_and_sessions_are_found_by_id_and_token():
+    user = database.create_user("lookup", "lookup@example.com", "secret")
+    assert database.get_user_by_id(user["id"])["email"] == "lookup@example.com"
+    session = database.create_session(user["id"])
+    assert database.get_session(session["token"])["user_id"] == user["id"]
+    assert database.delete_session(session["token"])
+    assert database.get_session(session["token"]) is None
+    assert database.get_user_by_id("user_missing") is None
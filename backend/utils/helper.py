@@ -4,19 +4,30 @@ import random
 import asyncio
 from typing import Any, Dict, List, Optional
 
-def generate_response(data: Any = None, message: str = "Success", success: bool = True) -> Dict:
-    """Generate a standardized API response"""
-    return {
+from core import latency
+from core.responses import FastJSONResponse
+
+def generate_response(data: Any = None, message: str = "Success", success: bool = True) -> FastJSONResponse:
+    """
+    Generate a standardized API response.
+    
+    The envelope is returned as a ready response, so FastAPI skips response_model
+    validation and jsonable_encoder and the body is encoded exactly once.
+    """
+    return FastJSONResponse({
         "success": success,
         "message": message,
         "data": data,
-        "timestamp": datetime.now().isoformat()
-    }
+        "timestamp": datetime.now()
+    })
 
 async def simulate_delay(min_seconds: float = 0.5, max_seconds: float = 2.0) -> None:
-    """Simulate a processing delay"""
-    delay = random.uniform(min_seconds, max_seconds)
-    await asyncio.sleep(delay)
+    """Simulate a processing delay according to the configured latency profile"""
+    if not latency.enabled:
+        return
+    delay = latency.sample_delay(min_seconds, max_seconds)
+    if delay > 0:
+        await asyncio.sleep(delay)
 
 def generate_id() -> str:
     """Generate a random ID"""